@@ -85,8 +85,9 @@ class MovieAdmin(ExportMixin, admin.ModelAdmin):
         "audience_rating",
         "poster",
     ]
+    list_select_related = ["director__user"]
     ordering = ["-created_at", "title"]
-    readonly_fields = ["poster", "publish_on"]
+    readonly_fields = ["poster", "publish_on", "director"]
     filter_horizontal = ["contests"]
 
     def submitted_by(self, movie):
@@ -94,14 +95,12 @@ class MovieAdmin(ExportMixin, admin.ModelAdmin):
         return order and order.owner
 
     def director(self, movie):
-        director = movie.crewmember_set.filter(role__name="Director").first()
-        if director:
-            return director.profile.user
+        if movie.director:
+            return movie.director.user
 
     def director_name(self, movie):
-        return movie.crewmember_set.get(
-            role__name="Director"
-        ).profile.user.get_full_name()
+        if movie.director:
+            return movie.director.user.get_full_name()
 
     def is_paid(self, movie):
         return movie.orders.exclude(payment_id=None).exists()
@@ -0,0 +1,57 @@
+"""Token authentication with the token, its user and the user's profile
+cached for `TOKEN_TIMEOUT`.
+
+Cached tokens carry the stamp their user had when they were cached, saving
+or deleting the user or their profile changes the stamp and deleting the
+token drops it (see `api.signals`), so deactivated users and deleted tokens
+are rejected on their next request.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_TIMEOUT = 5 * 60
+
+
+def _token_key(key):
+    return f"auth:token:{key}"
+
+
+def _user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_token(key):
+    cache.delete(_token_key(key))
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = cache.get(_token_key(key))
+        if cached is not None:
+            token, stamp = cached
+            if stamp == cache.get(_user_key(token.user_id)):
+                return (token.user, token)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user__profile").get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        stamp = cache.get_or_set(
+            _user_key(token.user_id), uuid.uuid4().hex, timeout=TOKEN_TIMEOUT
+        )
+        cache.set(_token_key(key), (token, stamp), timeout=TOKEN_TIMEOUT)
+        return (token.user, token)
@@ -0,0 +1,57 @@
+"""Versioned cache of the contest leaderboards (top creators and curators).
+
+Leaderboards only change when `updatetopcreators`/`updatetopcurators` run,
+cached responses are keyed by the version of the contest leaderboard and the
+commands bump that version once their changes are committed, so stale pages
+are never served and don't need to be deleted. Versions are random stamps,
+like the ones of `seo.router` and `api.registry`, so a version that was
+evicted can't come back and serve pages cached under it.
+"""
+
+import hashlib
+import uuid
+
+from django.core.cache import cache
+
+TOP_CREATORS = "top_creators"
+TOP_CURATORS = "top_curators"
+
+# versions are bumped every few hours, this only bounds the memory of old ones
+LEADERBOARD_TIMEOUT = 24 * 60 * 60
+
+
+def _version_key(kind, contest_id):
+    return f"leaderboard:{kind}:{contest_id}:version"
+
+
+def get_leaderboard_version(kind, contest_id):
+    key = _version_key(kind, contest_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_leaderboard_version(kind, contest_id):
+    """invalidate every cached page of the leaderboard"""
+    cache.set(_version_key(kind, contest_id), uuid.uuid4().hex, timeout=None)
+
+
+def leaderboard_key(kind, contest_id, *parts):
+    """cache key of a leaderboard entry, parts tell the entries apart (page
+    url, viewer...)"""
+    version = get_leaderboard_version(kind, contest_id)
+    digest = hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+    return f"leaderboard:{kind}:{contest_id}:{version}:{digest}"
+
+
+def get_or_set(key, default):
+    """`default()` is evaluated and cached on a miss, it may return None"""
+    cached = cache.get(key)
+    if cached is not None:
+        return cached["value"]
+    value = default()
+    cache.set(key, {"value": value}, timeout=LEADERBOARD_TIMEOUT)
+    return value
@@ -45,8 +45,15 @@ class ORDER_STATE:
     REJECTED = "R"
 
 
+class TOGGLE:
+    WATCHLIST = "watchlist"
+    RECOMMEND = "recommend"
+    FOLLOW = "follow"
+
+
 REGULAR_MONTHLY_CONTEST_NAME = "Regular Monthly Contest"
 RECOMMENDATION = "Recommendation"
+DIRECTOR = "Director"
 
 DEFAULT_AVATARS = {
     GENDER.MALE: "/default_avatar_m.png",
@@ -0,0 +1,143 @@
+"""Maintenance of cached counters (`Movie.recommend_count`,
+`Movie.review_count`, `Movie.audience_rating` with its rating sum and count,
+`Profile.reviews_given`, `MovieRateReview.like_count`).
+
+Signal receivers in `api.signals` report deltas with `add` and movies whose
+audience rating needs a refresh with `refresh_rating`. Changes are applied
+with `F()` expressions, never by saving the whole row, so concurrent writers
+don't overwrite each other.
+
+While `coalesce` is active (see `api.middleware.CounterMiddleware`) changes
+made outside of a transaction are buffered and flushed with one UPDATE per
+distinct delta before the next query reading one of the changed tables (so
+the request reads its own changes) or at the end of the request, changes made
+inside a transaction are applied right away so they commit or roll back with
+it.
+`reconcilecounters` repairs any drift left behind, e.g. by raw SQL or fixture
+loading.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from logging import getLogger
+import threading
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, When
+
+logger = getLogger(__name__)
+
+_local = threading.local()
+
+
+class CounterBuffer:
+    def __init__(self):
+        # (model, lookup, value) => {field: delta}
+        self.deltas = defaultdict(lambda: defaultdict(int))
+        self.rating_movie_ids = set()
+
+    def add(self, model, lookup, value, deltas):
+        for field, delta in deltas.items():
+            self.deltas[(model, lookup, value)][field] += delta
+
+    def get_tables(self):
+        """tables with buffered changes"""
+        tables = {model._meta.db_table for model, _, _ in self.deltas}
+        if self.rating_movie_ids:
+            from api.models import Movie
+
+            tables.add(Movie._meta.db_table)
+        return tables
+
+    def flush(self):
+        groups = defaultdict(list)
+        for (model, lookup, value), fields in self.deltas.items():
+            fields = tuple(sorted((f, d) for f, d in fields.items() if d))
+            if fields:
+                groups[(model, lookup, fields)].append(value)
+        for (model, lookup, fields), values in groups.items():
+            model.objects.filter(**{f"{lookup}__in": values}).update(
+                **{field: F(field) + delta for field, delta in fields}
+            )
+        if self.rating_movie_ids:
+            _refresh_ratings(self.rating_movie_ids)
+        self.deltas.clear()
+        self.rating_movie_ids.clear()
+
+
+def _get_buffer():
+    buffer = getattr(_local, "buffer", None)
+    if buffer is not None and not connection.in_atomic_block:
+        return buffer
+    return None
+
+
+def _refresh_ratings(movie_ids):
+    from api.models import Movie
+
+    Movie.objects.filter(id__in=movie_ids).update(
+        audience_rating=Case(
+            When(rating_count__gt=0, then=F("rating_sum") / F("rating_count")),
+            default=None,
+            output_field=FloatField(),
+        )
+    )
+
+
+def add(model, values, lookup="pk", **deltas):
+    """add the `field=delta` pairs of `deltas` to the `model` rows whose
+    `lookup` is in `values`"""
+    values = list(values)
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or not values:
+        return
+    buffer = _get_buffer()
+    if buffer is None:
+        model.objects.filter(**{f"{lookup}__in": values}).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+    else:
+        for value in values:
+            buffer.add(model, lookup, value, deltas)
+
+
+def refresh_rating(movie_id):
+    """recompute audience_rating of the movie from its rating sum and count,
+    call after the `add` updating them"""
+    buffer = _get_buffer()
+    if buffer is None:
+        _refresh_ratings([movie_id])
+    else:
+        buffer.rating_movie_ids.add(movie_id)
+
+
+def _flush_before_reads(execute, sql, params, many, context):
+    buffer = _get_buffer()
+    if buffer is not None and sql.lstrip()[:6].upper() == "SELECT":
+        if any(table in sql for table in buffer.get_tables()):
+            buffer.flush()
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def coalesce():
+    """buffer counter changes made in the block and apply them before they are
+    read or at its end"""
+    if getattr(_local, "buffer", None) is not None:
+        # nested, the outermost block flushes
+        yield
+        return
+    _local.buffer = CounterBuffer()
+    try:
+        with connection.execute_wrapper(_flush_before_reads):
+            yield
+    except Exception:
+        buffer, _local.buffer = _local.buffer, None
+        try:
+            buffer.flush()
+        except Exception:
+            # the error of the block is the one to raise
+            logger.exception("counter changes lost, run reconcilecounters")
+        raise
+    buffer, _local.buffer = _local.buffer, None
+    buffer.flush()
@@ -0,0 +1,35 @@
+from logging import getLogger
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import search
+from api.models import Movie, Profile, SearchEntry
+
+logger = getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Rebuilds the search index (see `api.search`) of every movie and profile,
+    objects are indexed in batches of `--batch-size` ids."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            SearchEntry.objects.all().delete()
+            for model, index in [
+                (Movie, search.index_movies),
+                (Profile, search.index_profiles),
+            ]:
+                ids = list(model.objects.order_by("id").values_list("id", flat=True))
+                for start in range(0, len(ids), batch_size):
+                    index(ids[start : start + batch_size])
+        logger.info(
+            f"{SearchEntry.objects.count()} search entries "
+            f"in {time.monotonic() - started:.2f}s"
+        )
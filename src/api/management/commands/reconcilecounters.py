@@ -0,0 +1,184 @@
+from math import isclose
+from logging import getLogger
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from api import counters
+from api.models import Movie, MovieList, MovieRateReview, Profile
+from api.signals import RECOMMENDS
+
+logger = getLogger(__name__)
+
+
+def _same(current, expected):
+    if isinstance(expected, float) or isinstance(current, float):
+        return isclose(current or 0, expected or 0)
+    return current == expected
+
+
+def _aggregate(model, field, queryset, lookup, aggregate):
+    """`aggregate` of the `queryset` rows whose `lookup` is the outer row, as
+    an expression for `model.field`"""
+    rows = (
+        queryset.filter(**{lookup: OuterRef("pk")})
+        .order_by()
+        .values(lookup)
+        .annotate(value=aggregate)
+        .values("value")
+    )
+    return Coalesce(Subquery(rows), 0, output_field=model._meta.get_field(field))
+
+
+class Command(BaseCommand):
+    """Detects and repairs drift of the counters maintained by `api.counters`.
+
+    Every counter is recomputed with one grouped query to find the rows whose
+    cached value differs. Those rows are repaired with UPDATEs recomputing the
+    counters in the database, so changes made by concurrent requests while the
+    command runs aren't overwritten.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the drift, don't repair it",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        movie_counters = {
+            "recommend_count": self._get_recommend_counts(),
+            **self._get_review_counters(),
+        }
+        profile_counters = {"reviews_given": self._get_reviews_given()}
+        review_counters = {"like_count": self._get_like_counts()}
+        movies = self._reconcile(Movie.objects.all(), movie_counters)
+        profiles = self._reconcile(Profile.objects.all(), profile_counters)
+        reviews = self._reconcile(MovieRateReview.objects.all(), review_counters)
+
+        if not options["dry_run"]:
+            with transaction.atomic():
+                self._repair(movies, profiles, reviews)
+        logger.info(
+            f"drift in {len(movies)} movie(s), {len(profiles)} profile(s) and "
+            f"{len(reviews)} review(s) in {time.monotonic() - started:.2f}s"
+        )
+
+    def _reconcile(self, queryset, counters):
+        """rows of queryset with at least one drifted counter, with the
+        counters set to their expected value"""
+        drifted = []
+        for obj in queryset.only("id", *counters):
+            changed = False
+            for field, expected_values in counters.items():
+                current = getattr(obj, field)
+                # without reviews the audience rating is null, see
+                # api.counters._refresh_ratings
+                default = None if field == "audience_rating" else 0
+                expected = expected_values.get(obj.id, default)
+                if not _same(current, expected):
+                    logger.info(
+                        f"{obj._meta.model_name} {obj.id} {field}: "
+                        f"{current} => {expected}"
+                    )
+                    setattr(obj, field, expected)
+                    changed = True
+            if changed:
+                drifted.append(obj)
+        return drifted
+
+    def _repair(self, movies, profiles, reviews):
+        through = MovieList.movies.through.objects.filter(RECOMMENDS)
+        movie_ids = [movie.id for movie in movies]
+        Movie.objects.filter(id__in=movie_ids).update(
+            recommend_count=_aggregate(
+                Movie, "recommend_count", through, "movie", Count("id")
+            ),
+            review_count=_aggregate(
+                Movie, "review_count", MovieRateReview.objects, "movie", Count("id")
+            ),
+            rating_sum=_aggregate(
+                Movie, "rating_sum", MovieRateReview.objects, "movie", Sum("rating")
+            ),
+            rating_count=_aggregate(
+                Movie,
+                "rating_count",
+                MovieRateReview.objects,
+                "movie",
+                Count("rating"),
+            ),
+        )
+        counters._refresh_ratings(movie_ids)
+        Profile.objects.filter(id__in=[profile.id for profile in profiles]).update(
+            reviews_given=_aggregate(
+                Profile,
+                "reviews_given",
+                MovieRateReview.objects,
+                "author__profile",
+                Count("id"),
+            )
+        )
+        MovieRateReview.objects.filter(id__in=[review.id for review in reviews]).update(
+            like_count=_aggregate(
+                MovieRateReview,
+                "like_count",
+                MovieRateReview.liked_by.through.objects,
+                "movieratereview",
+                Count("id"),
+            )
+        )
+
+    def _get_recommend_counts(self):
+        return dict(
+            MovieList.movies.through.objects.filter(RECOMMENDS)
+            .values("movie_id")
+            .annotate(count=Count("id"))
+            .values_list("movie_id", "count")
+        )
+
+    def _get_review_counters(self):
+        """review_count, rating_sum, rating_count and audience_rating by movie id"""
+        counters = {
+            field: {}
+            for field in (
+                "review_count",
+                "rating_sum",
+                "rating_count",
+                "audience_rating",
+            )
+        }
+        rows = MovieRateReview.objects.values("movie_id").annotate(
+            review_count=Count("id"),
+            rating_sum=Sum("rating"),
+            rating_count=Count("rating"),
+        )
+        for row in rows:
+            movie_id = row["movie_id"]
+            counters["review_count"][movie_id] = row["review_count"]
+            counters["rating_sum"][movie_id] = row["rating_sum"] or 0
+            counters["rating_count"][movie_id] = row["rating_count"]
+            # movies that only have reviews without rating have a null rating
+            counters["audience_rating"][movie_id] = (
+                row["rating_sum"] / row["rating_count"] if row["rating_count"] else None
+            )
+        return counters
+
+    def _get_reviews_given(self):
+        return dict(
+            MovieRateReview.objects.filter(author__profile__isnull=False)
+            .values("author__profile__id")
+            .annotate(count=Count("id"))
+            .values_list("author__profile__id", "count")
+        )
+
+    def _get_like_counts(self):
+        return dict(
+            MovieRateReview.liked_by.through.objects.values("movieratereview_id")
+            .annotate(count=Count("id"))
+            .values_list("movieratereview_id", "count")
+        )
@@ -1,52 +1,97 @@
+from collections import defaultdict
 from logging import getLogger
 
 from django.db import transaction
+from django.db.models import Count
 from django.core.management.base import BaseCommand
-from api.models import Profile, MovieList
+from api.models import Profile, MovieList, MovieRateReview
 
 
 logger = getLogger(__name__)
 
+REVIEW_LIKE_POINTS = 0.25
+REVIEW_POINTS_LIMIT = 20
+FOLLOWER_POINTS = 0.25
+CURATION_LIKE_POINTS = 0.25
+CURATION_POINTS_LIMIT = 200
+
 
 # TODO: compare recommend list and celeb recommend and assign points accordingly
 class Command(BaseCommand):
+    """Updates engagement score of non celeb profiles and curator rank of all.
+
+    Likes on reviews, followers and likes on contest lists are counted with one
+    grouped query each, only the changed scores and ranks are written back.
+    """
+
     def handle(self, *args, **options):
-        with transaction.atomic():
-            for profile in Profile.objects.filter(is_celeb=False).all():
-                logger.info(f"{profile.user}: {profile.engagement_score}")
-                engg_score = self._calculate_score(profile)
+        review_points = self._get_review_points()
+        followers_points = self._get_followers_points()
+        curation_points = self._get_curation_points()
+
+        changed = []
+        for profile in Profile.objects.filter(is_celeb=False).only(
+            "id", "engagement_score"
+        ):
+            engg_score = round(
+                review_points.get(profile.id, 0)
+                + followers_points.get(profile.id, 0)
+                + curation_points.get(profile.id, 0),
+                2,
+            )
+            if engg_score != profile.engagement_score:
+                logger.info(f"{profile}: {profile.engagement_score} => {engg_score}")
                 profile.engagement_score = engg_score
-                profile.save()
-                logger.info(f"{profile.user}: {profile.engagement_score}")
+                changed.append(profile)
+        logger.info(f"{len(changed)} engagement score(s) changed")
+
+        with transaction.atomic():
+            Profile.objects.bulk_update(changed, ["engagement_score"], batch_size=500)
 
             # updating curator ranks
-            for index, profile in enumerate(
-                Profile.objects.order_by("-engagement_score", "user__first_name").all()
-            ):
-                profile.curator_rank = index + 1
-                profile.save()
-
-    def _calculate_score(self, profile):
-        review_points = self._get_review_points(profile)
-        followers_points = self._get_followers_points(profile)
-        curation_points = self._get_curation_points(profile)
-        return round(review_points + followers_points + curation_points, 2)
-
-    def _get_review_points(self, profile):
+            changed = []
+            ranked = Profile.objects.order_by("-engagement_score", "user__first_name")
+            for index, profile in enumerate(ranked.only("id", "curator_rank")):
+                if profile.curator_rank != index + 1:
+                    profile.curator_rank = index + 1
+                    changed.append(profile)
+            logger.info(f"{len(changed)} curator rank(s) changed")
+            Profile.objects.bulk_update(changed, ["curator_rank"], batch_size=500)
+
+    def _get_review_points(self):
         """
-        points for writing good content, each like on
+        points for writing good content, each like on a review is worth 0.25
+        up to 20 points per review, by author profile id
         """
-        reviews = profile.user.movieratereview_set.all()
-        return sum(min(review.liked_by.count() * 0.25, 20) for review in reviews)
+        points = defaultdict(int)
+        reviews = MovieRateReview.objects.filter(
+            author__profile__isnull=False
+        ).values_list("author__profile__id", "like_count")
+        for profile_id, likes in reviews:
+            points[profile_id] += min(likes * REVIEW_LIKE_POINTS, REVIEW_POINTS_LIMIT)
+        return points
 
-    def _get_followers_points(self, profile):
+    def _get_followers_points(self):
         """points for being followed by other users 0.25 per follower with no limit"""
-        return profile.followed_by.count() * 0.25
-
-    def _get_curation_points(self, profile):
-        curation = MovieList.objects.filter(
-            contest__isnull=False, owner=profile.user
-        ).all()
+        followers = (
+            Profile.follows.through.objects.values("to_profile_id")
+            .annotate(followers=Count("id"))
+            .values_list("to_profile_id", "followers")
+        )
+        return {profile_id: count * FOLLOWER_POINTS for profile_id, count in followers}
 
-        logger.debug(f"{len(curation)} curation from user in contests")
-        return sum(min(c.liked_by.count() * 0.25, 200) for c in curation)
+    def _get_curation_points(self):
+        """points for likes on contest lists, 0.25 per like up to 200 per list"""
+        points = defaultdict(int)
+        curation = (
+            MovieList.objects.filter(
+                contest__isnull=False, owner__profile__isnull=False
+            )
+            .annotate(likes=Count("liked_by"))
+            .values_list("owner__profile__id", "likes")
+        )
+        for profile_id, likes in curation:
+            points[profile_id] += min(
+                likes * CURATION_LIKE_POINTS, CURATION_POINTS_LIMIT
+            )
+        return points
@@ -1,24 +1,61 @@
 from django.core.management.base import BaseCommand
-from django.db.models import Q
-from api.models import Movie
+from django.db.models import Count, Q
+from api.models import Movie, MovieList
 from api.constants import MOVIE_STATE, RECOMMENDATION
 from logging import getLogger
 import pandas as pd
+import time
 
 logger = getLogger(__name__)
 
 
 class Command(BaseCommand):
+    """Refreshes recommend_count of published movies.
+
+    Recommends are counted with a single grouped query over the movie list
+    memberships and only the movies whose count differs are updated.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--movie-ids",
+            nargs="+",
+            type=int,
+            help="refresh only these movies",
+        )
+
     def handle(self, *args, **options):
+        started = time.monotonic()
+        movie_ids = options.get("movie_ids")
+        movies = Movie.objects.filter(state=MOVIE_STATE.PUBLISHED).only(
+            "id", "title", "recommend_count"
+        )
+        recommends = MovieList.movies.through.objects.filter(
+            Q(movielist__name=RECOMMENDATION) | Q(movielist__contest__isnull=False),
+            movie__state=MOVIE_STATE.PUBLISHED,
+        )
+        if movie_ids:
+            movies = movies.filter(id__in=movie_ids)
+            recommends = recommends.filter(movie_id__in=movie_ids)
+        recommend_counts = dict(
+            recommends.values("movie_id")
+            .annotate(recommend_count=Count("id"))
+            .values_list("movie_id", "recommend_count")
+        )
+
         updates = []
-        movies = Movie.objects.filter(state=MOVIE_STATE.PUBLISHED).all()
+        changed = []
         for movie in movies:
-            recommend_count = movie.in_lists.filter(
-                Q(name=RECOMMENDATION) | Q(contest__isnull=False)
-            ).count()
-            movie.recommend_count = recommend_count
+            recommend_count = recommend_counts.get(movie.id, 0)
+            if movie.recommend_count != recommend_count:
+                movie.recommend_count = recommend_count
+                changed.append(movie)
             updates.append(dict(name=movie.title, recommend_count=recommend_count))
-        Movie.objects.bulk_update(movies, ["recommend_count"])
+        Movie.objects.bulk_update(changed, ["recommend_count"], batch_size=500)
+        logger.info(
+            f"updated recommend count of {len(changed)}/{len(updates)} movies "
+            f"in {time.monotonic() - started:.2f}s"
+        )
         updates.sort(key=lambda x: x["recommend_count"], reverse=True)
         # log top 30 recommended movies
         logger.info(f"recommend count updates: \n{str(pd.DataFrame(updates[:30]))}")
@@ -1,7 +1,9 @@
+from collections import defaultdict
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Q, Count
-from api.models import Role, CrewMember, Movie
+from api import registry
+from api.models import CrewMember, MovieList, MovieRateReview, Profile
 from api.constants import MOVIE_STATE
 from logging import getLogger
 
@@ -16,43 +18,59 @@ PART_A_LEVELS = [
 ]
 PART_B_LEVELS = [128, 320, 640, 960, 1280]
 
+FOLLOWER_MULTIPYER = 2
+JURY_MULTIPLYER = 2.5
+RECOMMEND_MULTIPYER = 0.1
+RECOMMENT_LIMIT = 100
+REVIEW_MULTIPYER = 1
+REVIEW_LIMIT = 20
+RATING_MULTIPYER = 0.5
+RATING_LIMIT = 50
+RATING_GTE = 7
+
 
 class Command(BaseCommand):
+    """Updates pop score and creator rank of all the directors.
+
+    Every input is loaded with one grouped query for all directors at once,
+    the scores are computed in memory and written back with bulk_update.
+    """
+
     def handle(self, *args, **options):
+        self.director_role = registry.get_director_role()
+        directors = list(self.director_role.profiles.select_related("user"))
+        logger.debug(f"updating {len(directors)} directors")
+
+        directed_movies = self.get_directed_movies()
+        followers_counts = self.get_followers_counts()
+        recommend_counts = self.get_recommend_counts()
+        review_counts = self.get_review_counts()
+
+        for profile in directors:
+            movies = directed_movies.get(profile.id, [])
+            logger.info(f"{profile.user.username} movies directed: {len(movies)}")
+            followers_points = followers_counts.get(profile.id, 0) * FOLLOWER_MULTIPYER
+            jury_points = self.get_jury_rating_points(movies)
+            recommend_points = self.get_recommend_points(movies, recommend_counts)
+            rating_review_points = self.get_review_points(movies, review_counts)
+
+            part_b = recommend_points + rating_review_points + jury_points
+            part_a = followers_points
+
+            profile.pop_score = self._get_capped_points(part_a, part_b)
+            logger.info(f"{profile.user.username} => {profile.pop_score}")
+
+        self.update_rank(directors)
         with transaction.atomic():
-            self.director_role = Role.objects.filter(name="Director").first()
-            directors = self.director_role.profiles.all()
-            logger.debug(f"updating {len(directors)} directors")
-            for profile in directors:
-                logger.info(f"{profile.user.username} => {profile.pop_score}")
-                directed_movies = [
-                    cm.movie
-                    for cm in CrewMember.objects.filter(
-                        role=self.director_role, profile=profile
-                    )
-                    if cm.movie.state == MOVIE_STATE.PUBLISHED
-                ]
-                logger.info(f"movies directed:  {len(directed_movies)}")
-                followers_points = self.get_follower_points(profile)
-                jury_points = self.get_jury_rating_points(directed_movies)
-                recommend_points = self.get_recommend_points(directed_movies)
-                rating_review_points = self.get_review_points(directed_movies)
-
-                part_b = recommend_points + rating_review_points + jury_points
-                part_a = followers_points
-
-                capped_points = self._get_capped_points(part_a, part_b)
-
-                profile.pop_score = capped_points
-                logger.info(f"{profile.user.username} => {profile.pop_score}")
-                profile.save()
-            self.update_rank(directors)
+            Profile.objects.bulk_update(
+                directors, ["pop_score", "creator_rank"], batch_size=500
+            )
 
     def _get_capped_points(self, part_a, part_b):
         level_a = self._get_part_a_level(part_a)
         level_b = self._get_part_b_level(part_b)
         level = min(level_a, level_b)
-        logger.info(f"level: {level}")
+        logger.debug(f"level: {level}")
         part_a = min(part_a, PART_A_LEVELS[level])
         part_b = min(part_b, PART_B_LEVELS[level])
         return part_a + part_b
@@ -70,67 +88,90 @@ class Command(BaseCommand):
         return len(PART_A_LEVELS)
 
     def update_rank(self, directors):
-        directors = list(directors)
-        directors.sort(
+        directors = sorted(
+            directors,
             key=lambda profile: (profile.pop_score, profile.user.get_full_name()),
             reverse=True,
         )
         for rank, profile in enumerate(directors):
             profile.creator_rank = rank + 1
-            profile.save()
+
+    def get_directed_movies(self):
+        """published movies of every director as (movie_id, jury_rating) pairs
+        keyed by the profile id, in crew membership order"""
+        directed_movies = defaultdict(list)
+        memberships = (
+            CrewMember.objects.filter(
+                role=self.director_role, movie__state=MOVIE_STATE.PUBLISHED
+            )
+            .order_by("id")
+            .values_list("profile_id", "movie_id", "movie__jury_rating")
+        )
+        for profile_id, movie_id, jury_rating in memberships:
+            directed_movies[profile_id].append((movie_id, jury_rating or 0))
+        return directed_movies
+
+    def _directed_movie_ids(self):
+        return CrewMember.objects.filter(
+            role=self.director_role, movie__state=MOVIE_STATE.PUBLISHED
+        ).values("movie_id")
+
+    def get_followers_counts(self):
+        """number of followers by profile id"""
+        rows = (
+            Profile.follows.through.objects.filter(to_profile__roles=self.director_role)
+            .values("to_profile_id")
+            .annotate(followers=Count("id"))
+            .values_list("to_profile_id", "followers")
+        )
+        return dict(rows)
+
+    def get_recommend_counts(self):
+        """number of contest recommend lists by movie id"""
+        rows = (
+            MovieList.movies.through.objects.filter(
+                movie_id__in=self._directed_movie_ids(),
+                movielist__contest_id__isnull=False,
+            )
+            .values("movie_id")
+            .annotate(recommends=Count("id"))
+            .values_list("movie_id", "recommends")
+        )
+        return dict(rows)
+
+    def get_review_counts(self):
+        """(rating_count, review_count) by movie id"""
+        rows = (
+            MovieRateReview.objects.filter(movie_id__in=self._directed_movie_ids())
+            .values("movie_id")
+            .annotate(
+                rating_count=Count("id", filter=Q(content__isnull=False)),
+                actual_review_count=Count("id", filter=Q(rating__gte=RATING_GTE)),
+            )
+            .values_list("movie_id", "rating_count", "actual_review_count")
+        )
+        return {movie_id: counts for movie_id, *counts in rows}
 
     def get_jury_rating_points(self, directed_movies):
-        MULTIPLYER = 2.5
-        jury_points = sum(m.jury_rating * MULTIPLYER for m in directed_movies)
+        jury_points = sum(
+            jury_rating * JURY_MULTIPLYER for _, jury_rating in directed_movies
+        )
         logger.debug(f"jury_points {jury_points}")
         return jury_points
 
-    def get_follower_points(self, profile):
-        """
-        accountable for 20% of the points
-        """
-        MULTIPYER = 2
-        logger.info(f"updating {profile.user.username}")
-        followers_count = profile.followed_by.count()
-        logger.info(f"followers_count {followers_count}")
-        followers_points = followers_count * MULTIPYER
-        logger.info(f"followers points {followers_points}")
-        return followers_points
-
-    def get_review_points(self, directed_movies):
-        REVIEW_MULTIPYER = 1
-        REVIEW_LIMIT = 20
-        RATING_MULTIPYER = 0.5
-        RATING_LIMIT = 50
-        RATING_GTE = 7
-
-        ratings_count = Count(
-            "movieratereview", filter=Q(movieratereview__content__isnull=False)
-        )
-        reviews_count = Count(
-            "movieratereview", filter=Q(movieratereview__rating__gte=RATING_GTE)
-        )
-        movies = (
-            Movie.objects.filter(id__in=[m.id for m in directed_movies])
-            .annotate(rating_count=ratings_count)
-            .annotate(actual_review_count=reviews_count)
-        )
+    def get_review_points(self, directed_movies, review_counts):
         review_count = 0
         rating_count = 0
-        for movie in movies:
-            rating_count += min(RATING_LIMIT, movie.rating_count)
-            review_count += min(REVIEW_LIMIT, movie.actual_review_count)
+        for movie_id, _ in directed_movies:
+            movie_rating_count, movie_review_count = review_counts.get(movie_id, (0, 0))
+            rating_count += min(RATING_LIMIT, movie_rating_count)
+            review_count += min(REVIEW_LIMIT, movie_review_count)
         logger.debug(f"rating: {rating_count}, review: {review_count}")
         return rating_count * RATING_MULTIPYER + review_count * REVIEW_MULTIPYER
 
-    def get_recommend_points(self, directed_movies):
-        MULTIPYER = 0.1
-        RECOMMENT_LIMIT = 100
+    def get_recommend_points(self, directed_movies, recommend_counts):
         recommended_count = 0
-        for movie in directed_movies:
-            recommended_count += min(
-                movie.in_lists.exclude(contest_id__isnull=True).count(),
-                RECOMMENT_LIMIT,
-            )
+        for movie_id, _ in directed_movies:
+            recommended_count += min(recommend_counts.get(movie_id, 0), RECOMMENT_LIMIT)
         logger.debug(f"recommended {recommended_count} times")
-        return recommended_count * MULTIPYER
+        return recommended_count * RECOMMEND_MULTIPYER
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
-from django.db.models import Q
-from api.models import CrewMember
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from api.models import CrewMember, Profile
 from api.constants import MOVIE_STATE
 from logging import getLogger
 
@@ -8,9 +9,49 @@ logger = getLogger(__name__)
 
 
 class Command(BaseCommand):
+    """Caches the roles a profile has in the crew of submitted movies on
+    `Profile.roles`, missing (profile, role) pairs are found and inserted with
+    a fixed number of queries."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="also remove roles the profile no longer has in any crew",
+        )
+
     def handle(self, *args, **options):
-        for cm in CrewMember.objects.filter(~Q(movie__state=MOVIE_STATE.CREATED)):
-            if cm.role not in cm.profile.roles.all():
-                logger.info(f"{cm.profile} is {cm.role.name}")
-                cm.profile.roles.add(cm.role)
-                cm.profile.save()
+        ProfileRole = Profile.roles.through
+        crew = CrewMember.objects.filter(~Q(movie__state=MOVIE_STATE.CREATED))
+        missing = (
+            crew.filter(
+                ~Exists(
+                    ProfileRole.objects.filter(
+                        profile_id=OuterRef("profile_id"), role_id=OuterRef("role_id")
+                    )
+                )
+            )
+            .values_list("profile_id", "role_id")
+            .distinct()
+        )
+        with transaction.atomic():
+            profile_roles = [
+                ProfileRole(profile_id=profile_id, role_id=role_id)
+                for profile_id, role_id in missing
+            ]
+            logger.info(f"adding {len(profile_roles)} profile role(s)")
+            ProfileRole.objects.bulk_create(
+                profile_roles, batch_size=500, ignore_conflicts=True
+            )
+
+            if options["prune"]:
+                stale = ProfileRole.objects.filter(
+                    ~Exists(
+                        crew.filter(
+                            profile_id=OuterRef("profile_id"),
+                            role_id=OuterRef("role_id"),
+                        )
+                    )
+                )
+                deleted, _ = stale.delete()
+                logger.info(f"removed {deleted} stale profile role(s)")
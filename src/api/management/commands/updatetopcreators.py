@@ -1,8 +1,9 @@
 # Updates Top creators for live contests
-from collections import defaultdict
+from api import cache, registry
 from api.constants import MOVIE_STATE
-from api.models import Contest, CrewMember, TopCreator
+from api.models import Contest, CrewMember, Movie, MovieList, Profile, TopCreator
 from django.db import transaction
+from django.db.models import Count, Q
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from logging import getLogger
@@ -13,7 +14,25 @@ logger = getLogger(__name__)
 MAX_AUDIENCE_RATINGS = 40
 
 
+# python's left to right float sum and round keep the scores identical to
+# the per movie implementation, pandas' compensated sum can differ in the
+# last digit after rounding
+def _sum(series):
+    return sum(series.tolist())
+
+
+def _round(series, digits=2):
+    return series.map(lambda value: round(value, digits))
+
+
 class Command(BaseCommand):
+    """Ranks the directors of every live contest.
+
+    For each contest the director/movie pairs, review counts and celeb/non
+    celeb recommend counts are loaded with one grouped query each and all the
+    composite scores are computed at once on a pandas DataFrame.
+    """
+
     def handle(self, *args, **options):
         top_creator_comparator = lambda x: (  # noqa: E731
             x.get("score", 0),
@@ -23,29 +42,24 @@ class Command(BaseCommand):
         live_contests = Contest.objects.filter(start__lte=now, end__gte=now).all()
         logger.info(f"Live contests: {len(live_contests)}")
         for contest in live_contests:
-            logger.info(f"Contest: {contest.name} with {contest.movies.count()} movies")
-            movies_by_director = self._get_movies_by_director(contest)
-            logger.info(f"found {len(movies_by_director)} directors")
-            top_creators = []
-            # for logging only
-            score_details = []
-            for director, movies in movies_by_director.items():
-                top_creator_data = {
-                    "profile_id": director.id,
-                    "contest_id": contest.id,
-                    # name used for seconds order sorting
-                    "name": director.user.get_full_name(),
-                }
-                logger.debug(f"for {director}")
-                score, detail = self._get_score(movies, contest)
-                top_creator_data.update(score)
-                top_creators.append(top_creator_data)
-
-                detail.update(top_creator_data)
-                score_details.append(detail)
+            movies = self._get_movies(contest)
+            logger.info(f"Contest: {contest.name} with {len(movies)} movies")
+            scores = self._get_scores(contest, movies)
+            logger.info(f"found {len(scores)} directors")
 
+            score_details = scores.to_dict("records")
             top_creators = sorted(
-                top_creators,
+                (
+                    {
+                        "profile_id": int(row["profile_id"]),
+                        "contest_id": contest.id,
+                        # name used for seconds order sorting
+                        "name": row["name"],
+                        "score": float(row["score"]),
+                        "recommend_count": int(row["recommend_count"]),
+                    }
+                    for row in score_details
+                ),
                 key=top_creator_comparator,
                 reverse=True,
             )
@@ -63,98 +77,118 @@ class Command(BaseCommand):
                 old_top_creators.delete()
                 logger.info(f"adding {len(top_creators)} new creators")
                 TopCreator.objects.bulk_create(top_creators, batch_size=100)
+            cache.bump_leaderboard_version(cache.TOP_CREATORS, contest.id)
             score_details.sort(reverse=True, key=top_creator_comparator)
             logger.info(f"summary of top 30: \n{pd.DataFrame(score_details[:30])}")
 
-    def _get_score(self, movies, contest):
-        score = {
-            "score": 0,
-            "recommend_count": 0,
-        }
-        avg_jury_rating = round(
-            sum((movie.jury_rating or 0) for movie in movies) / len(movies), 2
-        )
-        avg_audience_rating = round(
-            sum((movie.audience_rating or 0) for movie in movies) / len(movies), 2
+    def _get_movies(self, contest):
+        """published movies of the contest with their review and recommend counts"""
+        movies = pd.DataFrame.from_records(
+            contest.movies.filter(state=MOVIE_STATE.PUBLISHED).values(
+                "id", "jury_rating", "audience_rating"
+            ),
+            columns=["id", "jury_rating", "audience_rating"],
+        ).set_index("id")
+        reviews = pd.DataFrame.from_records(
+            Movie.objects.filter(contests=contest, state=MOVIE_STATE.PUBLISHED)
+            .annotate(reviews_count=Count("reviews"))
+            .values("id", "reviews_count"),
+            columns=["id", "reviews_count"],
+        ).set_index("id")
+        recommends = pd.DataFrame.from_records(
+            MovieList.movies.through.objects.filter(movielist__contest=contest)
+            .values("movie_id")
+            .annotate(
+                celeb_recomms=Count(
+                    "id", filter=Q(movielist__owner__profile__is_celeb=True)
+                ),
+                non_celeb_recomms=Count(
+                    "id", filter=Q(movielist__owner__profile__is_celeb=False)
+                ),
+            )
+            .values("movie_id", "celeb_recomms", "non_celeb_recomms"),
+            columns=["movie_id", "celeb_recomms", "non_celeb_recomms"],
+        ).set_index("movie_id")
+        movies = movies.join(reviews).join(recommends)
+        movies[["jury_rating", "audience_rating"]] = (
+            movies[["jury_rating", "audience_rating"]].astype(float).fillna(0)
         )
+        counts = ["reviews_count", "celeb_recomms", "non_celeb_recomms"]
+        movies[counts] = movies[counts].fillna(0).astype(int)
+        return movies
 
-        no_audience_rating = min(
-            sum(movie.reviews.count() for movie in movies) / len(movies),
-            MAX_AUDIENCE_RATINGS,
+    def _get_directors(self, contest):
+        """(profile_id, movie_id) of the directors of published contest movies,
+        in the order movies are listed in the contest"""
+        return pd.DataFrame.from_records(
+            CrewMember.objects.filter(
+                movie__contests=contest,
+                movie__state=MOVIE_STATE.PUBLISHED,
+                role=registry.get_director_role(),
+            )
+            .order_by("movie__publish_on", "movie_id", "id")
+            .values("profile_id", "movie_id"),
+            columns=["profile_id", "movie_id"],
         )
 
-        non_celeb_recomms = sum(
-            movie.in_lists.filter(
-                contest=contest, owner__profile__is_celeb=False
-            ).count()
-            for movie in movies
+    def _get_names(self, profile_ids):
+        return {
+            profile_id: f"{first_name} {last_name}".strip()
+            for profile_id, first_name, last_name in Profile.objects.filter(
+                id__in=profile_ids
+            ).values_list("id", "user__first_name", "user__last_name")
+        }
+
+    def _get_scores(self, contest, movies):
+        directors = self._get_directors(contest)
+        columns = ["profile_id", "name", "score", "recommend_count"]
+        if directors.empty:
+            return pd.DataFrame(columns=columns)
+
+        pairs = directors.join(movies, on="movie_id")
+        grouped = pairs.groupby("profile_id", sort=False)
+        scores = grouped.agg(
+            movies=("movie_id", "count"),
+            jury_rating=("jury_rating", _sum),
+            audience_rating=("audience_rating", _sum),
+            reviews_count=("reviews_count", "sum"),
+            celeb_recomms=("celeb_recomms", "sum"),
+            non_celeb_recomms=("non_celeb_recomms", "sum"),
         )
-        celeb_recomms = sum(
-            movie.in_lists.filter(
-                contest=contest, owner__profile__is_celeb=True
-            ).count()
-            for movie in movies
+        count = scores["movies"]
+
+        avg_jury_rating = _round(scores["jury_rating"] / count)
+        avg_audience_rating = _round(scores["audience_rating"] / count)
+        no_audience_rating = (scores["reviews_count"] / count).clip(
+            upper=MAX_AUDIENCE_RATINGS
         )
-        avg_non_celeb_recomms = round(non_celeb_recomms / len(movies), 2)
-        avg_celeb_recomms = round(celeb_recomms / len(movies), 2)
+        avg_non_celeb_recomms = _round(scores["non_celeb_recomms"] / count)
+        avg_celeb_recomms = _round(scores["celeb_recomms"] / count)
 
         # 20% avg jury
-        jury_score = avg_jury_rating * 0.2
+        scores["jury"] = avg_jury_rating * 0.2
         # 10% avg audience
-        audience_score = avg_audience_rating * 0.1
+        scores["audience"] = avg_audience_rating * 0.1
         # 10% avg audience rating count
-        no_audience_score = no_audience_rating / MAX_AUDIENCE_RATINGS
+        scores["no. rating"] = no_audience_rating / MAX_AUDIENCE_RATINGS
         # 30% non celeb recommends
-        non_celeb_recomms_score = min((avg_non_celeb_recomms * 0.025), 10) * 0.3
+        scores["nc recs"] = (avg_non_celeb_recomms * 0.025).clip(upper=10) * 0.3
         # 30% celeb recommends
-        celeb_recomms_score = min((avg_celeb_recomms * 2), 10) * 0.3
-        logger.debug(
-            f"celeb_recomms_score: {celeb_recomms_score} non_celeb_recomms_score:{non_celeb_recomms_score}"
-        )
+        scores["c recs"] = (avg_celeb_recomms * 2).clip(upper=10) * 0.3
 
-        scores = [
-            jury_score,
-            audience_score,
-            no_audience_score,
-            celeb_recomms_score,
-            non_celeb_recomms_score,
-        ]
-        names = [
-            "jury",
-            "audience",
-            "no. rating",
-            "c recs",
-            "nc recs",
-        ]
-        detail_score = dict(zip(names, scores))
         composite_score = (
-            jury_score
-            + audience_score
-            + no_audience_score
-            + celeb_recomms_score
-            + non_celeb_recomms_score
+            scores["jury"]
+            + scores["audience"]
+            + scores["no. rating"]
+            + scores["c recs"]
+            + scores["nc recs"]
+        )
+        scores["score"] = _round(composite_score * 10)
+        scores["recommend_count"] = (
+            scores["non_celeb_recomms"] + scores["celeb_recomms"]
         )
-        logger.debug(f"composite_score {composite_score}")
-        score["score"] = round(
-            composite_score * 10,
-            2,
+        scores = scores.reset_index()
+        scores["name"] = scores["profile_id"].map(
+            self._get_names(scores["profile_id"].tolist())
         )
-        score["recommend_count"] = non_celeb_recomms + celeb_recomms
-        return score, detail_score
-
-    def _get_movies_by_director(self, contest):
-        movies_by_director = defaultdict(list)
-        for movie in contest.movies.filter(state=MOVIE_STATE.PUBLISHED).all():
-            directors = self._get_directors(movie)
-
-            for director in directors:
-                movies_by_director[director].append(movie)
-        return movies_by_director
-
-    def _get_directors(self, movie):
-        return [
-            dir_role.profile
-            for dir_role in CrewMember.objects.filter(
-                movie=movie, role__name="Director"
-            ).all()
-        ]
+        return scores[columns + ["jury", "audience", "no. rating", "c recs", "nc recs"]]
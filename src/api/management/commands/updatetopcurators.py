@@ -1,90 +1,171 @@
 # Updates Top curators for live contests
 
+from collections import defaultdict
+from hashlib import sha256
 from django.core.management.base import BaseCommand
-from api.models import TopCurator, Contest
+from django.db.models import Count
+from api import cache
+from api.models import MovieList, TopCurator, Contest
 from logging import getLogger
 from django.utils import timezone
 from django.db import transaction
-from itertools import chain
 
 logger = getLogger(__name__)
 
 
 class Command(BaseCommand):
+    """Ranks the audience curators of every live contest.
+
+    Curators are scored from movie id sets and like counts of their recommend
+    lists loaded in bulk. Only the lists changed since the last run (see
+    `MovieList.updated_at` and `Contest.top_curators_updated_at`) are rescored,
+    unless the celeb recommends or max recommends of the contest changed, as
+    every score depends on them. Only the changed `TopCurator` rows are written.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="rescore every curator ignoring the last run watermark",
+        )
+
     def handle(self, *args, **options):
         now = timezone.now()
         live_contests = Contest.objects.filter(start__lte=now, end__gte=now).all()
         logger.info(f"Live contests: {len(live_contests)}")
         for contest in live_contests:
-            curators = []
             logger.info(f"Contest: {contest.name}")
-            recommend_lists = (
-                contest.movie_lists.all()
-                .prefetch_related("owner__profile")
-                .prefetch_related("movies")
+            self.update_contest(contest, now, options["full"])
+
+    def update_contest(self, contest, now, full=False):
+        recommend_lists = list(
+            contest.movie_lists.filter(owner__profile__isnull=False).values_list(
+                "id", "owner__profile__id", "owner__profile__is_celeb", "updated_at"
+            )
+        )
+        celeb_list_ids = [rl[0] for rl in recommend_lists if rl[2]]
+        # duplicates are kept, a movie recommended by two celebs counts twice
+        celeb_movie_ids = sorted(
+            MovieList.movies.through.objects.filter(
+                movielist_id__in=celeb_list_ids
+            ).values_list("movie_id", flat=True)
+        )
+        logger.info(f"{len(celeb_movie_ids)} movies recommended by celebs")
+        audience_lists = {
+            profile_id: (list_id, updated_at)
+            for list_id, profile_id, is_celeb, updated_at in recommend_lists
+            if not is_celeb
+        }
+        logger.info(f"{len(audience_lists)} people recommended movies")
+
+        fingerprint = self._get_fingerprint(contest, celeb_movie_ids)
+        existing = {tc.profile_id: tc for tc in contest.top_curators.all()}
+        full = (
+            full
+            or contest.top_curators_updated_at is None
+            or contest.top_curators_fingerprint != fingerprint
+        )
+        stale_list_ids = [
+            list_id
+            for profile_id, (list_id, updated_at) in audience_lists.items()
+            if full
+            or profile_id not in existing
+            or updated_at >= contest.top_curators_updated_at
+        ]
+        logger.info(f"rescoring {len(stale_list_ids)} curators, full: {full}")
+
+        scores = self._get_scores(contest, stale_list_ids, celeb_movie_ids)
+        curators = []
+        for profile_id, (list_id, _) in audience_lists.items():
+            curator = existing.pop(profile_id, None) or TopCurator(
+                profile_id=profile_id, contest=contest
+            )
+            curators.append((list_id, curator, scores.get(list_id)))
+        removed = [tc.id for tc in existing.values()]
+
+        curators.sort(
+            key=lambda row: (
+                -(row[2]["score"] if row[2] else row[1].score),
+                row[0],
+            )
+        )
+        changed = []
+        created = []
+        for pos, (_, curator, score) in enumerate(curators, start=1):
+            values = dict(score or {}, pos=pos)
+            if all(getattr(curator, key) == value for key, value in values.items()):
+                continue
+            for key, value in values.items():
+                setattr(curator, key, value)
+            (changed if curator.pk else created).append(curator)
+
+        with transaction.atomic():
+            logger.info(f"deleting {len(removed)} curators")
+            TopCurator.objects.filter(id__in=removed).delete()
+            logger.info(f"updating {len(changed)} curators")
+            TopCurator.objects.bulk_update(
+                changed, ["likes_on_recommend", "match", "score", "pos"], batch_size=100
+            )
+            logger.info(f"inserting {len(created)} new curators")
+            TopCurator.objects.bulk_create(created, batch_size=100)
+            contest.top_curators_updated_at = now
+            contest.top_curators_fingerprint = fingerprint
+            contest.save(
+                update_fields=["top_curators_updated_at", "top_curators_fingerprint"]
             )
-            celeb_recommend_lists = [
-                rl for rl in recommend_lists if rl.owner.profile.is_celeb
-            ]
-            celeb_recommend_movies = list(
-                chain(*[crl.movies.all() for crl in celeb_recommend_lists])
+        cache.bump_leaderboard_version(cache.TOP_CURATORS, contest.id)
+
+    def _get_fingerprint(self, contest, celeb_movie_ids):
+        value = f"{contest.max_recommends}:{','.join(map(str, celeb_movie_ids))}"
+        return sha256(value.encode()).hexdigest()
+
+    def _get_scores(self, contest, list_ids, celeb_movie_ids):
+        """score details by list id"""
+        movie_ids = defaultdict(set)
+        for list_id, movie_id in MovieList.movies.through.objects.filter(
+            movielist_id__in=list_ids
+        ).values_list("movielist_id", "movie_id"):
+            movie_ids[list_id].add(movie_id)
+        likes = dict(
+            MovieList.liked_by.through.objects.filter(movielist_id__in=list_ids)
+            .values("movielist_id")
+            .annotate(likes=Count("id"))
+            .values_list("movielist_id", "likes")
+        )
+        celeb_movies = set(celeb_movie_ids)
+
+        scores = {}
+        for list_id in list_ids:
+            recommended_movies = movie_ids[list_id]
+            list_likes = likes.get(list_id, 0)
+
+            # Recommendation Weight: No. of recommendations made/Max. Reco
+            recommend_wt = 0
+            if contest.max_recommends:
+                recommend_wt = len(recommended_movies) / contest.max_recommends
+
+            match_count = len(recommended_movies & celeb_movies)
+            # Match accuracy: No. of matched recommendations/No. of recommendations made
+            match_accuracy = 0
+            if recommended_movies:
+                match_accuracy = match_count / len(recommended_movies)
+
+            # Celebrity Match accuracy: No. of matched reco./Total films on celebrity List
+            match_accuracy_with_celeb = 0
+            if celeb_movie_ids:
+                match_accuracy_with_celeb = match_count / len(celeb_movie_ids)
+
+            likes_for_calc = list_likes / 10**6
+
+            # Composite Score (A): Reco. Wt. * Match Accuracy * Match accuracy with celeb
+            score = (
+                likes_for_calc
+                + recommend_wt * match_accuracy * match_accuracy_with_celeb
             )
-            logger.info(f"{len(celeb_recommend_movies)} movies recommended by celebs")
-            audience_recommend_lists = [
-                rl for rl in recommend_lists if not rl.owner.profile.is_celeb
-            ]
-            logger.info(f"{len(audience_recommend_lists)} people recommended movies")
-            for recommend_list in audience_recommend_lists:
-                likes = recommend_list.liked_by.count()
-                recommended_movies = recommend_list.movies.all()
-
-                # Recommendation Weight: No. of recommendations made/Max. Reco
-                recommend_wt = 0
-                if contest.max_recommends:
-                    recommend_wt = len(recommended_movies) / contest.max_recommends
-
-                match_count = len(
-                    set(recommended_movies).intersection(celeb_recommend_movies)
-                )
-                # Match accuracy: No. of matched recommendations/No. of recommendations made
-                match_accuracy = 0
-                if recommended_movies:
-                    match_accuracy = match_count / len(recommended_movies)
-
-                # Celebrity Match accuracy: No. of matched reco./Total films on celebrity List
-                match_accuracy_with_celeb = 0
-                if celeb_recommend_movies:
-                    match_accuracy_with_celeb = match_count / len(
-                        celeb_recommend_movies
-                    )
-
-                likes_for_calc = likes / 10**6
-
-                # Composite Score (A): Reco. Wt. * Match Accuracy * Match accuracy with celeb
-                score = (
-                    likes_for_calc
-                    + recommend_wt * match_accuracy * match_accuracy_with_celeb
-                )
-                score = round(score, 6)
-
-                match_percent_for_ui = int(match_accuracy_with_celeb * 100)
-                curators.append(
-                    {
-                        "profile_id": recommend_list.owner.profile.id,
-                        "contest_id": contest.id,
-                        "likes_on_recommend": likes,
-                        "match": match_percent_for_ui,
-                        "score": score,
-                    }
-                )
-
-            curators = sorted(curators, key=lambda x: x.get("score"), reverse=True)
-            curators = [
-                TopCurator(pos=pos + 1, **data) for pos, data in enumerate(curators)
-            ]
-            with transaction.atomic():
-                logger.info("deleting top curators")
-                contest.top_curators.all().delete()
-
-                logger.info(f"inserting {len(curators)} new curators")
-                TopCurator.objects.bulk_create(curators, batch_size=100)
+            scores[list_id] = {
+                "likes_on_recommend": list_likes,
+                "match": int(match_accuracy_with_celeb * 100),
+                "score": round(score, 6),
+            }
+        return scores
@@ -0,0 +1,12 @@
+from api import counters
+
+
+class CounterMiddleware:
+    """coalesces the counter changes of a request into a few UPDATEs"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with counters.coalesce():
+            return self.get_response(request)
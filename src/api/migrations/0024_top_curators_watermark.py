@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0023_auto_20240121_2236"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contest",
+            name="top_curators_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="contest",
+            name="top_curators_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="movielist",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
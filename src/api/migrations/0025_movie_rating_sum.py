@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:48
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def load_rating_sums(apps, schema_editor):
+    Movie = apps.get_model("api", "Movie")
+    MovieRateReview = apps.get_model("api", "MovieRateReview")
+    ratings = (
+        MovieRateReview.objects.filter(rating__isnull=False)
+        .values("movie_id")
+        .annotate(rating_sum=Sum("rating"), rating_count=Count("id"))
+    )
+    for row in ratings:
+        Movie.objects.filter(id=row["movie_id"]).update(
+            rating_sum=row["rating_sum"], rating_count=row["rating_count"]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0024_top_curators_watermark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="rating_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="movie",
+            name="rating_sum",
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(load_rating_sums, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:03
+
+from collections import defaultdict
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# api.search as of this migration
+MIN_PREFIX = 2
+MAX_PREFIX = 20
+TITLE_WEIGHT = 2
+NAME_WEIGHT = 1
+
+
+def tokenize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text.lower())
+
+
+def get_entries(SearchEntry, kind, object_id, weighted_texts):
+    weights = {}
+    for text, weight in weighted_texts:
+        for word in tokenize(text):
+            for end in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+                prefix = word[:end]
+                prefix_weight = weight * end / len(word)
+                weights[prefix] = max(weights.get(prefix, 0), prefix_weight)
+    return [
+        SearchEntry(kind=kind, object_id=object_id, prefix=prefix, weight=weight)
+        for prefix, weight in weights.items()
+    ]
+
+
+def load_search_entries(apps, schema_editor):
+    Movie = apps.get_model("api", "Movie")
+    CrewMember = apps.get_model("api", "CrewMember")
+    Profile = apps.get_model("api", "Profile")
+    SearchEntry = apps.get_model("api", "SearchEntry")
+    entries = []
+    names = defaultdict(list)
+    crew = CrewMember.objects.filter(movie__state="P").values_list(
+        "movie_id", "profile__user__first_name", "profile__user__last_name"
+    )
+    for movie_id, first_name, last_name in crew:
+        names[movie_id] += [(first_name, NAME_WEIGHT), (last_name, NAME_WEIGHT)]
+    titles = Movie.objects.filter(state="P").values_list("id", "title")
+    for movie_id, title in titles.iterator():
+        entries += get_entries(
+            SearchEntry, "M", movie_id, [(title, TITLE_WEIGHT), *names[movie_id]]
+        )
+    profiles = Profile.objects.values_list("id", "user__first_name", "user__last_name")
+    for profile_id, first_name, last_name in profiles.iterator():
+        entries += get_entries(
+            SearchEntry,
+            "P",
+            profile_id,
+            [(first_name, TITLE_WEIGHT), (last_name, TITLE_WEIGHT)],
+        )
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0025_movie_rating_sum"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("M", "Movie"), ("P", "Profile")], max_length=1
+                    ),
+                ),
+                ("object_id", models.IntegerField()),
+                ("prefix", models.CharField(max_length=20)),
+                ("weight", models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="searchentry",
+            index=models.Index(
+                fields=["kind", "prefix"], name="api_searche_kind_4ef74e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchentry",
+            index=models.Index(
+                fields=["kind", "object_id"], name="api_searche_kind_9639a6_idx"
+            ),
+        ),
+        migrations.RunPython(load_search_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def load_directors(apps, schema_editor):
+    Movie = apps.get_model("api", "Movie")
+    CrewMember = apps.get_model("api", "CrewMember")
+    directors = {}
+    memberships = (
+        CrewMember.objects.filter(role__name="Director")
+        .order_by("-id")
+        .values_list("movie_id", "profile_id")
+    )
+    # the first membership of each movie wins
+    for movie_id, profile_id in memberships:
+        directors[movie_id] = profile_id
+    movies = [
+        Movie(id=movie_id, director_id=profile_id)
+        for movie_id, profile_id in directors.items()
+    ]
+    Movie.objects.bulk_update(movies, ["director"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0026_search_entry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="director",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="directed_movies",
+                to="api.profile",
+            ),
+        ),
+        migrations.RunPython(load_directors, migrations.RunPython.noop),
+    ]
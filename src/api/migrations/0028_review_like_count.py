@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def load_like_counts(apps, schema_editor):
+    MovieRateReview = apps.get_model("api", "MovieRateReview")
+    likes = (
+        MovieRateReview.objects.annotate(likes=Count("liked_by"))
+        .filter(likes__gt=0)
+        .values_list("id", "likes")
+    )
+    reviews = [
+        MovieRateReview(id=review_id, like_count=count) for review_id, count in likes
+    ]
+    MovieRateReview.objects.bulk_update(reviews, ["like_count"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0027_movie_director"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movieratereview",
+            name="like_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="movieratereview",
+            index=models.Index(
+                fields=["movie", "-like_count", "-published_at"],
+                name="api_moviera_movie_i_3ac470_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movieratereview",
+            index=models.Index(
+                fields=["-like_count", "-published_at"],
+                name="api_moviera_like_co_e6d2fd_idx",
+            ),
+        ),
+        migrations.RunPython(load_like_counts, migrations.RunPython.noop),
+    ]
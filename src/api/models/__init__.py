@@ -1,6 +1,7 @@
 from .payment import Order, Package, PackageAttribute, PackageAttributeValue
 from .profile import Role, Profile, User
 from .others import Notification
+from .search import SearchEntry
 from .contest import (
     ContestType,
     Contest,
@@ -43,4 +44,5 @@ __all__ = [
     "TopCreator",
     "TopCurator",
     "Release",
+    "SearchEntry",
 ]
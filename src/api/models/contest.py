@@ -44,6 +44,9 @@ class Contest(models.Model):
     max_recommends = models.IntegerField(default=20)
     visible_in_top_creators = models.BooleanField(default=False)
     visible_in_home_page = models.BooleanField(default=False)
+    # watermark and celeb recommends fingerprint of the last updatetopcurators run
+    top_curators_updated_at = models.DateTimeField(null=True, blank=True)
+    top_curators_fingerprint = models.CharField(max_length=64, blank=True, default="")
 
     def __str__(self):
         return self.name
@@ -0,0 +1,98 @@
+from copy import deepcopy
+
+from django.db import models
+
+
+class ChangeTrackingMixin(models.Model):
+    """Keeps the values of the concrete fields as they were loaded from or
+    last saved to the database.
+
+    `dirty_fields` are the fields changed since and `get_loaded` gives the
+    stored value of a field. Saving an instance loaded from the database
+    writes only the dirty fields (and `auto_now` fields) unless
+    `update_fields` is given, nothing is written when nothing changed.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _take_snapshot(self, field_names=None):
+        """store the current values of the fields, of all of them unless
+        field_names are given"""
+        fields = self._meta.concrete_fields
+        if field_names is not None and hasattr(self, "_loaded_values"):
+            fields = [self._meta.get_field(name) for name in field_names]
+        else:
+            self._loaded_values = {}
+        for field in fields:
+            if field.attname in self.__dict__:
+                self._loaded_values[field.attname] = deepcopy(
+                    self.__dict__[field.attname]
+                )
+
+    @property
+    def dirty_fields(self):
+        """names of the fields changed since the instance was loaded or saved,
+        every field when the instance isn't from the database"""
+        loaded = getattr(self, "_loaded_values", None)
+        fields = [f for f in self._meta.concrete_fields if not f.primary_key]
+        if loaded is None:
+            return [field.name for field in fields]
+        return [
+            field.name
+            for field in fields
+            if field.attname in self.__dict__
+            and (
+                field.attname not in loaded
+                or self.__dict__[field.attname] != loaded[field.attname]
+            )
+        ]
+
+    def has_changed(self, field_name):
+        return field_name in self.dirty_fields
+
+    def get_loaded(self, field_name):
+        """value of the field in the database, queried when the instance
+        wasn't loaded from it"""
+        attname = self._meta.get_field(field_name).attname
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is not None and attname in loaded:
+            return loaded[attname]
+        if self.pk is None:
+            return None
+        return (
+            type(self)
+            ._base_manager.filter(pk=self.pk)
+            .values_list(attname, flat=True)
+            .first()
+        )
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not self._state.adding
+            and self.pk is not None
+            and getattr(self, "_loaded_values", None) is not None
+        ):
+            dirty_fields = self.dirty_fields
+            if dirty_fields:
+                dirty_fields += [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if getattr(field, "auto_now", False)
+                ]
+            kwargs["update_fields"] = set(dirty_fields)
+        super().save(*args, **kwargs)
+        self._take_snapshot(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._take_snapshot(fields)
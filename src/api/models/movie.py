@@ -8,6 +8,7 @@ from api.constants import (
     REVIEW_STATE,
     CREW_MEMBER_REQUEST_STATE,
 )
+from .mixins import ChangeTrackingMixin
 
 logger = getLogger("api.models")
 
@@ -40,7 +41,7 @@ class MoviePoster(models.Model):
     movie = models.ForeignKey("Movie", on_delete=models.CASCADE)
 
 
-class Movie(models.Model):
+class Movie(ChangeTrackingMixin, models.Model):
     MOVIE_STATE_CHOICES = (
         (MOVIE_STATE.CREATED, "Created"),
         (MOVIE_STATE.SUBMITTED, "Submitted"),
@@ -57,6 +58,14 @@ class Movie(models.Model):
     crew = models.ManyToManyField(
         "Profile", through="CrewMember", related_name="movies"
     )
+    # cached profile of the first Director crew member, see api.signals
+    director = models.ForeignKey(
+        "Profile",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="directed_movies",
+    )
 
     state = models.CharField(max_length=1, choices=MOVIE_STATE_CHOICES)
     title = models.CharField(max_length=100)
@@ -81,8 +90,10 @@ class Movie(models.Model):
     # the time at which the movie's state was changed to published
     publish_on = models.DateTimeField(null=True, blank=True)
     jury_rating = models.FloatField(null=True, blank=True, default=0)
-    # cached audience rating to be updated periodically
+    # cached average of the ratings, rating_sum / rating_count, see api.counters
     audience_rating = models.FloatField(null=True, blank=True, default=0)
+    rating_sum = models.FloatField(default=0)
+    rating_count = models.IntegerField(default=0)
     # after release model contests become a cached value
     contests = models.ManyToManyField("Contest", related_name="movies", blank=True)
 
@@ -176,6 +187,9 @@ class MovieList(models.Model):
         blank=True,
         related_name="movie_lists",
     )
+    # bumped on save and whenever movies or likes of the list change,
+    # used by updatetopcurators to rescore only the lists changed since its last run
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = [["owner", "name"]]
@@ -209,9 +223,23 @@ class MovieRateReview(models.Model):
     # is nullable since user might review the movie first before rating or may choose to not rate at all
     rating = models.FloatField(null=True, blank=True)
     liked_by = models.ManyToManyField(User, related_name="liked_reviews", blank=True)
+    # cached number of liked_by, see api.counters
+    like_count = models.IntegerField(default=0)
 
     class Meta:
         unique_together = [["movie", "author"]]
+        # the review feeds, of a movie and of all movies
+        indexes = [
+            models.Index(fields=["movie", "-like_count", "-published_at"]),
+            models.Index(fields=["-like_count", "-published_at"]),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # rating as stored, used to update the movie's rating sum on save
+        instance._loaded_rating = instance.rating
+        return instance
 
 
 class TopCreator(models.Model):
@@ -5,6 +5,7 @@ from django.contrib.auth.models import User
 
 from api.constants import MOVIE_STATE, ORDER_STATE
 from api.email import TEMPLATES, email_trigger
+from .mixins import ChangeTrackingMixin
 
 
 logger = getLogger(__name__)
@@ -43,7 +44,7 @@ class PackageAttributeValue(models.Model):
         return f"{self.package.name}: {self.value}"
 
 
-class Order(models.Model):
+class Order(ChangeTrackingMixin, models.Model):
     ORDER_STATES = (
         (ORDER_STATE.CREATED, "Created"),
         (ORDER_STATE.SUBMITTED, "Submitted"),
@@ -76,17 +77,18 @@ class Order(models.Model):
     def save(self, **kwargs):
         old_payment_id = None
         if self.id:
-            old_order = Order.objects.get(id=self.id)
-            old_payment_id = old_order.payment_id
-        super().save(**kwargs)
+            old_payment_id = self.get_loaded("payment_id")
         new_payment_id = self.payment_id
         has_completed_payment = bool(not old_payment_id and new_payment_id)
         logger.info(f"payment complete: {has_completed_payment}")
+        if has_completed_payment:
+            self.state = ORDER_STATE.SUBMITTED
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "state"}
+        super().save(**kwargs)
         # TODO: detect the case where user is adding a new movie but not making a new payment (utilizing his credit) and
         # update the movie state and trigger emails
         if has_completed_payment:
-            self.state = ORDER_STATE.SUBMITTED
-            super().save(**kwargs)
             movies = self._update_movies_state()
             self._trigger_submit_email(movies)
 
@@ -97,7 +99,11 @@ class Order(models.Model):
         # 3 - handles future use case of having multiple movies under one order (multiple new movie in CREATED state)
         # as of now we should have only one movie with CREATED state in self.movies
         # however the logic should work for all the above scenarios
-        created_movies = self.movies.filter(state=MOVIE_STATE.CREATED).all()
+        created_movies = (
+            self.movies.filter(state=MOVIE_STATE.CREATED)
+            .select_related("director__user")
+            .all()
+        )
         for movie in created_movies:
             movie.state = MOVIE_STATE.SUBMITTED
             movie.save()
@@ -105,9 +111,9 @@ class Order(models.Model):
 
     def _trigger_submit_email(self, movies):
         for movie in movies:
-            director = (
-                movie.crewmember_set.filter(role__name="Director").first().profile.user
-            )
+            # movies submitted without a director crew member have no
+            # director to ask for an approval
+            director = movie.director.user if movie.director else self.owner
             email_trigger(self.owner, TEMPLATES.WELCOME_MDFF, movie=movie)
             if director == self.owner:
                 logger.debug("Submission by Director")
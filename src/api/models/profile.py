@@ -3,6 +3,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from api.constants import GENDER
 from api.email import email_trigger, TEMPLATES
+from .mixins import ChangeTrackingMixin
 
 logger = getLogger("api.model")
 
@@ -14,7 +15,7 @@ class Role(models.Model):
         return self.name
 
 
-class Profile(models.Model):
+class Profile(ChangeTrackingMixin, models.Model):
     GENDER_CHOICES = (
         (GENDER.MALE, "Male"),
         (GENDER.FEMALE, "Female"),
@@ -69,9 +70,7 @@ class Profile(models.Model):
         is_new = self.id is None
         new_onboarding = is_new and self.onboarded
         old_onboarding = (
-            not is_new
-            and not Profile.objects.get(pk=self.id).onboarded
-            and self.onboarded
+            not is_new and self.onboarded and not self.get_loaded("onboarded")
         )
         super().save(*args, **kwargs)
 
@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """Inverted index of movies and profiles, one row per prefix of the words
+    of an object, maintained by `api.search`"""
+
+    MOVIE = "M"
+    PROFILE = "P"
+    KIND_CHOICES = (
+        (MOVIE, "Movie"),
+        (PROFILE, "Profile"),
+    )
+
+    kind = models.CharField(max_length=1, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    prefix = models.CharField(max_length=20)
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "prefix"]),
+            models.Index(fields=["kind", "object_id"]),
+        ]
@@ -0,0 +1,166 @@
+"""Opt-in keyset pagination.
+
+Lists keep their limit/offset pagination, clients opt in to keyset
+pagination by passing `cursor` (empty for the first page). Pages are then
+read after the last row of the previous page on the ordering of the list with
+`id` added as the last key, so any page costs the same as the first one and
+no `COUNT(*)` is run. Null values are ordered last on every key.
+
+The response has `next` (null on the last page) and `results`.
+"""
+
+import base64
+import datetime
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """keeps the microseconds of times, rows tied on a time would be skipped"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(LimitOffsetPagination):
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (
+            self.cursor_query_param not in request.query_params
+            or not isinstance(queryset, QuerySet)
+            or queryset.query.is_sliced
+        ):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.keyset = self._get_keyset(queryset)
+        self.limit = self.get_limit(request)
+        queryset = queryset.order_by(
+            *[
+                (
+                    F(name).desc(nulls_last=True)
+                    if descending
+                    else F(name).asc(nulls_last=True)
+                )
+                for name, descending in self.keyset
+            ]
+        )
+        values = self._decode_cursor(
+            queryset, request.query_params[self.cursor_query_param]
+        )
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+        rows = list(queryset[: self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[: self.limit]
+        self.last_values = (
+            [self._get_value(rows[-1], name) for name, _ in self.keyset]
+            if rows
+            else None
+        )
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_next_link(self):
+        if self.keyset is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(self.last_values, cls=_CursorEncoder).encode()
+        ).decode()
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if self.keyset is None:
+            return super().get_previous_link()
+        return None
+
+    def _get_keyset(self, queryset):
+        """[(name, descending)] of the ordering of queryset with id last"""
+        query = queryset.query
+        ordering = query.order_by or (
+            query.get_meta().ordering if query.default_ordering else []
+        )
+        keyset = []
+        for name in ordering:
+            if not isinstance(name, str) or name == "?":
+                raise NotFound("The list can't be paginated with a cursor")
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+            keyset.append(("id" if name == "pk" else name, descending))
+        if "id" not in [name for name, _ in keyset]:
+            keyset.append(("id", False))
+        return keyset
+
+    def _decode_cursor(self, queryset, cursor):
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.keyset):
+                raise ValueError()
+            return [
+                self._to_python(queryset.model, name, value)
+                for (name, _), value in zip(self.keyset, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _to_python(model, name, value):
+        if value is None or "__" in name:
+            return value
+        try:
+            return model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            # annotation
+            return value
+
+    @staticmethod
+    def _get_value(row, name):
+        value = row
+        for attribute in name.split("__"):
+            value = getattr(value, attribute, None)
+        return value
+
+    def _after(self, values):
+        """rows after `values` on the keyset, nulls being last"""
+        conditions = []
+        for index, ((name, descending), value) in enumerate(zip(self.keyset, values)):
+            if value is not None:
+                after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                after |= Q(**{f"{name}__isnull": True})
+                conditions.append(
+                    reduce(and_, [*self._equals(values, index), after], Q())
+                )
+        return reduce(or_, conditions)
+
+    def _equals(self, values, index):
+        return [
+            Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+            for (name, _), value in zip(self.keyset[:index], values)
+        ]
@@ -0,0 +1,116 @@
+"""Writes to the recommend lists of a user.
+
+Membership in the personal list is checked with an `exists()` on the through
+table, which is served by its unique (movielist, movie) index, so the cost
+doesn't grow with the size of the list. Contest lists hold at most
+`Contest.max_recommends` movies, their row is locked while the quota is
+checked so concurrent recommends can't both pass it.
+
+The m2m manager writes the rows, its `m2m_changed` receivers (see
+`api.signals`) update `Movie.recommend_count` with an `F()` expression and
+bump the list's `updated_at`.
+"""
+
+from django.db import transaction
+
+from api.constants import RECOMMENDATION
+from api.models import MovieList
+
+Recommend = MovieList.movies.through
+
+
+def _memberships(user, movie_id):
+    return Recommend.objects.filter(
+        movielist__owner=user, movielist__name=RECOMMENDATION, movie_id=movie_id
+    )
+
+
+def get_recommended_ids(user, movie_ids):
+    """ids of the movies among `movie_ids` in the user's recommend list"""
+    return set(
+        Recommend.objects.filter(
+            movielist__owner=user,
+            movielist__name=RECOMMENDATION,
+            movie_id__in=movie_ids,
+        ).values_list("movie_id", flat=True)
+    )
+
+
+def recommend(user, movie_id):
+    """adds the movie to the user's recommend list, False when it was there"""
+    if _memberships(user, movie_id).exists():
+        return False
+    movie_list, _ = MovieList.objects.get_or_create(name=RECOMMENDATION, owner=user)
+    movie_list.movies.add(movie_id)
+    return True
+
+
+def unrecommend(user, movie_id):
+    """removes the movie from the user's recommend list, False when it wasn't
+    there"""
+    membership = _memberships(user, movie_id).select_related("movielist").first()
+    if membership is None:
+        return False
+    membership.movielist.movies.remove(movie_id)
+    return True
+
+
+def recommend_all(user, movie_ids):
+    """adds the movies to the user's recommend list in one write"""
+    if not movie_ids:
+        return
+    movie_list, _ = MovieList.objects.get_or_create(name=RECOMMENDATION, owner=user)
+    movie_list.movies.add(*movie_ids)
+
+
+def unrecommend_all(user, movie_ids):
+    """removes the movies from the user's recommend list in one write"""
+    if not movie_ids:
+        return
+    movie_list = MovieList.objects.filter(name=RECOMMENDATION, owner=user).first()
+    if movie_list is not None:
+        movie_list.movies.remove(*movie_ids)
+
+
+def _contest_movie_ids(movie_list):
+    # bounded by the quota of the contest
+    return set(
+        Recommend.objects.filter(movielist=movie_list).values_list(
+            "movie_id", flat=True
+        )
+    )
+
+
+def recommend_in_contest(user, contest, movie_id):
+    """adds the movie to the user's list of the contest, returns the number of
+    movies recommended in the contest or None when the quota is used up and
+    the movie isn't in the list yet"""
+    with transaction.atomic():
+        movie_list, _ = MovieList.objects.select_for_update().get_or_create(
+            name=contest.name, owner=user, contest=contest
+        )
+        movie_ids = _contest_movie_ids(movie_list)
+        if movie_id in movie_ids:
+            return len(movie_ids)
+        if len(movie_ids) >= contest.max_recommends:
+            return None
+        movie_list.movies.add(movie_id)
+        return len(movie_ids) + 1
+
+
+def unrecommend_in_contest(user, contest, movie_id):
+    """removes the movie from the user's list of the contest, returns the
+    number of movies still recommended in the contest"""
+    with transaction.atomic():
+        movie_list = (
+            MovieList.objects.select_for_update()
+            .filter(name=contest.name, owner=user, contest=contest)
+            .first()
+        )
+        if movie_list is None:
+            return 0
+        movie_ids = _contest_movie_ids(movie_list)
+        if movie_id in movie_ids:
+            movie_list.movies.remove(movie_id)
+            movie_ids.discard(movie_id)
+        return len(movie_ids)
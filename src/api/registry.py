@@ -0,0 +1,91 @@
+"""Process-local registry of reference data.
+
+Near-static tables (genres, languages, mp genres, roles and packages) are
+loaded once per process and served from memory. Each model has a version
+stamp in the cache, saving or deleting a row changes it (see `api.signals`)
+and every process reloads the model on its next lookup, so checking for
+changes costs a cache read instead of a query.
+
+Rows are shared by every request of the process, don't modify them.
+"""
+
+from logging import getLogger
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from api.constants import DIRECTOR
+from api.models import Genre, MovieLanguage, MpGenre, Package, Role
+
+logger = getLogger(__name__)
+
+MODELS = (Genre, MovieLanguage, MpGenre, Package, Role)
+
+_lock = threading.Lock()
+# model => (version, rows)
+_tables = {}
+
+
+def _version_key(model):
+    return f"registry:{model._meta.label_lower}:version"
+
+
+def _get_version(model):
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def get_all(model):
+    """all the rows of the model ordered by id"""
+    version = _get_version(model)
+    table = _tables.get(model)
+    if table is None or table[0] != version:
+        with _lock:
+            table = _tables.get(model)
+            if table is None or table[0] != version:
+                logger.info(f"loading {model._meta.label} {version}")
+                table = _tables[model] = (
+                    version,
+                    tuple(model.objects.order_by("id")),
+                )
+    return table[1]
+
+
+def select(model, **fields):
+    """rows of the model whose attributes equal `fields`"""
+    return [
+        row
+        for row in get_all(model)
+        if all(getattr(row, name) == value for name, value in fields.items())
+    ]
+
+
+def get(model, **fields):
+    """like `QuerySet.get`"""
+    rows = select(model, **fields)
+    if not rows:
+        raise model.DoesNotExist(f"{model._meta.object_name} matching {fields}")
+    if len(rows) > 1:
+        raise model.MultipleObjectsReturned(
+            f"{len(rows)} {model._meta.object_name} matching {fields}"
+        )
+    return rows[0]
+
+
+def get_roles(names):
+    names = set(names)
+    return [role for role in get_all(Role) if role.name in names]
+
+
+def get_director_role():
+    return get(Role, name=DIRECTOR)
+
+
+def invalidate(model):
+    cache.set(_version_key(model), uuid.uuid4().hex, timeout=None)
@@ -0,0 +1,112 @@
+"""Prefix search of published movies (title and crew names) and profiles
+(names).
+
+Every word of the indexed texts is stored in `SearchEntry` once per prefix
+(from `MIN_PREFIX` up to `MAX_PREFIX` characters) with a weight growing with
+the share of the word the prefix covers, so a query is a lookup of the
+query words on the (kind, prefix) index. Objects matching every word are
+ranked by the sum of their weights.
+
+The index is updated by the signal receivers in `api.signals` and rebuilt
+by `rebuildsearchindex`.
+"""
+
+from collections import defaultdict
+import re
+import unicodedata
+
+from django.db.models import Count, Sum
+
+from api.constants import MOVIE_STATE
+from api.models import CrewMember, Movie, Profile, SearchEntry
+
+MIN_PREFIX = 2
+MAX_PREFIX = 20
+TITLE_WEIGHT = 2
+NAME_WEIGHT = 1
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """lower case words of text without accents"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text.lower())
+
+
+def _get_entries(kind, object_id, weighted_texts):
+    weights = {}
+    for text, weight in weighted_texts:
+        for word in tokenize(text):
+            for end in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+                prefix = word[:end]
+                prefix_weight = weight * end / len(word)
+                weights[prefix] = max(weights.get(prefix, 0), prefix_weight)
+    return [
+        SearchEntry(kind=kind, object_id=object_id, prefix=prefix, weight=weight)
+        for prefix, weight in weights.items()
+    ]
+
+
+def index_movies(movie_ids):
+    """replace the entries of the movies, only published movies are indexed"""
+    movie_ids = list(movie_ids)
+    SearchEntry.objects.filter(kind=SearchEntry.MOVIE, object_id__in=movie_ids).delete()
+    titles = dict(
+        Movie.objects.filter(id__in=movie_ids, state=MOVIE_STATE.PUBLISHED).values_list(
+            "id", "title"
+        )
+    )
+    if not titles:
+        return
+    names = defaultdict(list)
+    crew = CrewMember.objects.filter(movie_id__in=titles).values_list(
+        "movie_id", "profile__user__first_name", "profile__user__last_name"
+    )
+    for movie_id, first_name, last_name in crew:
+        names[movie_id] += [(first_name, NAME_WEIGHT), (last_name, NAME_WEIGHT)]
+    entries = []
+    for movie_id, title in titles.items():
+        entries += _get_entries(
+            SearchEntry.MOVIE, movie_id, [(title, TITLE_WEIGHT), *names[movie_id]]
+        )
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def index_profiles(profile_ids):
+    profile_ids = list(profile_ids)
+    SearchEntry.objects.filter(
+        kind=SearchEntry.PROFILE, object_id__in=profile_ids
+    ).delete()
+    entries = []
+    names = Profile.objects.filter(id__in=profile_ids).values_list(
+        "id", "user__first_name", "user__last_name"
+    )
+    for profile_id, first_name, last_name in names:
+        entries += _get_entries(
+            SearchEntry.PROFILE,
+            profile_id,
+            [(first_name, TITLE_WEIGHT), (last_name, TITLE_WEIGHT)],
+        )
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def unindex(kind, object_id):
+    SearchEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def search(kind, query, limit):
+    """ids of the objects matching every word of query, best first"""
+    prefixes = {word[:MAX_PREFIX] for word in tokenize(query)}
+    prefixes = [prefix for prefix in prefixes if len(prefix) >= MIN_PREFIX]
+    if not prefixes:
+        return []
+    return list(
+        SearchEntry.objects.filter(kind=kind, prefix__in=prefixes)
+        .values("object_id")
+        .annotate(matched=Count("id"), score=Sum("weight"))
+        .filter(matched=len(prefixes))
+        .order_by("-score", "object_id")
+        .values_list("object_id", flat=True)[:limit]
+    )
@@ -1,8 +1,9 @@
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from api import recommends
 from api.constants import MOVIE_STATE
-from api.models.movie import MovieList
 from api.models import Contest, Movie
 
 
@@ -20,15 +21,15 @@ class ContestRecommendListSerializer(serializers.ModelSerializer):
         read_only_fields = ["name", "max_recommends", "movies"]
 
     def get_recommended(self, contest):
+        recommended = getattr(self, "_recommended", None)
+        if recommended is not None:
+            return recommended
         request = self.context["request"]
-        try:
-            movie_list = MovieList.objects.get(
-                name=contest.name, contest=contest, owner=request.user
-            )
-        except MovieList.DoesNotExist:
-            return 0
-        else:
-            return movie_list.movies.count()
+        return recommends.Recommend.objects.filter(
+            movielist__name=contest.name,
+            movielist__contest=contest,
+            movielist__owner=request.user,
+        ).count()
 
     def validate_movie(self, movie):
         action = self.context["action"]
@@ -41,23 +42,10 @@ class ContestRecommendListSerializer(serializers.ModelSerializer):
         return movie
 
     def validate(self, attrs):
-        request = self.context["request"]
-        action = self.context["action"]
         if not self.instance.is_live():
             raise ValidationError("Contest is not live")
-        if attrs["movie"] not in self.instance.movies.all():
+        if not self.instance.movies.filter(pk=attrs["movie"].pk).exists():
             raise ValidationError("Film hasn't participated in this contest")
-        movie_list = MovieList.objects.filter(
-            owner=request.user, contest=self.instance
-        ).first()
-        if (
-            action == "add"
-            and movie_list
-            and self.instance.max_recommends <= movie_list.movies.count()
-        ):
-            raise ValidationError(
-                f"You ran out of recommends ({self.instance.max_recommends}/{self.instance.max_recommends}) for {self.instance.name}. Undo the recommends from your profile to continue."
-            )
         return super().validate(attrs)
 
     def update(self, contest, validated_data):
@@ -65,15 +53,20 @@ class ContestRecommendListSerializer(serializers.ModelSerializer):
         action = self.context["action"]
         movie = validated_data["movie"]
 
-        movie_list, _ = MovieList.objects.get_or_create(
-            name=contest.name, owner=user, contest=contest
-        )
         if action == "add":
-            movie_list.movies.add(movie)
-            movie.recommend_count += 1
-            movie.save()
+            self._recommended = recommends.recommend_in_contest(user, contest, movie.id)
+            if self._recommended is None:
+                # the quota is checked here, with the list locked, instead of
+                # in validate so concurrent recommends can't both pass it
+                raise ValidationError(
+                    {
+                        api_settings.NON_FIELD_ERRORS_KEY: [
+                            f"You ran out of recommends ({contest.max_recommends}/{contest.max_recommends}) for {contest.name}. Undo the recommends from your profile to continue."
+                        ]
+                    }
+                )
         elif action == "remove":
-            movie_list.movies.remove(movie)
-            movie.recommend_count = max(movie.recommend_count - 1, 0)
-            movie.save()
+            self._recommended = recommends.unrecommend_in_contest(
+                user, contest, movie.id
+            )
         return contest
@@ -8,18 +8,19 @@ import os
 import re
 
 from django.conf import settings
-from django.db.models import Avg
 from django.db import transaction
 from django.core.files.storage import default_storage
 from rest_framework import serializers
 from collections import defaultdict
+from functools import cached_property
 import razorpay
 
+from api import recommends, registry
 from api.constants import (
+    DIRECTOR,
     MOVIE_STATE,
     CREW_MEMBER_REQUEST_STATE,
     ORDER_STATE,
-    RECOMMENDATION,
 )
 from api.models import (
     User,
@@ -38,6 +39,8 @@ from api.models import (
     Contest,
 )
 from .profile import ProfileSerializer, UserSerializer
+from .utils import PrefetchListSerializer
+from .viewer import ViewerListSerializer, get_viewer
 from api.tasks import create_poster_thumb
 
 logger = getLogger(__name__)
@@ -78,7 +81,7 @@ class MovieLanguageSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         name = validated_data.get("name")
         try:
-            lang = MovieLanguage.objects.get(name=name)
+            lang = registry.get(MovieLanguage, name=name)
             logger.debug(f"language `{name}` exists")
         except MovieLanguage.DoesNotExist:
             lang = MovieLanguage.objects.create(name=name)
@@ -97,7 +100,7 @@ class RoleSerializer(serializers.ModelSerializer):
         fields = ["name"]
 
     def validate_name(self, name):
-        if not Role.objects.filter(name=name).exists():
+        if not registry.select(Role, name=name):
             raise ValidationError(f"Unknown role '{name}'")
         return name
 
@@ -303,12 +306,16 @@ class MovieSerializerSummary(serializers.ModelSerializer):
             "publish_on",
             "runtime",
         ]
+        list_serializer_class = PrefetchListSerializer
+        prefetch_related = [
+            "contests",
+            "crewmember_set__role",
+            "crewmember_set__profile__user",
+        ]
 
     def get_contests(self, obj):
-        contests = obj.contests.values(
-            "name",
-        ).all()
-        return [contest["name"] for contest in contests]
+        # iterate over the related manager so a prefetched page is reused
+        return [contest.name for contest in obj.contests.all()]
 
 
 class ContestSerializer(serializers.ModelSerializer):
@@ -320,17 +327,8 @@ class ContestSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "is_live", "start", "end", "recommended_movies"]
 
     def get_recommended_movies(self, contest):
-        request = self.context.get("request")
-        if not request.user.is_authenticated:
-            return []
-        else:
-            try:
-                movie_list = contest.movie_lists.get(owner=request.user)
-            except MovieList.DoesNotExist:
-                movie_ids = []
-            else:
-                movie_ids = movie_list.movies.values("id").all()
-            return movie_ids
+        viewer = get_viewer(self.context.get("request"))
+        return [{"id": movie_id} for movie_id in viewer.get_contest_movie_ids(contest)]
 
 
 class MovieSerializer(serializers.ModelSerializer):
@@ -383,16 +381,24 @@ class MovieSerializer(serializers.ModelSerializer):
             "extras",
         ]
         read_only_fields = ["about", "state", "type", "poster_thumb"]
+        list_serializer_class = ViewerListSerializer
+
+    @cached_property
+    def _latest_orders(self):
+        # movie id => latest order, shared by `order` and `package` so the
+        # lookup runs once per movie
+        return {}
+
+    def _get_latest_order(self, movie):
+        if movie.id not in self._latest_orders:
+            self._latest_orders[movie.id] = movie.orders.order_by("-created_at").first()
+        return self._latest_orders[movie.id]
 
     def get_package(self, movie):
-        return PackageSerializer(
-            instance=movie.orders.order_by("-created_at").first().package
-        ).data
+        return PackageSerializer(instance=self._get_latest_order(movie).package).data
 
     def get_order(self, movie):
-        return OrderSerializer(
-            instance=movie.orders.order_by("-created_at").first()
-        ).data
+        return OrderSerializer(instance=self._get_latest_order(movie)).data
 
     def get_contests(self, movie):
         return ContestSerializer(
@@ -403,28 +409,15 @@ class MovieSerializer(serializers.ModelSerializer):
         ).data
 
     def get_requestor_rating(self, movie):
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            review = MovieRateReview.objects.filter(
-                movie=movie, author=request.user
-            ).first()
-            return MovieReviewSerializer(instance=review).data
+        viewer = get_viewer(self.context.get("request"))
+        if viewer.is_authenticated:
+            return MovieReviewSerializer(instance=viewer.get_review(movie)).data
 
     def get_is_recommended(self, movie):
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            recommendation_list = MovieList.objects.filter(
-                owner=request.user, name=RECOMMENDATION
-            ).first()
-            if recommendation_list:
-                return recommendation_list.movies.filter(id=movie.id).exists()
-        return False
+        return get_viewer(self.context.get("request")).is_recommended(movie)
 
     def get_is_watchlisted(self, movie):
-        request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            return movie.watchlisted_by.filter(user=request.user).exists()
-        return False
+        return get_viewer(self.context.get("request")).is_watchlisted(movie)
 
     def get_crew(self, movie):
         # since one user can have multiple roles, we can
@@ -512,7 +505,7 @@ class MovieSerializer(serializers.ModelSerializer):
         return movie
 
     def _is_director_present(self, movie):
-        director_role = Role.objects.get(name="Director")
+        director_role = registry.get_director_role()
         return CrewMember.objects.filter(movie=movie, role=director_role).exists()
 
     def _attach_director_role(
@@ -542,11 +535,12 @@ class MovieSerializer(serializers.ModelSerializer):
                 )
 
             # remove existing director relation on movie
-            director_role = Role.objects.get(name="Director")
+            director_role = registry.get_director_role()
             CrewMember.objects.filter(role=director_role, movie=movie).delete()
             CrewMember.objects.create(
                 profile=director_profile, movie=movie, role=director_role
             )
+            movie.director = director_profile
 
     def _attach_creator_roles(
         self,
@@ -558,13 +552,13 @@ class MovieSerializer(serializers.ModelSerializer):
         """Attach all non-director roles to the creator
         if creator is the director then add CrewMember otherwise add as CrewMemeberRequest
         """
-        director_role = Role.objects.get(name="Director")
+        director_role = registry.get_director_role()
         creator_role_names = [
             role.get("name")
             for role in creator_roles_data
-            if role.get("name") != "Director"
+            if role.get("name") != DIRECTOR
         ]
-        creator_roles = Role.objects.filter(name__in=creator_role_names).all()
+        creator_roles = registry.get_roles(creator_role_names)
         logger.debug(f"creator_roles:{creator_roles}")
         creator_profile = Profile.objects.get(user__id=creator.id)
         # clear all roles of creator
@@ -590,7 +584,9 @@ class MovieSerializer(serializers.ModelSerializer):
     def _get_or_create_genres(self, genres_data):
         names = [name.get("name") for name in genres_data]
         names = [name.strip().lower() for name in names if name]
-        existing_genres = list(Genre.objects.filter(name__in=names).all())
+        existing_genres = [
+            genre for genre in registry.get_all(Genre) if genre.name in names
+        ]
         logger.info(f"existing genres: {existing_genres}")
         return existing_genres
 
@@ -684,8 +680,8 @@ class MinUserSerializer(serializers.ModelSerializer):
 
 class MovieReviewDetailSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
-    liked_by = MinUserSerializer(read_only=True, many=True)
-    # serializers.IntegerField(source="liked_by.count", read_only=True)
+    like_count = serializers.IntegerField(read_only=True)
+    liked_by_viewer = serializers.SerializerMethodField()
     published_at = serializers.DateTimeField(read_only=True)
     rated_at = serializers.DateTimeField(read_only=True)
     # added for my reviews page, normal reviews for a movie don't use this,
@@ -699,7 +695,8 @@ class MovieReviewDetailSerializer(serializers.ModelSerializer):
             "id",
             "author",
             "content",
-            "liked_by",
+            "like_count",
+            "liked_by_viewer",
             "published_at",
             "rated_at",
             "rating",
@@ -707,6 +704,11 @@ class MovieReviewDetailSerializer(serializers.ModelSerializer):
             "movie_id",
         ]
 
+    def get_liked_by_viewer(self, review):
+        # annotated by MovieReviewView for authenticated viewers, new reviews
+        # aren't liked yet
+        return getattr(review, "liked_by_viewer", False)
+
     def validate(self, validated_data):
         if all([key not in validated_data for key in ["content", "rating"]]):
             raise serializers.ValidationError(
@@ -714,24 +716,11 @@ class MovieReviewDetailSerializer(serializers.ModelSerializer):
             )
         return validated_data
 
-    def _update_movie_audience_rating(self, movie):
-        if movie is not None:
-            # FIXME: this average audience rating update might get into concurrency issue
-            # a better way(IMO) will be to cache the average rating of movies via a job
-            movie.audience_rating = (
-                MovieRateReview.objects.filter(movie=movie)
-                .exclude(rating__isnull=True)
-                .aggregate(Avg("rating"))
-            ).get("rating__avg")
-            movie.save()
-
     def create(self, validated_data):
         validated_data["author"] = validated_data.pop("user")
         if validated_data.get("rating") is not None:
             validated_data["rated_at"] = timezone.now()
-        instance = super().create(validated_data)
-        self._update_movie_audience_rating(instance.movie)
-        return instance
+        return super().create(validated_data)
 
     def update(self, instance, validated_data):
         rating = validated_data.get("rating")
@@ -743,8 +732,13 @@ class MovieReviewDetailSerializer(serializers.ModelSerializer):
                 raise ValidationError("Rating is now freezed")
             else:
                 validated_data["rated_at"] = timezone.now()
-        instance = super().update(instance, validated_data)
-        self._update_movie_audience_rating(instance.movie)
+        # like_count is kept by F() updates, don't write it back
+        fields = [
+            name for name in ["content", "rating", "rated_at"] if name in validated_data
+        ]
+        for name in fields:
+            setattr(instance, name, validated_data[name])
+        instance.save(update_fields=fields)
         return instance
 
 
@@ -829,7 +823,7 @@ class CrewMemberRequestSerializer(serializers.ModelSerializer):
         email = validated_data.pop("email")
         name = validated_data.pop("name")
         instance = None
-        director = Role.objects.get(name="Director")
+        director = registry.get_director_role()
         requestor_is_director_of_movie = CrewMember.objects.filter(
             profile__user=requestor, role=director, movie=movie
         ).exists()
@@ -881,34 +875,31 @@ class MovieRecommendSerializer(serializers.ModelSerializer):
         write_only=True,
         error_messages={"does_not_exist": "Movie does not exist"},
     )
-    recommended = serializers.SerializerMethodField()
+
+    # set by update, the response describes the change made to the list
+    _delta = None
 
     class Meta:
         model = Profile
-        fields = ["movie", "recommended"]
-
-    def get_recommended(self, profile):
-        request = self.context["request"]
-        try:
-            movie_list = MovieList.objects.get(owner=request.user, name=RECOMMENDATION)
-        except MovieList.DoesNotExist:
-            return []
-        else:
-            return movie_list.movies.values("id").all()
+        fields = ["movie"]
 
     def update(self, profile, validated_data):
         movie = validated_data["movie"]
         action = validated_data["action"]
-        movie_list, _ = MovieList.objects.get_or_create(
-            name=RECOMMENDATION,
-            owner=profile.user,
-        )
         if action == "add":
-            movie_list.movies.add(movie)
+            changed = recommends.recommend(profile.user, movie.id)
         elif action == "remove":
-            movie_list.movies.remove(movie)
+            changed = recommends.unrecommend(profile.user, movie.id)
+        self._delta = dict(movie=movie.id, recommended=action == "add", changed=changed)
         return profile
 
+    def to_representation(self, profile):
+        """the movie, whether it's in the recommend list now and whether the
+        request changed that, not the whole list"""
+        if self._delta is None:
+            return super().to_representation(profile)
+        return self._delta
+
 
 class MpGenreSerializer(serializers.ModelSerializer):
     class Meta:
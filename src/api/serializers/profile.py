@@ -1,12 +1,14 @@
 from django.core.exceptions import ValidationError
 from rest_framework.authtoken.models import Token
 from api.models.movie import CrewMember
+from collections import defaultdict
 import os
 import uuid
 from logging import getLogger
 
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.db.models import Q
 from django.conf import settings
 from django.core.files.storage import default_storage
 
@@ -14,7 +16,8 @@ from rest_framework import serializers
 from PIL import Image
 
 from api.models import Profile, Role, Movie, Notification
-from api.constants import MOVIE_STATE, DEFAULT_AVATARS
+from api import recommends, registry
+from api.constants import DIRECTOR, MOVIE_STATE, DEFAULT_AVATARS, TOGGLE
 
 logger = getLogger(__name__)
 
@@ -123,12 +126,8 @@ class WatchListMovieSerializer(serializers.ModelSerializer):
 
     def get_director(self, movie):
         logger.debug("getting director")
-        director_role = Role.objects.get(name="Director")
-        logger.debug(f"Role: {director_role}")
-        director_crew_relation = movie.crewmember_set.filter(role=director_role).first()
-        if director_crew_relation:
-            logger.debug(f"Crew: {director_crew_relation}")
-            return ProfileSerializer(instance=director_crew_relation.profile).data
+        if movie.director:
+            return ProfileSerializer(instance=movie.director).data
 
 
 class ProfileDetailSerializer(serializers.ModelSerializer):
@@ -211,9 +210,10 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
         return representation
 
     def get_movies_directed(self, profile):
-        director_role = Role.objects.filter(name="Director").first()
         return CrewMember.objects.filter(
-            profile=profile, role=director_role, movie__state=MOVIE_STATE.PUBLISHED
+            profile=profile,
+            role__in=registry.select(Role, name=DIRECTOR),
+            movie__state=MOVIE_STATE.PUBLISHED,
         ).count()
 
     def get_title(self, profile):
@@ -242,10 +242,124 @@ class FollowSerializer(serializers.ModelSerializer):
             user.profile.follows.add(profile_to_follow)
         else:
             user.profile.follows.remove(profile_to_follow)
-        user.profile.save()
         return user.profile
 
 
+class ToggleOperationSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(
+        choices=[TOGGLE.WATCHLIST, TOGGLE.RECOMMEND, TOGGLE.FOLLOW]
+    )
+    target_id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=["add", "remove"])
+
+
+class BulkToggleSerializer(serializers.Serializer):
+    """Applies watchlist, recommend and follow toggles of a profile at once.
+
+    Targets are movie ids, except for follows where they are user ids (like
+    `FollowView`). The last operation on a target wins, every relation then
+    gets one `add` and one `remove` of all its targets inside a single
+    transaction, so the number of queries doesn't grow with the operations.
+    The response reports the state stored afterwards, read back with one query
+    per relation.
+
+    Recommends are written through `api.recommends` to the personal recommend
+    list only, contest lists and their quota are left to the contest
+    endpoints.
+    """
+
+    MAX_OPERATIONS = 100
+
+    operations = ToggleOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"Cannot apply more than {self.MAX_OPERATIONS} operations at once"
+            )
+        return operations
+
+    def validate(self, attrs):
+        # kind => {target_id: add?}
+        states = defaultdict(dict)
+        for operation in attrs["operations"]:
+            states[operation["kind"]][operation["target_id"]] = (
+                operation["action"] == "add"
+            )
+        targets = {}
+        target_pks = {}
+        missing = []
+        for kind, actions in states.items():
+            pks = self._get_target_pks(kind, actions)
+            missing += [f"{kind} {target}" for target in actions if target not in pks]
+            targets[kind] = {
+                pks[target]: add for target, add in actions.items() if target in pks
+            }
+            target_pks[kind] = pks
+        if missing:
+            raise serializers.ValidationError(
+                {"operations": [f"{', '.join(missing)} does not exist"]}
+            )
+        attrs["states"] = states
+        attrs["targets"] = targets
+        attrs["target_pks"] = target_pks
+        return attrs
+
+    def _get_target_pks(self, kind, actions):
+        """target id => pk of the related row"""
+        if kind == TOGGLE.FOLLOW:
+            return dict(
+                Profile.objects.filter(user_id__in=actions).values_list("user_id", "id")
+            )
+        movies = Movie.objects.filter(id__in=actions)
+        if kind == TOGGLE.RECOMMEND:
+            # only published movies can be recommended, any can be removed
+            removed = [target for target, add in actions.items() if not add]
+            movies = movies.filter(Q(state=MOVIE_STATE.PUBLISHED) | Q(id__in=removed))
+        return {movie_id: movie_id for movie_id in movies.values_list("id", flat=True)}
+
+    def create(self, validated_data):
+        profile = validated_data["profile"]
+        with transaction.atomic():
+            for kind, targets in validated_data["targets"].items():
+                added = [pk for pk, add in targets.items() if add]
+                removed = [pk for pk, add in targets.items() if not add]
+                if kind == TOGGLE.RECOMMEND:
+                    recommends.recommend_all(profile.user, added)
+                    recommends.unrecommend_all(profile.user, removed)
+                    continue
+                if kind == TOGGLE.WATCHLIST:
+                    manager = profile.watchlist
+                else:
+                    manager = profile.follows
+                if added:
+                    manager.add(*added)
+                if removed:
+                    manager.remove(*removed)
+        results = []
+        for kind, pks in validated_data["target_pks"].items():
+            active = self._get_active_pks(profile, kind, list(pks.values()))
+            results += [
+                dict(kind=kind, target_id=target, active=pks[target] in active)
+                for target in validated_data["states"][kind]
+            ]
+        return results
+
+    def _get_active_pks(self, profile, kind, pks):
+        """pks of the related rows that are linked to the profile"""
+        if kind == TOGGLE.RECOMMEND:
+            return recommends.get_recommended_ids(profile.user, pks)
+        if kind == TOGGLE.WATCHLIST:
+            rows = Profile.watchlist.through.objects.filter(
+                profile=profile, movie_id__in=pks
+            ).values_list("movie_id", flat=True)
+        else:
+            rows = Profile.follows.through.objects.filter(
+                from_profile=profile, to_profile_id__in=pks
+            ).values_list("to_profile_id", flat=True)
+        return set(rows)
+
+
 class ProfileImageSerializer(serializers.Serializer):
     image = serializers.ImageField()
 
@@ -0,0 +1,18 @@
+from django.db import models
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+
+
+class PrefetchListSerializer(serializers.ListSerializer):
+    """Batch loads the relations listed in the child serializer's
+    `Meta.prefetch_related` for the whole page before serializing it,
+    so a page costs one query per relation instead of one per item.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        instances = list(iterable)
+        lookups = getattr(self.child.Meta, "prefetch_related", [])
+        if instances and lookups:
+            prefetch_related_objects(instances, *lookups)
+        return super().to_representation(instances)
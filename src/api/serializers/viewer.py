@@ -0,0 +1,132 @@
+from collections import defaultdict
+from functools import cached_property
+
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+
+from api.constants import CONTEST_STATE, RECOMMENDATION
+from api.models import MovieList, MovieRateReview, Profile
+
+# the fields of the viewer's reviews that serializers render
+REVIEW_FIELDS = ["id", "movie_id", "content", "rating", "published_at", "rated_at"]
+
+
+class ViewerContext:
+    """State of the signed-in user that serializers need to decorate movies
+    with (recommended, watchlisted, rated, contest recommends).
+
+    Every attribute is loaded with a single query the first time it is used
+    and then shared by all serializers rendering the same request, use
+    `get_viewer` to obtain the instance bound to a request. Reviews are only
+    loaded for the movies being rendered, `ViewerListSerializer` registers a
+    page of movies with `add_movies` so they are loaded together.
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+        self.movie_ids = set()
+        # movie id => review of the viewer or None
+        self.reviews_by_movie_id = {}
+        # contest id => movie ids, for contests that aren't live
+        self.past_contest_movie_ids = {}
+
+    def add_movies(self, movies):
+        """movies about to be rendered, their reviews are loaded together"""
+        self.movie_ids.update(movie.id for movie in movies)
+
+    @cached_property
+    def recommended_movie_ids(self):
+        if not self.is_authenticated:
+            return set()
+        return set(
+            MovieList.movies.through.objects.filter(
+                movielist__owner=self.user, movielist__name=RECOMMENDATION
+            ).values_list("movie_id", flat=True)
+        )
+
+    @cached_property
+    def watchlisted_movie_ids(self):
+        if not self.is_authenticated:
+            return set()
+        return set(
+            Profile.watchlist.through.objects.filter(
+                profile__user=self.user
+            ).values_list("movie_id", flat=True)
+        )
+
+    def _get_contest_movie_ids(self, **filters):
+        movie_ids = defaultdict(list)
+        rows = MovieList.movies.through.objects.filter(
+            movielist__owner=self.user, **filters
+        ).values_list("movielist__contest_id", "movie_id")
+        for contest_id, movie_id in rows:
+            movie_ids[contest_id].append(movie_id)
+        return movie_ids
+
+    @cached_property
+    def contest_movie_ids(self):
+        """movie ids in each of the viewer's live contest recommend lists by
+        contest id"""
+        if not self.is_authenticated:
+            return defaultdict(list)
+        now = timezone.now()
+        return self._get_contest_movie_ids(
+            movielist__contest__state=CONTEST_STATE.LIVE,
+            movielist__contest__start__lt=now,
+            movielist__contest__end__gt=now,
+        )
+
+    def is_recommended(self, movie):
+        return movie.id in self.recommended_movie_ids
+
+    def is_watchlisted(self, movie):
+        return movie.id in self.watchlisted_movie_ids
+
+    def get_review(self, movie):
+        if not self.is_authenticated:
+            return None
+        if movie.id not in self.reviews_by_movie_id:
+            movie_ids = (self.movie_ids | {movie.id}) - set(self.reviews_by_movie_id)
+            self.reviews_by_movie_id.update(dict.fromkeys(movie_ids))
+            reviews = MovieRateReview.objects.filter(
+                author=self.user, movie_id__in=movie_ids
+            ).only(*REVIEW_FIELDS)
+            for review in reviews:
+                self.reviews_by_movie_id[review.movie_id] = review
+        return self.reviews_by_movie_id[movie.id]
+
+    def get_contest_movie_ids(self, contest):
+        if contest.is_live():
+            return self.contest_movie_ids.get(contest.id, [])
+        if not self.is_authenticated:
+            return []
+        # only listings of past contests get here, one contest at a time
+        if contest.id not in self.past_contest_movie_ids:
+            self.past_contest_movie_ids[contest.id] = self._get_contest_movie_ids(
+                movielist__contest=contest
+            ).get(contest.id, [])
+        return self.past_contest_movie_ids[contest.id]
+
+
+def get_viewer(request):
+    """return the ViewerContext of the request, creating it on first use"""
+    if request is None:
+        return ViewerContext()
+    viewer = getattr(request, "_viewer_context", None)
+    if viewer is None:
+        viewer = ViewerContext(request.user)
+        request._viewer_context = viewer
+    return viewer
+
+
+class ViewerListSerializer(serializers.ListSerializer):
+    """Registers the movies of a page with the viewer before serializing
+    them, so their viewer state is loaded for the whole page at once."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        movies = list(iterable)
+        get_viewer(self.context.get("request")).add_movies(movies)
+        return super().to_representation(movies)
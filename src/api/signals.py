@@ -0,0 +1,256 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from api import authentication, counters, registry, search
+from api.constants import DIRECTOR, RECOMMENDATION
+from api.decorators import ignore_raw
+from api.models import (
+    CrewMember,
+    Genre,
+    Movie,
+    MovieLanguage,
+    MovieList,
+    MovieRateReview,
+    MpGenre,
+    Package,
+    Profile,
+    Role,
+    SearchEntry,
+    User,
+)
+
+# list memberships counted in `Movie.recommend_count`
+RECOMMENDS = Q(movielist__name=RECOMMENDATION) | Q(movielist__contest__isnull=False)
+
+
+@receiver(m2m_changed, sender=MovieList.movies.through)
+@receiver(m2m_changed, sender=MovieList.liked_by.through)
+def touch_movie_list(sender, instance, action, reverse, pk_set, **kwargs):
+    """bump `MovieList.updated_at` when movies or likes of lists change, m2m
+    writes don't go through `MovieList.save` so auto_now doesn't cover them"""
+    if not reverse:
+        list_ids = [instance.pk] if action.startswith("post_") else []
+    elif action in ("post_add", "post_remove"):
+        list_ids = pk_set
+    elif action == "pre_clear":
+        # instance is the movie/user, lists are gone after the clear
+        list_ids = list(
+            sender.objects.filter(
+                **{f"{instance._meta.model_name}_id": instance.pk}
+            ).values_list("movielist_id", flat=True)
+        )
+    else:
+        list_ids = []
+    if list_ids:
+        MovieList.objects.filter(pk__in=list_ids).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Movie)
+@receiver(pre_delete, sender=User)
+def touch_lists_of_deleted(sender, instance, **kwargs):
+    """cascade deletes of list movies and likes don't send m2m_changed, bump
+    the lists so the incremental `updatetopcurators` rescores them"""
+    field = "movies" if sender is Movie else "liked_by"
+    MovieList.objects.filter(**{field: instance}).update(updated_at=timezone.now())
+
+
+def _is_recommend_list(movie_list):
+    return movie_list.name == RECOMMENDATION or movie_list.contest_id is not None
+
+
+@receiver(m2m_changed, sender=MovieList.movies.through)
+def count_recommends(sender, instance, action, reverse, pk_set, **kwargs):
+    """keep `Movie.recommend_count` in sync with recommend lists, removals are
+    counted before they happen as pk_set isn't narrowed to existing rows"""
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    delta = 1 if action == "post_add" else -1
+    if not reverse:
+        if not _is_recommend_list(instance):
+            return
+        if action == "post_add":
+            movie_ids = pk_set
+        else:
+            rows = sender.objects.filter(movielist=instance)
+            if action == "pre_remove":
+                rows = rows.filter(movie_id__in=pk_set)
+            movie_ids = rows.values_list("movie_id", flat=True)
+        counters.add(Movie, movie_ids, recommend_count=delta)
+    else:
+        rows = sender.objects.filter(RECOMMENDS, movie=instance)
+        if action != "pre_clear":
+            rows = rows.filter(movielist_id__in=pk_set)
+        counters.add(Movie, [instance.pk], recommend_count=delta * rows.count())
+
+
+@receiver(pre_delete, sender=MovieList)
+def uncount_deleted_list(sender, instance, **kwargs):
+    """cascade deletes of the list's movies don't send m2m_changed"""
+    if _is_recommend_list(instance):
+        movie_ids = sender.movies.through.objects.filter(
+            movielist=instance
+        ).values_list("movie_id", flat=True)
+        counters.add(Movie, movie_ids, recommend_count=-1)
+
+
+@receiver(m2m_changed, sender=MovieRateReview.liked_by.through)
+def count_review_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    """keep `MovieRateReview.like_count` in sync, like `count_recommends`
+    removals are counted before they happen"""
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+    delta = 1 if action == "post_add" else -1
+    if not reverse:
+        if action == "post_add":
+            count = len(pk_set)
+        else:
+            rows = sender.objects.filter(movieratereview=instance)
+            if action == "pre_remove":
+                rows = rows.filter(user_id__in=pk_set)
+            count = rows.count()
+        counters.add(MovieRateReview, [instance.pk], like_count=delta * count)
+    else:
+        if action == "post_add":
+            review_ids = pk_set
+        else:
+            rows = sender.objects.filter(user=instance)
+            if action == "pre_remove":
+                rows = rows.filter(movieratereview_id__in=pk_set)
+            review_ids = rows.values_list("movieratereview_id", flat=True)
+        counters.add(MovieRateReview, review_ids, like_count=delta)
+
+
+def _count_review(review, delta):
+    counters.add(Movie, [review.movie_id], review_count=delta)
+    counters.add(Profile, [review.author_id], lookup="user_id", reviews_given=delta)
+
+
+def _count_rating(review, old_rating, new_rating):
+    if old_rating == new_rating:
+        return
+    counters.add(
+        Movie,
+        [review.movie_id],
+        rating_sum=(new_rating or 0) - (old_rating or 0),
+        rating_count=(new_rating is not None) - (old_rating is not None),
+    )
+    counters.refresh_rating(review.movie_id)
+
+
+@receiver(post_save, sender=MovieRateReview)
+@ignore_raw
+def review_saved(sender, instance, created, **kwargs):
+    if created:
+        _count_review(instance, 1)
+    old_rating = None if created else getattr(instance, "_loaded_rating", None)
+    _count_rating(instance, old_rating, instance.rating)
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=MovieRateReview)
+def review_deleted(sender, instance, **kwargs):
+    _count_review(instance, -1)
+    _count_rating(instance, getattr(instance, "_loaded_rating", instance.rating), None)
+
+
+# cache invalidations wait for the commit, invalidating earlier would let other
+# processes cache the rows as they were before it again
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=MovieLanguage)
+@receiver([post_save, post_delete], sender=MpGenre)
+@receiver([post_save, post_delete], sender=Package)
+@receiver([post_save, post_delete], sender=Role)
+def invalidate_registry(sender, **kwargs):
+    """reference data changed, also when loaded by loaddata"""
+    transaction.on_commit(lambda: registry.invalidate(sender))
+
+
+@receiver(post_delete, sender=Token)
+def revoke_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: authentication.invalidate_token(key))
+
+
+@receiver([post_save, post_delete], sender=User)
+def revoke_user_tokens(sender, instance, **kwargs):
+    """deactivated users are rejected and changes are seen right away"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: authentication.invalidate_user(user_id))
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def revoke_profile_tokens(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: authentication.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=Movie)
+@ignore_raw
+def index_movie(sender, instance, **kwargs):
+    search.index_movies([instance.pk])
+
+
+@receiver(post_delete, sender=Movie)
+def unindex_movie(sender, instance, **kwargs):
+    search.unindex(SearchEntry.MOVIE, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=CrewMember)
+@ignore_raw
+def index_crew_movie(sender, instance, **kwargs):
+    search.index_movies([instance.movie_id])
+
+
+@receiver(post_save, sender=Profile)
+@ignore_raw
+def index_new_profile(sender, instance, created, **kwargs):
+    # names live on the user, see index_user
+    if created:
+        search.index_profiles([instance.pk])
+
+
+@receiver(post_delete, sender=Profile)
+def unindex_profile(sender, instance, **kwargs):
+    search.unindex(SearchEntry.PROFILE, instance.pk)
+
+
+@receiver(post_save, sender=User)
+@ignore_raw
+def index_user(sender, instance, created, update_fields=None, **kwargs):
+    """reindex the profile and movies of the user when their name may have
+    changed, e.g. not when only last_login is updated"""
+    if created or (update_fields and not {"first_name", "last_name"} & update_fields):
+        return
+    search.index_profiles(
+        Profile.objects.filter(user=instance).values_list("id", flat=True)
+    )
+    search.index_movies(
+        CrewMember.objects.filter(profile__user=instance).values_list(
+            "movie_id", flat=True
+        )
+    )
+
+
+@receiver([post_save, post_delete], sender=CrewMember)
+def sync_director(sender, instance, **kwargs):
+    """keep `Movie.director` on the first Director crew member, fixtures
+    included"""
+    # fixtures may load crew members before the roles
+    director_role = next(iter(registry.select(Role, name=DIRECTOR)), None)
+    if director_role is None or instance.role_id != director_role.id:
+        return
+    director_id = (
+        CrewMember.objects.filter(movie_id=instance.movie_id, role=director_role)
+        .order_by("id")
+        .values_list("profile_id", flat=True)
+        .first()
+    )
+    Movie.objects.filter(id=instance.movie_id).update(director_id=director_id)
+    movie = instance._state.fields_cache.get("movie")
+    if movie is not None:
+        movie.director_id = director_id
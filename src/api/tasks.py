@@ -15,6 +15,7 @@ def run_management(self, name):
         "updatetopcreators",
         "updatetopcurators",
         "updatemovierecommends",
+        "reconcilecounters",
         "youtubelinkfix",
     ]:
         call_command(name)
@@ -3,6 +3,7 @@ import time
 import inspect
 from functools import partial, wraps
 
+from django.core.cache import cache
 from rest_framework.authtoken.models import Token
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
@@ -41,6 +42,7 @@ class APITestCaseMixin:
 
     def setUp(self):
         super().setUp()
+        cache.clear()
         self.patcher_celery_task = mock.patch(
             "celery.app.task.Task.delay", return_value=1
         )
@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+import mock
+
+from api.authentication import CachedTokenAuthentication
+from api.views.profile import MyWatchlistView
+from .base import reverse, APITestCaseMixin, LoggedInMixin
+
+
+class CachedTokenAuthenticationTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    fixtures = ["user", "profile", "genre", "lang", "role", "movie"]
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("api:mywatchlist-list")
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(200, self.client.get(self.url).status_code)
+        return len(context.captured_queries)
+
+    def test_saves_two_queries(self):
+        with mock.patch.object(
+            MyWatchlistView, "authentication_classes", [TokenAuthentication]
+        ):
+            uncached = self._count_queries()
+        self._count_queries()
+        self.assertEqual(uncached - 2, self._count_queries())
+
+    def test_deleted_token_is_revoked(self):
+        self.assertEqual(200, self.client.get(self.url).status_code)
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(user=self.user).delete()
+        self.assertEqual(401, self.client.get(self.url).status_code)
+
+    def test_deactivated_user_is_revoked(self):
+        self.assertEqual(200, self.client.get(self.url).status_code)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(401, self.client.get(self.url).status_code)
+
+    def test_revoked_once_committed(self):
+        key = Token.objects.get(user=self.user).key
+        self.assertEqual(200, self.client.get(self.url).status_code)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+        # still cached until the transaction commits
+        with self.assertNumQueries(0):
+            CachedTokenAuthentication().authenticate_credentials(key)
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(1):
+            CachedTokenAuthentication().authenticate_credentials(key)
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.constants import ORDER_STATE
+from api.models import Order, Profile, User
+from .base import APITestCaseMixin
+
+
+class ChangeTrackingTestCase(APITestCaseMixin, TestCase):
+    fixtures = ["user", "profile"]
+
+    def test_saves_only_dirty_fields(self):
+        profile = Profile.objects.get(pk=1)
+        self.assertEqual([], profile.dirty_fields)
+        profile.about = "a new bio"
+        self.assertEqual(["about"], profile.dirty_fields)
+        with CaptureQueriesContext(connection) as context:
+            profile.save()
+        sqls = [query["sql"] for query in context.captured_queries]
+        self.assertEqual(1, len(sqls))
+        self.assertTrue(sqls[0].startswith("UPDATE"))
+        self.assertNotIn('"onboarded"', sqls[0])
+        self.assertEqual([], profile.dirty_fields)
+        self.assertEqual("a new bio", Profile.objects.get(pk=1).about)
+
+    def test_unchanged_save_skips_the_write(self):
+        profile = Profile.objects.get(pk=1)
+        with self.assertNumQueries(0):
+            profile.save()
+
+    def test_copy_is_inserted(self):
+        profile = Profile.objects.get(pk=1)
+        profile.pk = None
+        profile.user = User.objects.create(username="copy@example.com")
+        profile.save()
+        self.assertEqual(2, Profile.objects.count())
+
+    def test_does_not_overwrite_concurrent_changes(self):
+        profile = Profile.objects.get(pk=1)
+        Profile.objects.filter(pk=1).update(reviews_given=42)
+        profile.about = "a new bio"
+        profile.save()
+        self.assertEqual(42, Profile.objects.get(pk=1).reviews_given)
+
+    @mock.patch("api.models.profile.email_trigger")
+    def test_onboarding_triggers_email(self, email_trigger):
+        user = User.objects.create(username="new@example.com")
+        profile = Profile.objects.create(user=user, onboarded=False)
+        profile = Profile.objects.get(pk=profile.pk)
+        profile.onboarded = True
+        profile.save()
+        email_trigger.assert_called_once()
+        profile.about = "a new bio"
+        profile.save()
+        email_trigger.assert_called_once()
+
+    def test_completing_payment_submits_order(self):
+        order = Order.objects.create(owner=User.objects.get(pk=1), order_id="order_1")
+        order = Order.objects.get(pk=order.pk)
+        self.assertEqual(ORDER_STATE.CREATED, order.state)
+        order.payment_id = "pay_1"
+        with CaptureQueriesContext(connection) as context:
+            order.save()
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "api_order"')
+        ]
+        self.assertEqual(1, len(updates))
+        self.assertEqual(ORDER_STATE.SUBMITTED, Order.objects.get(pk=order.pk).state)
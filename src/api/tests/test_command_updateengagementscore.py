@@ -0,0 +1,76 @@
+from django.core.management import call_command
+from django.test import TestCase
+from api.models import Movie, MovieList, MovieRateReview, Profile, User
+from .base import APITestCaseMixin
+
+
+class UpdateEngagementScoreTestCase(TestCase, APITestCaseMixin):
+    fixtures = [
+        "user",
+        "profile",
+        "genre",
+        "lang",
+        "role",
+        "package",
+        "order",
+        "movie",
+        "contest_type",
+        "contest",
+        "movielist",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.profile = Profile.objects.get(pk=1)
+        self.fans = []
+        for index in range(3):
+            user = User.objects.create(
+                username=f"fan{index}@example.com",
+                email=f"fan{index}@example.com",
+                first_name=f"Fan{index}",
+            )
+            self.fans.append(Profile.objects.create(user=user, onboarded=False))
+
+    def test_engagement_score_and_rank(self):
+        review = MovieRateReview.objects.create(
+            movie=Movie.objects.get(pk=1), author=self.profile.user, content="Good"
+        )
+        review.liked_by.add(*[fan.user for fan in self.fans])
+        for fan in self.fans[:2]:
+            fan.follows.add(self.profile)
+        # likes on contest lists count, likes on other lists don't
+        MovieList.objects.get(pk=1).liked_by.add(self.fans[0].user)
+        MovieList.objects.get(pk=2).liked_by.add(self.fans[0].user)
+        self.fans[1].follows.add(self.fans[2])
+
+        call_command("updateengagementscore")
+
+        self.profile.refresh_from_db()
+        # review likes: 3 * 0.25, followers: 2 * 0.25, contest list likes: 1 * 0.25
+        self.assertEqual(1.5, self.profile.engagement_score)
+        self.assertEqual(1, self.profile.curator_rank)
+        self.assertEqual(0.25, Profile.objects.get(pk=self.fans[2].pk).engagement_score)
+        # ties are ordered by first name
+        self.assertEqual(
+            [3, 4, 2],
+            [Profile.objects.get(pk=fan.pk).curator_rank for fan in self.fans],
+        )
+
+    def test_review_points_are_capped(self):
+        review = MovieRateReview.objects.create(
+            movie=Movie.objects.get(pk=1), author=self.profile.user, content="Good"
+        )
+        fans = []
+        for index in range(90):
+            fans.append(
+                User.objects.create(
+                    username=f"liker{index}@example.com",
+                    email=f"liker{index}@example.com",
+                )
+            )
+        review.liked_by.add(*fans)
+
+        call_command("updateengagementscore")
+
+        self.profile.refresh_from_db()
+        self.assertEqual(20, self.profile.engagement_score)
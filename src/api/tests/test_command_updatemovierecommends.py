@@ -20,12 +20,17 @@ class CommandTestCase(TestCase, APITestCaseMixin):
         "movielist",
     ]
 
+    def _drift(self):
+        # recommends are counted as they happen, the command repairs drift
+        Movie.objects.update(recommend_count=0)
+
     def test_count_personal_and_contest_recommend(self):
         movie = Movie.objects.get(pk=1)
         self.assertEquals(0, movie.recommend_count)
         movie = Movie.objects.get(pk=1)
         MovieList.objects.get(pk=1).movies.add(movie)
         MovieList.objects.get(pk=2).movies.add(movie)
+        self._drift()
         call_command("updatemovierecommends")
         movie.refresh_from_db()
         self.assertEquals(2, movie.recommend_count)
@@ -36,6 +41,29 @@ class CommandTestCase(TestCase, APITestCaseMixin):
         movie.state = MOVIE_STATE.SUBMITTED
         movie.save()
         MovieList.objects.get(pk=1).movies.add(movie)
+        self._drift()
+        call_command("updatemovierecommends")
+        movie.refresh_from_db()
+        self.assertEquals(0, movie.recommend_count)
+
+    def test_update_only_changed_movies(self):
+        movie = Movie.objects.get(pk=1)
+        MovieList.objects.get(pk=2).movies.add(movie)
+        self._drift()
         call_command("updatemovierecommends")
         movie.refresh_from_db()
+        self.assertEquals(1, movie.recommend_count)
+        # published movies: 1 select, recommends: 1 grouped count, no update
+        with self.assertNumQueries(2):
+            call_command("updatemovierecommends")
+
+    def test_scoped_to_movie_ids(self):
+        movie = Movie.objects.get(pk=1)
+        MovieList.objects.get(pk=1).movies.add(movie)
+        self._drift()
+        call_command("updatemovierecommends", movie_ids=[2])
+        movie.refresh_from_db()
         self.assertEquals(0, movie.recommend_count)
+        call_command("updatemovierecommends", "--movie-ids", "1")
+        movie.refresh_from_db()
+        self.assertEquals(1, movie.recommend_count)
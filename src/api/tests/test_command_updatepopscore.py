@@ -0,0 +1,96 @@
+from django.core.management import call_command
+from django.test import TestCase
+from api.models import Movie, MovieList, MovieRateReview, Profile, Role, User
+from .base import APITestCaseMixin
+
+
+class UpdatePopScoreTestCase(TestCase, APITestCaseMixin):
+    fixtures = [
+        "user",
+        "profile",
+        "genre",
+        "lang",
+        "role",
+        "package",
+        "order",
+        "movie",
+        "contest_type",
+        "contest",
+        "crewmember",
+        "movielist",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        director = Role.objects.get(name="Director")
+        self.director = Profile.objects.get(pk=1)
+        self.director.roles.add(director)
+
+        other_user = User.objects.create(
+            username="other@example.com", email="other@example.com", first_name="A"
+        )
+        self.other_director = Profile.objects.create(user=other_user)
+        self.other_director.roles.add(director)
+
+    def _create_fans(self, count):
+        fans = []
+        for index in range(count):
+            user = User.objects.create(
+                username=f"fan{index}@example.com", email=f"fan{index}@example.com"
+            )
+            fans.append(Profile.objects.create(user=user, onboarded=False))
+        return fans
+
+    def test_pop_score_and_rank(self):
+        movie = Movie.objects.get(pk=1)
+        movie.jury_rating = 4
+        movie.save()
+
+        fans = self._create_fans(3)
+        for fan in fans:
+            fan.follows.add(self.director)
+        # only contest lists count as recommends
+        MovieList.objects.get(pk=1).movies.add(movie)
+        MovieList.objects.get(pk=2).movies.add(movie)
+        MovieList.objects.create(
+            owner=fans[0].user, name="January", contest_id=1
+        ).movies.add(movie)
+        MovieRateReview.objects.create(movie=movie, author=fans[0].user, rating=8)
+        MovieRateReview.objects.create(
+            movie=movie, author=fans[1].user, rating=5, content="Good"
+        )
+        MovieRateReview.objects.create(
+            movie=movie, author=fans[2].user, content="Great"
+        )
+
+        call_command("updatepopscore")
+
+        self.director.refresh_from_db()
+        self.other_director.refresh_from_db()
+        # followers: 3 * 2, jury: 4 * 2.5, recommends: 2 * 0.1,
+        # reviews: 2 with content * 0.5 + 1 rated >= 7 * 1
+        self.assertAlmostEqual(6 + 10 + 0.2 + 2, self.director.pop_score)
+        self.assertEqual(1, self.director.creator_rank)
+        self.assertEqual(0, self.other_director.pop_score)
+        self.assertEqual(2, self.other_director.creator_rank)
+
+    def test_ignore_non_published_movies(self):
+        movie = Movie.objects.get(pk=1)
+        movie.jury_rating = 4
+        movie.state = "S"
+        movie.save()
+
+        call_command("updatepopscore")
+
+        self.director.refresh_from_db()
+        self.assertEqual(0, self.director.pop_score)
+
+    def test_capped_by_level(self):
+        # 200 followers alone cannot lift the score past the first level
+        for fan in self._create_fans(200):
+            fan.follows.add(self.director)
+
+        call_command("updatepopscore")
+
+        self.director.refresh_from_db()
+        self.assertEqual(400, self.director.pop_score)
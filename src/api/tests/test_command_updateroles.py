@@ -0,0 +1,50 @@
+from api.constants import MOVIE_STATE
+from django.core.management import call_command
+from django.test import TestCase
+from api.models import CrewMember, Movie, Profile, Role
+from .base import APITestCaseMixin
+
+
+class UpdateRolesTestCase(TestCase, APITestCaseMixin):
+    fixtures = [
+        "user",
+        "profile",
+        "genre",
+        "lang",
+        "role",
+        "package",
+        "order",
+        "movie",
+        "crewmember",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.profile = Profile.objects.get(pk=1)
+        self.actor = Role.objects.get(name="Actor")
+        self.director = Role.objects.get(name="Director")
+        self.profile.roles.clear()
+
+    def test_add_missing_roles(self):
+        CrewMember.objects.create(
+            movie=Movie.objects.get(pk=1), profile=self.profile, role=self.actor
+        )
+        call_command("updateroles")
+        self.assertEqual(
+            {"Actor", "Director"}, {role.name for role in self.profile.roles.all()}
+        )
+        # nothing missing: a single lookup inside the transaction
+        with self.assertNumQueries(3):
+            call_command("updateroles")
+
+    def test_ignore_created_movies(self):
+        Movie.objects.filter(pk=1).update(state=MOVIE_STATE.CREATED)
+        call_command("updateroles")
+        self.assertEqual(0, self.profile.roles.count())
+
+    def test_prune_stale_roles(self):
+        self.profile.roles.add(self.actor)
+        call_command("updateroles")
+        self.assertEqual(2, self.profile.roles.count())
+        call_command("updateroles", prune=True)
+        self.assertEqual(["Director"], [role.name for role in self.profile.roles.all()])
@@ -1,9 +1,20 @@
+from django.core.cache import cache as django_cache
 from django.utils import timezone
 from django.test import TestCase
 from django.core.management import call_command
 
+from api import cache
 from api.constants import CONTEST_STATE
-from api.models import MovieList, Contest, Movie, User, Profile, CrewMember, Role
+from api.models import (
+    MovieList,
+    Contest,
+    Movie,
+    User,
+    Profile,
+    CrewMember,
+    Role,
+    TopCurator,
+)
 from .base import reverse, APITestCaseMixin, LoggedInMixin
 
 
@@ -82,6 +93,15 @@ class ContestTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
         self.assertEqual(200, res.status_code)
         self.assertEqual(1, res.json()["recommended"])
 
+    def test_recommend_movie_twice_in_live_contest(self):
+        _add_movie_in_contest()
+        url = reverse("api:contest-recommend", args=["v1", 1])
+        for _ in range(2):
+            res = self.client.post(url, {"movie": 1})
+            self.assertEqual(200, res.status_code)
+            self.assertEqual(1, res.json()["recommended"])
+        self.assertEqual(1, Movie.objects.get(pk=1).recommend_count)
+
     def test_undo_recommend_movie_in_live_contest(self):
         _add_movie_in_contest()
         movie_list = _create_movie_list_for_contest()
@@ -122,7 +142,7 @@ class ContestTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
         self.assertEqual(1, res.json()["recommended"])
         # block the next recommend
         url = reverse("api:contest-recommend", args=["v1", 1])
-        res = self.client.post(url, {"movie": 1})
+        res = self.client.post(url, {"movie": new_movie.id})
         self.assertEqual(400, res.status_code)
         self.assertEqual(
             {
@@ -140,6 +160,25 @@ class ContestTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
             res.json(),
         )
 
+    def test_recommend_movie_already_in_list(self):
+        contest = Contest.objects.get(pk=1)
+        contest.max_recommends = 1
+        contest.save()
+        _add_movie_in_contest(movie_id=1)
+        movie_list = _create_movie_list_for_contest()
+
+        url = reverse("api:contest-recommend", args=["v1", 1])
+        res = self.client.post(url, {"movie": 1})
+        self.assertEqual(200, res.status_code)
+        # recommending it again doesn't use the quota, even when it's used up
+        res = self.client.post(url, {"movie": 1})
+        self.assertEqual(200, res.status_code)
+        self.assertEqual(
+            {"id": 1, "name": "January", "recommended": 1, "max_recommends": 1},
+            res.json(),
+        )
+        self.assertEqual([1], list(movie_list.movies.values_list("id", flat=True)))
+
     def test_recommend_after_contest_live_days_per_movie_is_over(self):
         # reduce the maximum allowed recommendation for this contest
         contest = Contest.objects.get(pk=1)
@@ -252,6 +291,17 @@ class ContestTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
             },
         )
 
+    def test_my_creator_position_cached(self):
+        _add_movie_in_contest()
+        url = reverse("api:contest-my-creator-position", args=["v1", 1])
+        self.assertEqual(404, self.client.get(url).status_code)
+        call_command("updatetopcreators")
+        self.assertEqual(200, self.client.get(url).status_code)
+        # token and position are cached
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+        self.assertEqual(1, res.json()["pos"])
+
     def test_my_curator_position_not_participated(self):
         res = self.client.get(
             reverse("api:contest-my-curator-position", args=["v1", 1])
@@ -496,3 +546,116 @@ class TestTopCurator(APITestCaseMixin, TestCase):
             ],
             actual_curators,
         )
+
+    def _create_curator(self, username, movies):
+        user = User.objects.create(username=username, email=f"{username}@example.com")
+        Profile.objects.create(user=user)
+        movie_list = _create_movie_list_for_contest(owner_id=user.id)
+        movie_list.movies.add(*movies)
+        return movie_list
+
+    def _get_positions(self):
+        return list(
+            TopCurator.objects.filter(contest_id=1)
+            .order_by("pos")
+            .values_list("profile__user__username", "pos", "likes_on_recommend")
+        )
+
+    def test_incremental_update(self):
+        _add_movie_in_contest()
+        celeb_user = User.objects.create(username="A Celeb", email="celeb@example.com")
+        Profile.objects.create(user=celeb_user, is_celeb=True)
+        movie = Movie.objects.get(pk=1)
+        _create_movie_list_for_contest(owner_id=celeb_user.id).movies.add(movie)
+        first = self._create_curator("first", [movie])
+        second = self._create_curator("second", [movie])
+
+        call_command("updatetopcurators")
+        self.assertEqual([("first", 1, 0), ("second", 2, 0)], self._get_positions())
+
+        # a like only rescores the liked list and moves it up
+        second.liked_by.add(celeb_user)
+        unchanged = TopCurator.objects.get(profile__user=first.owner)
+        with self.assertNumQueries(10):
+            call_command("updatetopcurators")
+        self.assertEqual([("second", 1, 1), ("first", 2, 0)], self._get_positions())
+        # untouched rows are updated in place
+        self.assertEqual(
+            unchanged.id, TopCurator.objects.get(profile__user=first.owner).id
+        )
+
+        # curators whose list is gone are dropped
+        second.delete()
+        call_command("updatetopcurators")
+        self.assertEqual([("first", 1, 0)], self._get_positions())
+
+    def test_cascade_deletes_touch_lists(self):
+        movie = Movie.objects.create(
+            title="Other", link="http://other.example.com", runtime=1
+        )
+        curator = self._create_curator("curator", [Movie.objects.get(pk=1), movie])
+        liker = User.objects.create(username="liker", email="liker@example.com")
+        curator.liked_by.add(liker)
+        long_ago = timezone.now() - timezone.timedelta(days=1)
+
+        for deleted in (movie, liker):
+            MovieList.objects.filter(pk=curator.pk).update(updated_at=long_ago)
+            deleted.delete()
+            curator.refresh_from_db()
+            self.assertGreater(curator.updated_at, long_ago)
+
+    def test_celeb_recommends_change_rescores_all(self):
+        _add_movie_in_contest()
+        template = Movie.objects.get(pk=1)
+        other_movie = Movie.objects.create(
+            title="Other", link="http://other.example.com", runtime=template.runtime
+        )
+        _add_movie_in_contest(movie_id=other_movie.id)
+        celeb_user = User.objects.create(username="A Celeb", email="celeb@example.com")
+        Profile.objects.create(user=celeb_user, is_celeb=True)
+        celeb_list = _create_movie_list_for_contest(owner_id=celeb_user.id)
+        celeb_list.movies.add(Movie.objects.get(pk=1))
+        self._create_curator("curator", [other_movie])
+
+        call_command("updatetopcurators")
+        curator = TopCurator.objects.get(profile__user__username="curator")
+        self.assertEqual(0, curator.match)
+
+        # the curator list is untouched but its match depends on the celeb list
+        celeb_list.movies.add(other_movie)
+        call_command("updatetopcurators")
+        curator.refresh_from_db()
+        self.assertEqual(50, curator.match)
+
+    def test_cached_leaderboard(self):
+        _add_movie_in_contest()
+        movie = Movie.objects.get(pk=1)
+        celeb_user = User.objects.create(username="A Celeb", email="celeb@example.com")
+        Profile.objects.create(user=celeb_user, is_celeb=True)
+        _create_movie_list_for_contest(owner_id=celeb_user.id).movies.add(movie)
+        curator = self._create_curator("curator", [movie])
+        call_command("updatetopcurators")
+
+        url = reverse("api:contest-top-curators", args=["v1", 1])
+        first = self.client.get(url).json()
+        with self.assertNumQueries(0):
+            self.assertEqual(first, self.client.get(url).json())
+            # other query params share the entry of the page
+            self.assertEqual(first, self.client.get(url, {"x": "1"}).json())
+        second = self.client.get(url, {"limit": 1, "offset": 1}).json()
+        self.assertEqual([], second["results"])
+
+        # the ranking job invalidates the cached pages
+        curator.liked_by.add(celeb_user)
+        call_command("updatetopcurators")
+        self.assertEqual(
+            1, self.client.get(url).json()["results"][0]["likes_on_recommend"]
+        )
+
+    def test_evicted_leaderboard_version_is_not_reused(self):
+        versions = {cache.get_leaderboard_version(cache.TOP_CURATORS, 1)}
+        cache.bump_leaderboard_version(cache.TOP_CURATORS, 1)
+        versions.add(cache.get_leaderboard_version(cache.TOP_CURATORS, 1))
+        django_cache.clear()
+        versions.add(cache.get_leaderboard_version(cache.TOP_CURATORS, 1))
+        self.assertEqual(3, len(versions))
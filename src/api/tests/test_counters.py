@@ -0,0 +1,230 @@
+import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api import counters
+from api.constants import RECOMMENDATION
+from api.models import (
+    Contest,
+    Movie,
+    MovieList,
+    MovieRateReview,
+    Profile,
+    Release,
+    User,
+)
+from .base import reverse, APITestCaseMixin, LoggedInMixin
+
+
+class CounterSignalsTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    fixtures = [
+        "user",
+        "profile",
+        "genre",
+        "lang",
+        "role",
+        "package",
+        "order",
+        "movie",
+        "contest_type",
+        "contest",
+        "movielist",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.movie = Movie.objects.get(pk=1)
+        self.fan = User.objects.create(
+            username="fan@example.com", email="fan@example.com"
+        )
+        Profile.objects.create(user=self.fan, onboarded=False)
+
+    def _assert_counts(self, recommend_count=0, review_count=0, reviews_given=0):
+        self.movie.refresh_from_db()
+        self.assertEqual(recommend_count, self.movie.recommend_count)
+        self.assertEqual(review_count, self.movie.review_count)
+        self.assertEqual(
+            reviews_given, Profile.objects.get(user=self.fan).reviews_given
+        )
+
+    def test_recommend_count(self):
+        url = reverse("api:profile-recommends", args=["v1", 1])
+        res = self.client.post(url, dict(movie=1))
+        self.assertEqual(200, res.status_code)
+        self._assert_counts(recommend_count=1)
+        # other lists don't count
+        MovieList.objects.create(owner=self.fan, name="Favourites").movies.add(
+            self.movie
+        )
+        fan_list = MovieList.objects.create(owner=self.fan, name=RECOMMENDATION)
+        self.movie.in_lists.add(fan_list)
+        self._assert_counts(recommend_count=2)
+        # removing a movie that isn't in the list changes nothing
+        fan_list.movies.remove(Movie.objects.create(title="Other", runtime=1))
+        self._assert_counts(recommend_count=2)
+
+        res = self.client.delete(url, dict(movie=1))
+        self.assertEqual(200, res.status_code)
+        self._assert_counts(recommend_count=1)
+        fan_list.delete()
+        self._assert_counts(recommend_count=0)
+
+    def test_review_counts(self):
+        review = MovieRateReview.objects.create(
+            movie=self.movie, author=self.fan, rating=6
+        )
+        MovieRateReview.objects.create(movie=self.movie, author=self.user, rating=8)
+        self._assert_counts(review_count=2, reviews_given=1)
+        self.assertEqual(7, self.movie.audience_rating)
+
+        review.rating = 9
+        review.save()
+        self._assert_counts(review_count=2, reviews_given=1)
+        self.assertEqual(8.5, self.movie.audience_rating)
+
+        review.delete()
+        self._assert_counts(review_count=1)
+        self.assertEqual(8, self.movie.audience_rating)
+
+    def test_rating_sums(self):
+        review = MovieRateReview.objects.create(
+            movie=self.movie, author=self.fan, content="Good"
+        )
+        self.movie.refresh_from_db()
+        self.assertEqual((0, 0), (self.movie.rating_sum, self.movie.rating_count))
+        self.assertFalse(self.movie.audience_rating)
+
+        # rating a reviewed movie later, from a freshly loaded review
+        review = MovieRateReview.objects.get(pk=review.pk)
+        review.rating = 7
+        review.save()
+        MovieRateReview.objects.create(movie=self.movie, author=self.user, rating=4)
+        self.movie.refresh_from_db()
+        self.assertEqual((11, 2), (self.movie.rating_sum, self.movie.rating_count))
+        self.assertEqual(5.5, self.movie.audience_rating)
+
+        # saving without changing the rating doesn't touch the movie
+        with self.assertNumQueries(1):
+            review.save()
+
+        MovieRateReview.objects.get(pk=review.pk).delete()
+        self.movie.refresh_from_db()
+        self.assertEqual((4, 1), (self.movie.rating_sum, self.movie.rating_count))
+        self.assertEqual(4, self.movie.audience_rating)
+
+    def test_review_like_count(self):
+        review = MovieRateReview.objects.create(
+            movie=self.movie, author=self.fan, content="Good"
+        )
+
+        def like_count():
+            return MovieRateReview.objects.get(pk=review.pk).like_count
+
+        review.liked_by.add(self.user, self.fan)
+        review.liked_by.add(self.user)
+        self.assertEqual(2, like_count())
+        review.liked_by.remove(self.user, User.objects.create(username="other"))
+        self.assertEqual(1, like_count())
+        self.user.liked_reviews.add(review)
+        self.assertEqual(2, like_count())
+        self.fan.liked_reviews.remove(review)
+        self.assertEqual(1, like_count())
+        self.user.liked_reviews.clear()
+        self.assertEqual(0, like_count())
+        review.liked_by.add(self.fan)
+        review.liked_by.clear()
+        self.assertEqual(0, like_count())
+
+    def test_movie_saves_keep_concurrent_counts(self):
+        movie = Movie.objects.get(pk=1)
+        MovieList.objects.create(owner=self.fan, name=RECOMMENDATION).movies.add(
+            self.movie
+        )
+        movie.title = "New title"
+        movie.save()
+        Release.objects.create(movie=movie, contest=Contest.objects.get(pk=1))
+        self._assert_counts(recommend_count=1)
+        self.assertEqual("New title", self.movie.title)
+
+    def test_buffered_changes_are_grouped(self):
+        other = Movie.objects.create(title="Other", runtime=1)
+        buffer = counters.CounterBuffer()
+        buffer.add(Movie, "pk", self.movie.pk, {"recommend_count": 2})
+        buffer.add(Movie, "pk", self.movie.pk, {"recommend_count": -1})
+        buffer.add(Movie, "pk", other.pk, {"recommend_count": 1, "review_count": 1})
+        buffer.add(Movie, "pk", other.pk, {"review_count": -1})
+        # same delta on both movies, review_count nets to 0
+        with self.assertNumQueries(1):
+            buffer.flush()
+        other.refresh_from_db()
+        self._assert_counts(recommend_count=1)
+        self.assertEqual(1, other.recommend_count)
+        self.assertEqual(0, other.review_count)
+
+    def test_reconcile_counters(self):
+        MovieList.objects.get(pk=1).movies.add(self.movie)
+        review = MovieRateReview.objects.create(
+            movie=self.movie, author=self.fan, rating=6
+        )
+        review.liked_by.add(self.user)
+        MovieRateReview.objects.update(like_count=4)
+        Movie.objects.update(
+            recommend_count=5,
+            review_count=0,
+            audience_rating=0,
+            rating_sum=3,
+            rating_count=2,
+        )
+        Profile.objects.update(reviews_given=3)
+
+        call_command("reconcilecounters", dry_run=True)
+        self._assert_counts(recommend_count=5, review_count=0, reviews_given=3)
+
+        call_command("reconcilecounters")
+        self._assert_counts(recommend_count=1, review_count=1, reviews_given=1)
+        self.assertEqual(6, self.movie.audience_rating)
+        self.assertEqual((6, 1), (self.movie.rating_sum, self.movie.rating_count))
+        self.assertEqual(0, self.profile.reviews_given)
+        self.assertEqual(1, MovieRateReview.objects.get(pk=review.pk).like_count)
+
+
+class ReconcileCountersTestCase(TestCase):
+    fixtures = ["user", "genre", "lang", "role", "package", "order", "movie"]
+
+    def test_movies_without_reviews(self):
+        Movie.objects.update(audience_rating=None)
+        with self.assertLogs("api.management.commands.reconcilecounters") as logs:
+            call_command("reconcilecounters")
+        self.assertIn("drift in 0 movie(s)", logs.output[-1])
+
+
+class CoalesceTestCase(TestCase):
+    fixtures = ["user", "genre", "lang", "role", "package", "order", "movie"]
+
+    def setUp(self):
+        # counters are only buffered outside of transactions
+        patcher = mock.patch.object(counters.connection, "in_atomic_block", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_see_buffered_changes(self):
+        Movie.objects.update(recommend_count=0)
+        with counters.coalesce():
+            counters.add(Movie, [1], recommend_count=1)
+            counters.add(Movie, [1], recommend_count=1)
+            # users aren't changed, nothing to flush
+            with self.assertNumQueries(1):
+                User.objects.count()
+            with self.assertNumQueries(2):
+                self.assertEqual(2, Movie.objects.get(pk=1).recommend_count)
+            counters.add(Movie, [1], recommend_count=-2)
+        self.assertEqual(0, Movie.objects.get(pk=1).recommend_count)
+
+    def test_flush_errors_keep_the_original_error(self):
+        with mock.patch.object(counters.CounterBuffer, "flush", side_effect=OSError):
+            with self.assertLogs("api.counters", "ERROR"):
+                with self.assertRaises(ValueError):
+                    with counters.coalesce():
+                        counters.add(Movie, [1], recommend_count=1)
+                        raise ValueError
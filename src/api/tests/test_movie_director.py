@@ -0,0 +1,67 @@
+import mock
+
+from django.test import TestCase
+
+from api.email import TEMPLATES
+from api.models import CrewMember, Movie, Order, Profile, Role, User
+from api.serializers.profile import ProfileDetailSerializer
+from .base import reverse, APITestCaseMixin, LoggedInMixin
+
+
+class MovieDirectorTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    fixtures = ["user", "profile", "genre", "lang", "role", "movie", "crewmember"]
+
+    def setUp(self):
+        super().setUp()
+        self.movie = Movie.objects.get(pk=1)
+        self.director_role = Role.objects.get(name="Director")
+        user = User.objects.create(username="other@example.com")
+        self.other = Profile.objects.create(user=user, onboarded=False)
+
+    def _director_id(self):
+        return Movie.objects.values_list("director_id", flat=True).get(pk=1)
+
+    def test_loaded_from_fixtures(self):
+        self.assertEqual(1, self.movie.director_id)
+
+    def test_follows_crew_changes(self):
+        first = CrewMember.objects.get(movie=self.movie, role=self.director_role)
+        CrewMember.objects.create(
+            movie=self.movie, profile=self.other, role=Role.objects.get(name="Actor")
+        )
+        self.assertEqual(1, self._director_id())
+
+        crew = CrewMember.objects.create(
+            movie=self.movie, profile=self.other, role=self.director_role
+        )
+        # the first director stays the director
+        self.assertEqual(1, self._director_id())
+        first.delete()
+        self.assertEqual(self.other.id, self._director_id())
+        crew.delete()
+        self.assertIsNone(self._director_id())
+        # the movie the crew member was created with is kept in sync
+        self.assertIsNone(self.movie.director_id)
+
+    def test_co_directors_keep_their_credit(self):
+        CrewMember.objects.create(
+            movie=self.movie, profile=self.other, role=self.director_role
+        )
+        # only the first director is displayed
+        self.assertEqual(1, self._director_id())
+        res = self.client.get(
+            reverse("api:moviesby-detail", args=["v1", self.other.id])
+        )
+        self.assertEqual([1], [movie["id"] for movie in res.json()["results"]])
+        self.assertEqual(1, ProfileDetailSerializer().get_movies_directed(self.other))
+
+    def test_submit_email_without_director(self):
+        CrewMember.objects.filter(movie=self.movie).delete()
+        self.movie.refresh_from_db()
+        order = Order.objects.create(owner=self.user, order_id="order_1")
+        with mock.patch("api.models.payment.email_trigger") as email_trigger:
+            order._trigger_submit_email([self.movie])
+        # only the owner's welcome email, there's no director to ask
+        email_trigger.assert_called_once_with(
+            self.user, TEMPLATES.WELCOME_MDFF, movie=self.movie
+        )
@@ -101,7 +101,7 @@ class MovieListTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
                     "state": "P",
                     "score": 0.0,
                     "created_at": "2020-12-15T10:53:15.167332+05:30",
-                    "recommend_count": 0,
+                    "recommend_count": 1,
                     "publish_on": "2021-01-01T10:53:15.167332+05:30",
                     "runtime": 100.0,
                 }
@@ -1,6 +1,9 @@
 from api.constants import MOVIE_STATE, RECOMMENDATION
 from api.models import MovieList, Movie, User, Profile
+from api.serializers.movie import MovieRecommendSerializer
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from .base import reverse, APITestCaseMixin, LoggedInMixin
 
 
@@ -33,7 +36,7 @@ class PersonalRecommendListTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
                     "state": "P",
                     "score": 0.0,
                     "created_at": "2020-12-15T10:53:15.167332+05:30",
-                    "recommend_count": 0,
+                    "recommend_count": 1,
                     "publish_on": "2021-01-01T10:53:15.167332+05:30",
                     "runtime": 100.0,
                 }
@@ -45,7 +48,42 @@ class PersonalRecommendListTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
         url = reverse("api:profile-recommends", args=["v1", 1])
         res = self.client.post(url, dict(movie=1))
         self.assertEqual(200, res.status_code)
-        self.assertEqual([{"id": 1}], res.json()["recommended"])
+        self.assertEqual({"movie": 1, "recommended": True, "changed": True}, res.json())
+        # recommending it again changes nothing
+        res = self.client.post(url, dict(movie=1))
+        self.assertEqual(
+            {"movie": 1, "recommended": True, "changed": False}, res.json()
+        )
+        self.assertEqual(1, Movie.objects.get(pk=1).recommend_count)
+
+    def test_unsaved_recommend_serializer(self):
+        serializer = MovieRecommendSerializer(instance=Profile.objects.get(pk=1))
+        self.assertEqual({}, serializer.data)
+
+    def test_recommend_queries_dont_grow_with_the_list(self):
+        url = reverse("api:profile-recommends", args=["v1", 1])
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.assertTrue(
+                    self.client.delete(url, dict(movie=1)).json()["changed"]
+                )
+                self.assertTrue(self.client.post(url, dict(movie=1)).json()["changed"])
+            return len(context.captured_queries)
+
+        self.client.post(url, dict(movie=1))
+        few = count_queries()
+        movie_list = MovieList.objects.get(name=RECOMMENDATION, owner_id=1)
+        for index in range(20):
+            movie_list.movies.add(
+                Movie.objects.create(
+                    title=f"Movie {index}",
+                    link=f"http://movie{index}.example.com",
+                    runtime=1,
+                    state=MOVIE_STATE.PUBLISHED,
+                )
+            )
+        self.assertEqual(few, count_queries())
 
     def test_undo_recommended_movie(self):
         self._recommend_movie()
@@ -54,7 +92,14 @@ class PersonalRecommendListTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
         url = reverse("api:profile-recommends", args=["v1", 1])
         res = self.client.delete(url, dict(movie=1))
         self.assertEqual(200, res.status_code)
-        self.assertEqual([], res.json()["recommended"])
+        self.assertEqual(
+            {"movie": 1, "recommended": False, "changed": True}, res.json()
+        )
+        self.assertEqual(0, recommend_list.movies.count())
+        res = self.client.delete(url, dict(movie=1))
+        self.assertEqual(
+            {"movie": 1, "recommended": False, "changed": False}, res.json()
+        )
 
     def test_recommend_unpublished_movie(self):
         movie = Movie.objects.get(pk=1)
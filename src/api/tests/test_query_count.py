@@ -0,0 +1,172 @@
+from django.test import TestCase
+
+from api.models import (
+    Contest,
+    CrewMember,
+    Movie,
+    MovieList,
+    MovieRateReview,
+    MpGenre,
+    Profile,
+    Role,
+    User,
+)
+from api.serializers.viewer import ViewerContext
+from .base import reverse, APITestCaseMixin, LoggedInMixin
+
+
+class MovieSummaryListQueryCountTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    """list endpoints serializing MovieSerializerSummary should cost a fixed
+    number of queries no matter how many movies are on the page"""
+
+    fixtures = [
+        "user",
+        "profile",
+        "genre",
+        "lang",
+        "role",
+        "package",
+        "order",
+        "movie",
+        "contest_type",
+        "contest",
+        "crewmember",
+        "test_mp_live_genre",
+    ]
+    extra_movies = 10
+
+    def setUp(self):
+        super().setUp()
+        director = Role.objects.get(name="Director")
+        contest = Contest.objects.get(pk=1)
+        mp_genre = MpGenre.objects.get(pk=1)
+        template = Movie.objects.get(pk=1)
+        for index in range(self.extra_movies):
+            user = User.objects.create(
+                username=f"director{index}@example.com",
+                email=f"director{index}@example.com",
+                first_name=f"Director{index}",
+            )
+            profile = Profile.objects.create(user=user, onboarded=False)
+            movie = Movie.objects.create(
+                title=f"Movie {index}",
+                link=f"http://movie{index}.example.com",
+                runtime=template.runtime,
+                state=template.state,
+                publish_on=template.publish_on,
+            )
+            CrewMember.objects.create(movie=movie, profile=profile, role=director)
+            movie.contests.add(contest)
+            movie.mp_genres.add(mp_genre)
+            self.profile.watchlist.add(movie)
+
+    def _assert_constant_queries(self, url, num_queries):
+        with self.assertNumQueries(num_queries):
+            res = self.client.get(url)
+        self.assertEqual(200, res.status_code)
+        movies = [m for m in res.json()["results"] if m["title"].startswith("Movie ")]
+        self.assertEqual(self.extra_movies, len(movies))
+        for movie in movies:
+            self.assertEqual(["January"], movie["contests"])
+            self.assertEqual("Director", movie["crew"][0]["role"])
+
+    def test_movie_list(self):
+        # auth, count, page, contests, crew, roles, profiles, users
+        self._assert_constant_queries(reverse("api:movie-list"), 8)
+
+    def test_mp_genre_movies(self):
+        # auth, mp genre, count, page, contests, crew, roles, profiles, users
+        self._assert_constant_queries(reverse("api:mpgenre-movies", args=["v1", 1]), 9)
+
+    def test_contest_movies(self):
+        # auth, contest, count, page, contests, crew, roles, profiles, users
+        self._assert_constant_queries(reverse("api:contest-movies", args=["v1", 1]), 9)
+
+    def test_my_watchlist(self):
+        # auth with profile, count, page, contests, crew, roles, profiles, users
+        self._assert_constant_queries(reverse("api:mywatchlist-list"), 8)
+
+
+class MovieDetailQueryCountTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    """viewer specific fields of movie detail are resolved once per request"""
+
+    fixtures = [
+        "user",
+        "profile",
+        "genre",
+        "lang",
+        "role",
+        "package",
+        "order",
+        "movie",
+        "contest_type",
+        "contest",
+        "crewmember",
+        "movielist",
+    ]
+
+    def _get_movie(self):
+        url = reverse("api:movie-detail", args=["v1", 1])
+        # auth, movie, genres, contests, crew, roles, profiles, users,
+        # latest order, package, viewer's reviews, watchlist, recommends
+        with self.assertNumQueries(13):
+            res = self.client.get(url)
+        self.assertEqual(200, res.status_code)
+        return res.json()
+
+    def test_movie_detail(self):
+        movie = Movie.objects.get(pk=1)
+        MovieList.objects.get(pk=2).movies.add(movie)
+        self.profile.watchlist.add(movie)
+        MovieRateReview.objects.create(
+            movie=movie, author=self.user, rating=8, content="Nice"
+        )
+        data = self._get_movie()
+        self.assertTrue(data["is_recommended"])
+        self.assertTrue(data["is_watchlisted"])
+        self.assertEqual(8, data["requestor_rating"]["rating"])
+
+    def test_movie_detail_with_large_crew(self):
+        actor = Role.objects.get(name="Actor")
+        movie = Movie.objects.get(pk=1)
+        for index in range(5):
+            user = User.objects.create(
+                username=f"actor{index}@example.com", email=f"actor{index}@example.com"
+            )
+            profile = Profile.objects.create(user=user, onboarded=False)
+            CrewMember.objects.create(movie=movie, profile=profile, role=actor)
+        data = self._get_movie()
+        self.assertEqual(6, len(data["crew"]))
+        self.assertFalse(data["is_recommended"])
+        self.assertFalse(data["is_watchlisted"])
+
+
+class ViewerContextTestCase(TestCase):
+    fixtures = ["user", "genre", "lang", "role", "package", "order", "movie"]
+
+    def test_reviews_of_rendered_movies(self):
+        user = User.objects.get(pk=1)
+        movies = [
+            Movie.objects.create(
+                title=f"Movie {index}",
+                link=f"http://movie{index}.example.com",
+                runtime=1,
+            )
+            for index in range(3)
+        ]
+        for movie in movies:
+            MovieRateReview.objects.create(movie=movie, author=user, rating=5)
+        viewer = ViewerContext(user)
+        viewer.add_movies(movies[:2])
+        with self.assertNumQueries(1):
+            self.assertEqual(5, viewer.get_review(movies[0]).rating)
+            self.assertEqual(5, viewer.get_review(movies[1]).rating)
+        # the reviews of other movies weren't loaded
+        self.assertEqual(
+            {movie.id for movie in movies[:2]}, set(viewer.reviews_by_movie_id)
+        )
+        unreviewed = Movie.objects.get(pk=1)
+        with self.assertNumQueries(2):
+            self.assertEqual(5, viewer.get_review(movies[2]).rating)
+            self.assertIsNone(viewer.get_review(unreviewed))
+            self.assertIsNone(viewer.get_review(unreviewed))
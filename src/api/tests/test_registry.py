@@ -0,0 +1,52 @@
+from django.test import TestCase
+
+from api import registry
+from api.models import Genre, Package, Role
+from .base import reverse, APITestCaseMixin
+
+
+class RegistryTestCase(APITestCaseMixin, TestCase):
+    fixtures = ["genre", "role", "package"]
+
+    def test_lookups_from_memory(self):
+        director = registry.get_director_role()
+        self.assertEqual(Role.objects.get(name="Director"), director)
+        with self.assertNumQueries(0):
+            self.assertIs(director, registry.get_director_role())
+            self.assertEqual(["Actor"], [r.name for r in registry.get_roles(["Actor"])])
+        with self.assertRaises(Role.DoesNotExist):
+            registry.get(Role, name="Stunt Double")
+
+    def test_invalidated_on_save_and_delete(self):
+        registry.get_director_role()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Role.objects.create(name="Stunt Double")
+        # other processes could reload the rows before the commit
+        self.assertFalse(registry.select(Role, name="Stunt Double"))
+        for callback in callbacks:
+            callback()
+        self.assertEqual("Stunt Double", registry.get(Role, name="Stunt Double").name)
+        with self.captureOnCommitCallbacks(execute=True):
+            Role.objects.get(name="Stunt Double").delete()
+        self.assertFalse(registry.select(Role, name="Stunt Double"))
+
+    def test_list_endpoints(self):
+        genre_count = Genre.objects.count()
+        self.client.get(reverse("api:genre-list"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("api:genre-list"))
+        self.assertEqual(genre_count, response.json()["count"])
+
+        Package.objects.create(name="inactive", amount=10, active=False)
+        response = self.client.get(reverse("api:package-list"), {"active": "false"})
+        self.assertEqual(["inactive"], [p["name"] for p in response.json()["results"]])
+        response = self.client.get(reverse("api:package-list"), {"active": "yes"})
+        self.assertEqual(400, response.status_code)
+
+    def test_list_ordering_and_search(self):
+        response = self.client.get(reverse("api:role-list"), {"ordering": "name"})
+        self.assertEqual(
+            ["Actor", "Director"], [r["name"] for r in response.json()["results"]]
+        )
+        response = self.client.get(reverse("api:role-list"), {"search": "Direct"})
+        self.assertEqual(["Director"], [r["name"] for r in response.json()["results"]])
@@ -0,0 +1,84 @@
+from django.test import TestCase
+
+from api.models import Movie, MovieRateReview, User
+from api.serializers.movie import MovieReviewDetailSerializer
+from .base import reverse, APITestCaseMixin, LoggedInMixin
+
+
+class MovieReviewLikeTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    fixtures = ["user", "profile", "genre", "lang", "role", "movie"]
+
+    def setUp(self):
+        super().setUp()
+        self.fans = [
+            User.objects.create(username=f"fan{index}@example.com", first_name="Fan")
+            for index in range(3)
+        ]
+        self.review = MovieRateReview.objects.create(
+            movie=Movie.objects.get(pk=1), author=self.fans[0], content="Good"
+        )
+
+    def _get_reviews(self):
+        res = self.client.get(reverse("api:review-list"))
+        self.assertEqual(200, res.status_code)
+        return res.json()["results"]
+
+    def test_like_review(self):
+        url = reverse("api:reviewlike-detail", args=["v1", self.review.id])
+        self.assertEqual(200, self.client.put(url).status_code)
+        self.assertEqual(200, self.client.put(url).status_code)
+        [review] = self._get_reviews()
+        self.assertEqual(1, review["like_count"])
+        self.assertTrue(review["liked_by_viewer"])
+        self.assertNotIn("liked_by", review)
+
+        self.review.liked_by.add(*self.fans)
+        self.assertEqual(200, self.client.delete(url).status_code)
+        [review] = self._get_reviews()
+        self.assertEqual(3, review["like_count"])
+        self.assertFalse(review["liked_by_viewer"])
+
+    def test_anonymous_feed(self):
+        self.review.liked_by.add(self.user)
+        self.client.credentials()
+        [review] = self._get_reviews()
+        self.assertEqual(1, review["like_count"])
+        self.assertFalse(review["liked_by_viewer"])
+
+    def test_likers(self):
+        self.review.liked_by.add(*self.fans)
+        url = reverse("api:review-likers", args=["v1", self.review.id])
+        res = self.client.get(url, dict(limit=2))
+        self.assertEqual(200, res.status_code)
+        self.assertEqual(3, res.json()["count"])
+        self.assertEqual(
+            [{"id": fan.id, "name": "Fan"} for fan in self.fans[:2]],
+            res.json()["results"],
+        )
+
+    def test_number_of_likes_ordering(self):
+        liked = MovieRateReview.objects.create(
+            movie=Movie.objects.get(pk=1), author=self.fans[1], content="Great"
+        )
+        liked.liked_by.add(*self.fans)
+        res = self.client.get(
+            reverse("api:review-list"), dict(ordering="number_of_likes")
+        )
+        self.assertEqual(200, res.status_code)
+        self.assertEqual(
+            [self.review.id, liked.id],
+            [review["id"] for review in res.json()["results"]],
+        )
+
+    def test_update_keeps_like_count(self):
+        review = MovieRateReview.objects.get(pk=self.review.id)
+        # liked after the review was loaded
+        self.review.liked_by.add(*self.fans)
+        serializer = MovieReviewDetailSerializer(
+            review, data=dict(content="Better"), partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        review = MovieRateReview.objects.get(pk=self.review.id)
+        self.assertEqual("Better", review.content)
+        self.assertEqual(3, review.like_count)
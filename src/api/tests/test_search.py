@@ -0,0 +1,72 @@
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.constants import MOVIE_STATE
+from api.models import CrewMember, Movie, Profile, Role, SearchEntry, User
+from .base import reverse, APITestCaseMixin
+
+
+class SearchTestCase(APITestCaseMixin, TestCase):
+    fixtures = ["user", "profile", "genre", "lang", "role", "movie", "crewmember"]
+
+    def setUp(self):
+        super().setUp()
+        self.director = User.objects.create(
+            username="star@example.com", first_name="Starling", last_name="Wood"
+        )
+        profile = Profile.objects.create(user=self.director, onboarded=False)
+        self.star_wars = self._create_movie("Star Wars")
+        self.other = self._create_movie("Night Walk")
+        CrewMember.objects.create(
+            movie=self.other, profile=profile, role=Role.objects.get(name="Director")
+        )
+
+    def _create_movie(self, title, state=MOVIE_STATE.PUBLISHED):
+        return Movie.objects.create(
+            title=title,
+            link=f"http://{title.replace(' ', '')}.example.com",
+            runtime=10,
+            state=state,
+        )
+
+    def _search(self, q, **params):
+        response = self.client.get(reverse("api:search-list"), dict(params, q=q))
+        self.assertEqual(200, response.status_code)
+        data = response.json()
+        return (
+            [movie["title"] for movie in data.get("movies", [])],
+            [profile["name"] for profile in data.get("profiles", [])],
+        )
+
+    def test_ranked_prefix_search(self):
+        # title matches rank above crew name matches
+        self.assertEqual(
+            (["Star Wars", "Night Walk"], ["Starling Wood"]), self._search("sta")
+        )
+        # every word has to match
+        self.assertEqual((["Star Wars"], []), self._search("STAR wars"))
+        self.assertEqual(["Night Walk"], self._search("wood", type="movie")[0])
+        self.assertEqual(([], []), self._search("s"))
+
+    def test_index_is_updated(self):
+        self.star_wars.title = "Moon Wars"
+        self.star_wars.save()
+        self.assertEqual(["Night Walk"], self._search("star")[0])
+
+        self.director.first_name = "Bright"
+        self.director.save()
+        self.assertEqual((["Night Walk"], ["Bright Wood"]), self._search("bright"))
+
+        self._create_movie("Star Draft", state=MOVIE_STATE.CREATED)
+        self.assertEqual([], self._search("draft")[0])
+
+        self.other.delete()
+        self.assertEqual([], self._search("night")[0])
+
+    def test_rebuild_command(self):
+        fixture_movie = Movie.objects.get(pk=1)
+        SearchEntry.objects.all().delete()
+        call_command("rebuildsearchindex", batch_size=1)
+        titles, _ = self._search(fixture_movie.title)
+        self.assertIn(fixture_movie.title, titles)
+        self.assertIn("Starling Wood", self._search("starl")[1])
@@ -0,0 +1,159 @@
+import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.constants import MOVIE_STATE, RECOMMENDATION
+from api.models import Movie, MovieList, Profile, User
+from .base import reverse, APITestCaseMixin, LoggedInMixin
+
+
+class BulkToggleTestCase(APITestCaseMixin, LoggedInMixin, TestCase):
+    fixtures = ["user", "profile"]
+
+    def setUp(self):
+        super().setUp()
+        self.movies = [
+            Movie.objects.create(
+                title=f"Movie {index}",
+                link=f"http://movie{index}.example.com",
+                runtime=10,
+                state=MOVIE_STATE.PUBLISHED,
+            )
+            for index in range(10)
+        ]
+        self.users = [
+            User.objects.create(username=f"user{index}@example.com")
+            for index in range(5)
+        ]
+        for user in self.users:
+            Profile.objects.create(user=user)
+
+    def _toggle(self, operations):
+        return self.client.post(
+            reverse("api:toggle-list"), dict(operations=operations), format="json"
+        )
+
+    def _operations(self, count, action="add"):
+        return (
+            [dict(kind="watchlist", target_id=m.id, action=action) for m in self.movies]
+            + [
+                dict(kind="recommend", target_id=m.id, action=action)
+                for m in self.movies
+            ]
+            + [dict(kind="follow", target_id=u.id, action=action) for u in self.users]
+        )[:count]
+
+    def _recommended_ids(self):
+        return set(
+            MovieList.objects.get(
+                owner=self.user, name=RECOMMENDATION
+            ).movies.values_list("id", flat=True)
+        )
+
+    def test_applies_operations(self):
+        movie_ids = {movie.id for movie in self.movies}
+        res = self._toggle(self._operations(25))
+        self.assertEqual(200, res.status_code, res.content)
+        results = res.json()["results"]
+        self.assertEqual(25, len(results))
+        self.assertTrue(all(result["active"] for result in results))
+        self.assertEqual(
+            movie_ids, set(self.profile.watchlist.values_list("id", flat=True))
+        )
+        self.assertEqual(movie_ids, self._recommended_ids())
+        self.assertEqual(1, Movie.objects.get(pk=self.movies[0].id).recommend_count)
+        self.assertEqual(
+            {user.id for user in self.users},
+            set(self.profile.follows.values_list("user_id", flat=True)),
+        )
+
+        res = self._toggle(self._operations(25, action="remove"))
+        self.assertEqual(200, res.status_code, res.content)
+        self.assertFalse(self.profile.watchlist.exists())
+        self.assertEqual(set(), self._recommended_ids())
+        self.assertEqual(0, Movie.objects.get(pk=self.movies[0].id).recommend_count)
+        self.assertFalse(self.profile.follows.exists())
+
+    def test_last_operation_wins(self):
+        movie = self.movies[0]
+        res = self._toggle(
+            [
+                dict(kind="watchlist", target_id=movie.id, action="add"),
+                dict(kind="watchlist", target_id=movie.id, action="remove"),
+            ]
+        )
+        self.assertEqual(
+            [dict(kind="watchlist", target_id=movie.id, active=False)],
+            res.json()["results"],
+        )
+        self.assertFalse(self.profile.watchlist.exists())
+
+    def test_constant_number_of_queries(self):
+        def count_queries(operations):
+            with CaptureQueriesContext(connection) as context:
+                res = self._toggle(operations)
+            self.assertEqual(200, res.status_code, res.content)
+            return len(context.captured_queries)
+
+        MovieList.objects.create(owner=self.user, name=RECOMMENDATION)
+        # caches the token
+        self.assertEqual(400, self._toggle([]).status_code)
+        movies, users = self.movies, self.users
+        for action in ("add", "remove"):
+            self.movies, self.users = movies[:1], users[:1]
+            few = count_queries(self._operations(3, action))
+            self.movies, self.users = movies[1:], users[1:]
+            many = count_queries(self._operations(22, action))
+            self.assertEqual(few, many)
+
+    def test_invalid_targets_are_rejected(self):
+        unpublished = self.movies[0]
+        unpublished.state = MOVIE_STATE.SUBMITTED
+        unpublished.save()
+        res = self._toggle(
+            [
+                dict(kind="watchlist", target_id=self.movies[1].id, action="add"),
+                dict(kind="recommend", target_id=unpublished.id, action="add"),
+                dict(kind="follow", target_id=999, action="add"),
+            ]
+        )
+        self.assertEqual(400, res.status_code)
+        self.assertEqual(
+            {"operations": [f"recommend {unpublished.id}, follow 999 does not exist"]},
+            res.json(),
+        )
+        # nothing is applied
+        self.assertFalse(self.profile.watchlist.exists())
+
+    def test_unpublished_movie_can_be_removed(self):
+        movie = self.movies[0]
+        self._toggle([dict(kind="recommend", target_id=movie.id, action="add")])
+        movie.state = MOVIE_STATE.SUBMITTED
+        movie.save()
+        res = self._toggle(
+            [dict(kind="recommend", target_id=movie.id, action="remove")]
+        )
+        self.assertEqual(200, res.status_code, res.content)
+        self.assertEqual(set(), self._recommended_ids())
+        self.assertEqual(0, Movie.objects.get(pk=movie.id).recommend_count)
+
+    def test_reports_stored_state(self):
+        movie = self.movies[0]
+        operations = [
+            dict(kind="recommend", target_id=movie.id, action="add"),
+            dict(kind="watchlist", target_id=movie.id, action="remove"),
+        ]
+        self.profile.watchlist.add(movie)
+        # a recommend that wasn't stored isn't reported as active
+        with mock.patch("api.recommends.recommend_all"):
+            res = self._toggle(operations)
+        self.assertEqual(200, res.status_code, res.content)
+        self.assertEqual(
+            [
+                dict(kind="recommend", target_id=movie.id, active=False),
+                dict(kind="watchlist", target_id=movie.id, active=False),
+            ],
+            res.json()["results"],
+        )
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from api.views import auth, profile, movie, payment, contest
+from api.views import auth, profile, movie, payment, contest, search
 
 app_name = "api"
 
@@ -9,6 +9,7 @@ router.register("profile", profile.ProfileView, basename="profile")
 router.register("profile-image", profile.ProfileImageView, basename="profileimage")
 router.register("role", profile.RoleView, basename="role")
 router.register("follow", profile.FollowView, basename="follow")
+router.register("toggle", profile.BulkToggleView, basename="toggle")
 router.register("lang", movie.MovieLanguageView, basename="lang")
 router.register("genre", movie.GenreView, basename="genre")
 router.register("submit", movie.SubmissionView, basename="submit")
@@ -39,6 +40,7 @@ router.register("contest", contest.ContestView, basename="contest")
 router.register("movies-by", movie.MoviesByView, basename="moviesby")
 router.register("account", auth.AccountVerifyView, basename="account")
 router.register("mpgenre", movie.MpGenreView, basename="mpgenre")
+router.register("search", search.SearchView, basename="search")
 
 
 urlpatterns = [
@@ -1,12 +1,13 @@
 from logging import getLogger
 
+from django.http import Http404
 from django.utils import timezone
 
-from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import mixins, viewsets, response
 from rest_framework.decorators import action
 
+from api import cache
 from api.constants import CONTEST_STATE
 from api.serializers.contest import ContestRecommendListSerializer
 from api.serializers.movie import (
@@ -49,15 +50,36 @@ class ContestView(viewsets.GenericViewSet, mixins.ListModelMixin):
             "movies": MovieSerializerSummary,
         }.get(self.action, ContestSerializer)
 
+    def _cached_leaderboard(self, kind, get_entries):
+        """serve the leaderboard page from cache, without touching the
+        database when it is there"""
+        # only the page tells the responses apart, keying on the whole url would
+        # add an entry per made up query param (the host is in the page links)
+        request = self.request
+        key = cache.leaderboard_key(
+            kind,
+            self.kwargs["pk"],
+            request.get_host(),
+            self.paginator.get_limit(request),
+            self.paginator.get_offset(request),
+        )
+        data = cache.get_or_set(
+            key, lambda: paginated_response(self, get_entries(self.get_object())).data
+        )
+        return response.Response(data)
+
     @action(
         methods=["get"],
         detail=True,
         url_path="top-creators",
     )
     def top_creators(self, request, pk=None, **kwargs):
-        contest = self.get_object()
-        top_creators = contest.top_creators.order_by("pos").all()
-        return paginated_response(self, top_creators)
+        return self._cached_leaderboard(
+            cache.TOP_CREATORS,
+            lambda contest: contest.top_creators.select_related(
+                "profile__user"
+            ).order_by("pos"),
+        )
 
     @action(
         methods=["get"],
@@ -65,9 +87,12 @@ class ContestView(viewsets.GenericViewSet, mixins.ListModelMixin):
         url_path="top-curators",
     )
     def top_curators(self, request, pk=None, **kwargs):
-        contest = self.get_object()
-        top_curators = contest.top_curators.order_by("pos").all()
-        return paginated_response(self, top_curators)
+        return self._cached_leaderboard(
+            cache.TOP_CURATORS,
+            lambda contest: contest.top_curators.select_related(
+                "profile__user"
+            ).order_by("pos"),
+        )
 
     @action(methods=["get", "post", "delete"], detail=True, url_path="recommend")
     def recommend(self, request, pk=None, **kwargs):
@@ -93,20 +118,30 @@ class ContestView(viewsets.GenericViewSet, mixins.ListModelMixin):
         movies_qs = contest.movies.order_by("-publish_on", "-recommend_count", "title")
         return paginated_response(self, movies_qs)
 
+    def _cached_position(self, kind, model):
+        def get_position():
+            contest = self.get_object()
+            position = (
+                model.objects.filter(contest=contest, profile__user=self.request.user)
+                .select_related("profile__user")
+                .first()
+            )
+            if position is None:
+                return None
+            return self.get_serializer(instance=position).data
+
+        key = cache.leaderboard_key(
+            kind, self.kwargs["pk"], "user", self.request.user.id
+        )
+        data = cache.get_or_set(key, get_position)
+        if data is None:
+            raise Http404
+        return response.Response(data=data)
+
     @action(methods=["get"], detail=True, permission_classes=[IsAuthenticated])
     def my_creator_position(self, request, **kwargs):
-        contest = self.get_object()
-        top_creator = get_object_or_404(
-            TopCreator.objects, contest=contest, profile=request.user.profile
-        )
-        serializer = self.get_serializer(instance=top_creator)
-        return response.Response(data=serializer.data)
+        return self._cached_position(cache.TOP_CREATORS, TopCreator)
 
     @action(methods=["get"], detail=True, permission_classes=[IsAuthenticated])
     def my_curator_position(self, request, **kwargs):
-        contest = self.get_object()
-        top_curator = get_object_or_404(
-            TopCurator.objects, contest=contest, profile=request.user.profile
-        )
-        serializer = self.get_serializer(instance=top_curator)
-        return response.Response(data=serializer.data)
+        return self._cached_position(cache.TOP_CURATORS, TopCurator)
@@ -3,7 +3,7 @@ from datetime import timedelta, datetime
 from logging import getLogger
 
 from django.utils.timezone import make_aware, get_current_timezone
-from django.db.models import Count
+from django.db.models import Count, Exists, F, OuterRef
 from django.db import transaction
 
 
@@ -12,8 +12,10 @@ from rest_framework import mixins, parsers, viewsets, response, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from api import recommends, registry
 from api.models.movie import CrewMember, MpGenre
-from api.constants import MOVIE_STATE, RECOMMENDATION
+from api.pagination import KeysetPagination
+from api.constants import MOVIE_STATE
 from api.serializers.movie import (
     CreateOrderSerializer,
     OrderSerializer,
@@ -23,6 +25,7 @@ from api.serializers.movie import (
     GenreSerializer,
     MovieSerializer,
     MovieReviewDetailSerializer,
+    MinUserSerializer,
     MovieListSerializer,
     CrewMemberRequestSerializer,
     MovieSerializerSummary,
@@ -37,11 +40,9 @@ from api.models import (
     MovieRateReview,
     MovieList,
     CrewMemberRequest,
-    Role,
-    Contest,
     Profile,
 )
-from .utils import paginated_response
+from .utils import RegistryListMixin, paginated_response
 
 logger = getLogger(__name__)
 
@@ -113,6 +114,7 @@ class MovieView(
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
+    pagination_class = KeysetPagination
     ordering_fields = ["publish_on", "recommend_count"]
     ordering = ["-publish_on", "-recommend_count", "title"]
     filterset_fields = {
@@ -136,6 +138,13 @@ class MovieView(
                 crewmember__role__name="Director",
                 crewmember__profile=self.request.user.profile,
             ).distinct()
+        if self.action == "retrieve":
+            return base_qs.select_related("lang").prefetch_related(
+                "genres",
+                "contests",
+                "crewmember_set__role",
+                "crewmember_set__profile__user",
+            )
         return base_qs
 
     def get_serializer_class(self):
@@ -163,9 +172,9 @@ class MoviesByView(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         profile = self.get_object()
         director_membership = CrewMember.objects.filter(
             profile=profile, role__name="Director"
-        ).all()
+        )
         movies_queryset = Movie.objects.filter(
-            id__in=[dm.movie_id for dm in director_membership],
+            id__in=director_membership.values("movie_id"),
             state=MOVIE_STATE.PUBLISHED,
         )
         queryset = self.filter_queryset(movies_queryset)
@@ -184,12 +193,12 @@ class MoviePosterView(viewsets.ModelViewSet):
     serializer_class = MoviePosterSerializer
 
 
-class MovieLanguageView(viewsets.GenericViewSet, mixins.ListModelMixin):
+class MovieLanguageView(viewsets.GenericViewSet, RegistryListMixin):
     queryset = MovieLanguage.objects.all()
     serializer_class = MovieLanguageSerializer
 
 
-class GenreView(viewsets.GenericViewSet, mixins.ListModelMixin):
+class GenreView(viewsets.GenericViewSet, RegistryListMixin):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
 
@@ -210,23 +219,44 @@ class MovieReviewView(
 ):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsMovieRateReviewOwner]
     serializer_class = MovieReviewDetailSerializer
+    pagination_class = KeysetPagination
     filterset_fields = ["movie__id", "author__id"]
-    ordering_fields = ["published_at", "number_of_likes"]
+    # number_of_likes is the ordering clients used before like_count
+    ordering_fields = ["published_at", "like_count", "number_of_likes"]
     ordering = [
-        "-number_of_likes",
+        "-like_count",
         "-published_at",
     ]
 
     def get_queryset(self):
-        query = MovieRateReview.objects.annotate(number_of_likes=Count("liked_by"))
+        query = MovieRateReview.objects.annotate(number_of_likes=F("like_count"))
+        user = self.request.user
+        if user.is_authenticated:
+            query = query.annotate(
+                liked_by_viewer=Exists(
+                    MovieRateReview.liked_by.through.objects.filter(
+                        movieratereview_id=OuterRef("pk"), user_id=user.id
+                    )
+                )
+            )
         if self.request.method in permissions.SAFE_METHODS:
             return query.exclude(content__isnull=True).exclude(content__exact="")
         else:
             return query
 
+    def get_serializer_class(self):
+        if self.action == "likers":
+            return MinUserSerializer
+        return MovieReviewDetailSerializer
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=["get"], detail=True)
+    def likers(self, request, pk=None, **kwargs):
+        review = self.get_object()
+        return paginated_response(self, review.liked_by.order_by("id"))
+
 
 class MovieReviewLikeView(
     viewsets.GenericViewSet, mixins.DestroyModelMixin, mixins.UpdateModelMixin
@@ -237,14 +267,12 @@ class MovieReviewLikeView(
         user = request.user
         instance = self.get_object()
         instance.liked_by.add(user)
-        instance.save()
         return response.Response(dict(success=True))
 
     def destroy(self, request, *args, **kwargs):
         user = request.user
         instance = self.get_object()
         instance.liked_by.remove(user)
-        instance.save()
         return response.Response(dict(success=True))
 
 
@@ -258,14 +286,12 @@ class MovieWatchlistView(
         user = request.user
         movie = self.get_object()
         user.profile.watchlist.add(movie)
-        user.profile.save()
         return response.Response(dict(success=True))
 
     def destroy(self, request, *args, **kwargs):
         user = request.user
         movie = self.get_object()
         user.profile.watchlist.remove(movie)
-        user.profile.save()
         return response.Response(dict(success=True))
 
 
@@ -277,79 +303,19 @@ class MovieRecommendView(
     # TODO: make sure front-end is not using it and then delete it
     # recommendation should be done via ProfileView additional action
     ordering_fields = []
-    queryset = Contest.objects.filter(state=MOVIE_STATE.PUBLISHED)
-
-    def _is_movie_live(self, movie):
-        return (
-            movie.state == MOVIE_STATE.PUBLISHED
-            and movie.contest
-            and movie.contest.is_live()
-        )
-
-    def _add_to_contest_recommend(self, movie, user):
-        if self._is_movie_live(movie):
-            logger.debug("MOVIE IS LIVE")
-            # fetch the list for that month
-            # check the size for list
-            contest_recomm_list, _ = MovieList.objects.get_or_create(
-                name=movie.contest.name, owner=user, contest=movie.contest, frozen=True
-            )
-            if (
-                contest_recomm_list.movies.count()
-                >= contest_recomm_list.contest.max_recommends
-            ):
-                return response.Response(
-                    dict(
-                        success=False,
-                        message=f"Cannot recommend more that {contest_recomm_list.contest.max_recommends} movies from {contest_recomm_list.contest.name}",
-                    )
-                )
-            else:
-                contest_recomm_list.movies.add(movie)
-                contest_recomm_list.save()
-                logger.debug("Added to contest list")
-
-    def _remove_from_contest_recommend(self, movie, user):
-        if self._is_movie_live(movie):
-            logger.debug("MOVIE IS LIVE")
-            contest_recomm_list = MovieList.objects.filter(
-                owner=user, contest=movie.contest
-            ).first()
-            if contest_recomm_list and movie in contest_recomm_list.movies.all():
-                contest_recomm_list.movies.remove(movie)
-                contest_recomm_list.save()
-                logger.debug("Removed from contest list")
+    queryset = Movie.objects.filter(state=MOVIE_STATE.PUBLISHED)
 
     def update(self, request, *args, **kwargs):
-        user = request.user
         movie = self.get_object()
-        recommendation_list, _ = MovieList.objects.get_or_create(
-            owner=user, name=RECOMMENDATION
+        return response.Response(
+            dict(success=recommends.recommend(request.user, movie.id))
         )
-        logger.debug(f"{recommendation_list}")
-        if movie in recommendation_list.movies.all():
-            return response.Response(dict(success=False))
-        self._add_to_contest_recommend(movie, user)
-        recommendation_list.movies.add(movie)
-        recommendation_list.save()
-        movie.recommend_count += 1
-        movie.save()
-        return response.Response(dict(success=True))
 
     def destroy(self, request, *args, **kwargs):
-        user = request.user
         movie = self.get_object()
-        recommendation_list = MovieList.objects.get(owner=user, name=RECOMMENDATION)
-        if recommendation_list:
-            if movie in recommendation_list.movies.all():
-                recommendation_list.movies.remove(movie)
-                recommendation_list.save()
-                movie.recommend_count -= 1
-                movie.save()
-                self._remove_from_contest_recommend(movie, user)
-            else:
-                return response.Response(dict(success=False))
-        return response.Response(dict(success=True))
+        return response.Response(
+            dict(success=recommends.unrecommend(request.user, movie.id))
+        )
 
 
 class IsMovieListOwnerOrLike(permissions.BasePermission):
@@ -427,11 +393,11 @@ class IsDirectorCreatorOrRequestor(permissions.BasePermission):
                 object.user == me
                 or object.requestor == me
                 or object.movie.crewmember_set.filter(
-                    role__name="Director", profile__user=me
+                    role=registry.get_director_role(), profile__user=me
                 ).exists()
             )
 
-        director = Role.objects.get(name="Director")
+        director = registry.get_director_role()
         return Movie.objects.filter(
             id=object.movie.id,
             crewmember__role=director,
@@ -456,9 +422,12 @@ class CrewMemberRequestView(viewsets.ModelViewSet):
 
 
 class MpGenreView(
-    mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+    mixins.RetrieveModelMixin, RegistryListMixin, viewsets.GenericViewSet
 ):
     queryset = MpGenre.objects.filter(live=True)
+    registry_filter = {"live": True}
+    # the list is served from the registry and keeps limit/offset
+    pagination_class = KeysetPagination
 
     def get_serializer_class(self):
         return {"movies": MovieSerializerSummary}.get(self.action, MpGenreSerializer)
@@ -6,11 +6,12 @@ from django.conf import settings
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, mixins, viewsets
+from rest_framework import status, viewsets
 
 from api.models import Order
 from api.models.payment import Package
 from api.serializers.payment import PackageSerializer
+from .utils import RegistryListMixin
 
 logger = getLogger(__name__)
 rzp_client = razorpay.Client(
@@ -54,7 +55,7 @@ class VerifyPayment(APIView):
         return Response(response, status=status_code)
 
 
-class PackageView(mixins.ListModelMixin, viewsets.GenericViewSet):
+class PackageView(RegistryListMixin, viewsets.GenericViewSet):
     queryset = Package.objects.all()
     filterset_fields = ["active"]
     serializer_class = PackageSerializer
@@ -15,11 +15,13 @@ from api.serializers.profile import (
     ProfileImageSerializer,
     RoleSerializer,
     FollowSerializer,
+    BulkToggleSerializer,
     ProfileSerializer,
     NotificationSerializer,
 )
 from api.constants import CREW_MEMBER_REQUEST_STATE, RECOMMENDATION, MOVIE_STATE
 from api.models import Profile, Role, MovieList, CrewMemberRequest
+from .utils import RegistryListMixin
 
 
 logger = getLogger(__name__)
@@ -198,9 +200,10 @@ class FilmmakerLeaderboardView(viewsets.GenericViewSet, mixins.ListModelMixin):
     ordering = ["creator_rank"]
 
 
-class RoleView(viewsets.ModelViewSet):
+class RoleView(RegistryListMixin, viewsets.ModelViewSet):
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
+    search_fields = ["name"]
 
 
 class FollowView(viewsets.GenericViewSet, mixins.UpdateModelMixin):
@@ -245,6 +248,22 @@ class FollowView(viewsets.GenericViewSet, mixins.UpdateModelMixin):
         serializer.save(user=self.request.user)
 
 
+class BulkToggleView(viewsets.GenericViewSet):
+    """
+    adds and removes movies of the watchlist and the recommend list and
+    follows of the logged in user in one request, see `BulkToggleSerializer`
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkToggleSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save(profile=request.user.profile)
+        return response.Response(dict(results=results))
+
+
 class MyWatchlistView(viewsets.GenericViewSet, mixins.ListModelMixin):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = MovieSerializerSummary
@@ -0,0 +1,50 @@
+from rest_framework import response, viewsets
+from rest_framework.exceptions import ValidationError
+
+from api import search
+from api.constants import MOVIE_STATE
+from api.models import Movie, Profile, SearchEntry
+from api.serializers.movie import MovieSerializerSummary
+from api.serializers.profile import ProfileSerializer
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+class SearchView(viewsets.GenericViewSet):
+    """Ranked prefix search of published movies (title, crew names) and
+    profiles (names), see `api.search`.
+
+    `q` is the query, `type` (movie or profile) limits the search to one kind
+    and `limit` the number of results of each kind.
+    """
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "")
+        kind = request.query_params.get("type")
+        if kind not in (None, "movie", "profile"):
+            raise ValidationError({"type": ["must be movie or profile"]})
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": ["must be a number"]})
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        data = {}
+        if kind in (None, "movie"):
+            ids = search.search(SearchEntry.MOVIE, query, limit)
+            movies = Movie.objects.filter(state=MOVIE_STATE.PUBLISHED).in_bulk(ids)
+            data["movies"] = MovieSerializerSummary(
+                [movies[id] for id in ids if id in movies],
+                many=True,
+                context={"request": request},
+            ).data
+        if kind in (None, "profile"):
+            ids = search.search(SearchEntry.PROFILE, query, limit)
+            profiles = Profile.objects.select_related("user").in_bulk(ids)
+            data["profiles"] = ProfileSerializer(
+                [profiles[id] for id in ids if id in profiles],
+                many=True,
+                context={"request": request},
+            ).data
+        return response.Response(data)
@@ -1,4 +1,11 @@
-from rest_framework import response
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+from rest_framework import exceptions, mixins, response
+from rest_framework.settings import api_settings
+
+from api import registry
+
+_BOOLEANS = {"true": True, "1": True, "false": False, "0": False}
 
 
 def paginated_response(view, queryset):
@@ -8,3 +15,40 @@ def paginated_response(view, queryset):
         return view.get_paginated_response(serializer.data)
     serializer = view.get_serializer(instance=queryset, many=True)
     return response.Response(serializer.data)
+
+
+class RegistryListMixin(mixins.ListModelMixin):
+    """list of reference data served from `api.registry`, `registry_filter`
+    narrows the rows like the queryset filter does and `filterset_fields`
+    are matched exactly against the query params, ordering and searching go
+    through the filter backends of the queryset"""
+
+    registry_filter = {}
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if params.get(api_settings.ORDERING_PARAM) or params.get(
+            api_settings.SEARCH_PARAM
+        ):
+            return super().list(request, *args, **kwargs)
+        model = self.queryset.model
+        rows = registry.select(
+            model, **self.registry_filter, **self._get_filters(model)
+        )
+        return paginated_response(self, rows)
+
+    def _get_filters(self, model):
+        filters = {}
+        for name in getattr(self, "filterset_fields", []):
+            value = self.request.query_params.get(name)
+            if not value:
+                continue
+            field = model._meta.get_field(name)
+            try:
+                if isinstance(field, models.BooleanField):
+                    filters[name] = _BOOLEANS[value.lower()]
+                else:
+                    filters[name] = field.to_python(value)
+            except (KeyError, DjangoValidationError):
+                raise exceptions.ValidationError({name: [f"invalid value {value}"]})
+        return filters
@@ -55,13 +55,14 @@ app.conf.beat_schedule = {
         ),
         "args": ("updatetopcurators",),
     },
-    "daily-updatemovierecommends": {
+    # counters are maintained by api.counters, this only repairs drift
+    "daily-reconcilecounters": {
         "task": "api.tasks.run_management",
         "schedule": crontab(
             minute="15",
-            hour="*/3",
+            hour="2",
         ),
-        "args": ("updatemovierecommends",),
+        "args": ("reconcilecounters",),
     },
     "daily-youtubelinkfix": {
         "task": "api.tasks.run_management",
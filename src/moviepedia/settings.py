@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 import sys
+import warnings
 import dj_database_url
 
 # load the .env file
@@ -92,6 +93,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.CounterMiddleware",
     "django_prometheus.middleware.PrometheusAfterMiddleware",
 ]
 
@@ -124,7 +126,8 @@ options = db_default.get("OPTIONS", {})
 options["charset"] = "utf8mb4"
 db_default["OPTIONS"] = options
 DATABASES = {"default": db_default}
-if IN_TEST or "test" in sys.argv:
+TESTING = IN_TEST or "test" in sys.argv
+if TESTING:
     print("in test")
     DATABASES["default"] = {
         "ENGINE": "django.db.backends.sqlite3",
@@ -132,6 +135,50 @@ if IN_TEST or "test" in sys.argv:
     }
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
+# Cache
+# version stamps and invalidations only reach the other web workers and the
+# celery worker through a cache shared by all of them. CACHE_LOCATION points
+# to redis (e.g. redis://redis:6379/1), without it every process has its own
+# cache in local memory and sees the changes made by the others late
+
+CACHE_LOCATION = os.getenv("CACHE_LOCATION", "")
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND",
+    (
+        "django_redis.cache.RedisCache"
+        if CACHE_LOCATION
+        else "django.core.cache.backends.locmem.LocMemCache"
+    ),
+)
+SHARED_CACHE = CACHE_BACKEND not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+if not SHARED_CACHE and not (DEBUG or TESTING):
+    warnings.warn(
+        "CACHE_LOCATION isn't set, each process uses its own cache: set it to a "
+        "redis url so cached reference data and pages are refreshed everywhere"
+    )
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": CACHE_LOCATION,
+    }
+}
+
+# sessions and tokens are only cached when every process sees the same cache,
+# otherwise a logout or a revoked token would stay valid in the other ones
+# (tests run in a single process)
+CACHE_AUTH = SHARED_CACHE or TESTING
+
+# sessions are read from the cache and written through to the database
+SESSION_ENGINE = (
+    "django.contrib.sessions.backends.cached_db"
+    if CACHE_AUTH
+    else "django.contrib.sessions.backends.db"
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -175,6 +222,9 @@ MEDIA_ROOT = os.getenv("MEDIA_ROOT", "/media")
 MEDIA_POSTERS = "posters"
 
 MEDIA_PROFILE = "profile"
+
+# generated sitemaps, see seo.sitemaps
+SITEMAP_DIR = os.getenv("SITEMAP_DIR", os.path.join(MEDIA_ROOT, "sitemaps"))
 # square dimension 1:1 aspect ratio
 THUMB_DIMENS = [150, 80]
 # [195, 110]
@@ -197,7 +247,11 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         # https://stackoverflow.com/a/21507720/3937119 check the link for adding expiring tokens
         # TODO: use JWT or OAuth2.0 instead
-        "rest_framework.authentication.TokenAuthentication",
+        (
+            "api.authentication.CachedTokenAuthentication"
+            if CACHE_AUTH
+            else "rest_framework.authentication.TokenAuthentication"
+        ),
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
@@ -0,0 +1,73 @@
+"""Cache of rendered SEO responses.
+
+Responses are cached by (scheme, host, path) with the version stamps they
+were rendered with: the router version (pages and meta values, see
+`seo.router`) and the stamp of the selected model instance. A cached response
+is served only while both stamps are current, checking them only reads the
+cache so repeated hits and conditional GETs don't touch the database.
+
+The stamps are read before rendering, a change landing during the render
+leaves the response stale instead of current. Saving an instance drops its
+stamp and the stamp of the instance it belongs to (e.g. the profile of a
+user, see `seo.signals`), other related rows are refreshed when the response
+expires.
+"""
+
+import hashlib
+import uuid
+
+from django.core.cache import cache
+
+from . import router
+
+RESPONSE_TIMEOUT = 60 * 60
+
+
+def _response_key(scheme, host, path):
+    digest = hashlib.md5(f"{scheme}://{host}{path}".encode()).hexdigest()
+    return f"seo:response:{digest}"
+
+
+def _instance_key(label, pk):
+    return f"seo:instance:{label}:{pk}"
+
+
+def get_instance_stamp(instance):
+    """stamp of the instance, read before rendering it"""
+    key = _instance_key(instance._meta.label_lower, instance.pk)
+    return cache.get_or_set(key, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_instances(model, pks):
+    """drop cached responses rendered with the instances"""
+    label = model._meta.label_lower
+    cache.delete_many([_instance_key(label, pk) for pk in pks])
+
+
+def make_etag(content):
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def get_response(scheme, host, path):
+    """(etag, content) of the cached response if still current"""
+    entry = cache.get(_response_key(scheme, host, path))
+    if entry is None or entry["version"] != router.get_version():
+        return None
+    instance = entry["instance"]
+    if instance is not None and entry["stamp"] != cache.get(_instance_key(*instance)):
+        return None
+    return entry["etag"], entry["content"]
+
+
+def set_response(scheme, host, path, version, instance, stamp, etag, content):
+    """`version` and `stamp` are the ones read before rendering"""
+    entry = {
+        "version": version,
+        "instance": None,
+        "stamp": stamp,
+        "etag": etag,
+        "content": content,
+    }
+    if instance is not None:
+        entry["instance"] = (instance._meta.label_lower, instance.pk)
+    cache.set(_response_key(scheme, host, path), entry, timeout=RESPONSE_TIMEOUT)
@@ -0,0 +1,52 @@
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from api.models import Movie
+from seo.render import compile_tags
+from seo.views import _get_extras, _get_value
+
+TAG_TEMPLATES = [
+    '<meta name="title-{index}" content="{{{{movie.title}}}}">',
+    '<meta name="about-{index}" content="{{{{ about }}}}">',
+    '<meta property="url-{index}" content="{{{{base_url}}}}/film/{{{{movie.id}}}}">',
+    '<meta name="description-{index}" content="{{{{meta.description}}}}">',
+    '<meta name="static-{index}" content="Moviepedia">',
+]
+
+
+class Command(BaseCommand):
+    help = "compare rendering SEO tags with compiled plans against _get_value"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tags", type=int, default=40)
+        parser.add_argument("--iterations", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tags = "\n".join(
+            TAG_TEMPLATES[index % len(TAG_TEMPLATES)].format(index=index)
+            for index in range(options["tags"])
+        )
+        movie = Movie.objects.first() or Movie(id=1, title="Movie", about="About")
+        request = RequestFactory().get(f"/film/{movie.id}")
+        extras = _get_extras(request)
+        extras.setdefault("meta.description", "Description")
+        iterations = options["iterations"]
+
+        def legacy():
+            lines = [line.strip() for line in tags.split("\n")]
+            return [_get_value(line, movie, request, extras) for line in lines]
+
+        plan = compile_tags(tags)
+
+        def compiled():
+            return plan.render(movie, request, extras)
+
+        if legacy() != compiled():
+            self.stderr.write("compiled tags render differently")
+        for name, fn in [("legacy", legacy), ("compiled", compiled)]:
+            seconds = timeit(fn, number=iterations) / iterations
+            self.stdout.write(
+                f"{name}: {seconds * 10**6:.1f}us per page of {options['tags']} tags"
+            )
@@ -0,0 +1,124 @@
+"""Compiled tag templates of SEO pages.
+
+`compile_tags` parses the `Page.tags` blob once into a plan of literal
+segments and placeholders with their attribute paths already split, rendering
+it is a single pass over the segments. Placeholders are resolved like
+`seo.views._get_value` does:
+
+- `extras` (base_url, meta.*)
+- attributes of the selected model instance, `movie.title` and `title` both
+  resolve on a selected movie
+- the template context of the request
+- otherwise the placeholder is left as is
+"""
+
+import re
+
+from django.template import RequestContext
+
+VAR_PATTERN = re.compile(r"{{(.*?)}}")
+
+
+def _get_nested_attribute_value(obj, attributes):
+    value = obj
+    for attribute in attributes:
+        value = getattr(value, attribute)
+        if value is None:
+            break
+        if callable(value):
+            value = value()
+    return value
+
+
+class Placeholder:
+    __slots__ = ("text", "name", "model_name", "model_path", "path")
+
+    def __init__(self, raw):
+        self.text = f"{{{{{raw}}}}}"
+        self.name = raw.strip()
+        self.path = tuple(self.name.split("."))
+        if len(self.path) > 1:
+            self.model_name = self.path[0]
+            self.model_path = tuple(self.name.split(".", 1)[1].split("."))
+        else:
+            self.model_name = self.model_path = None
+
+    def _from_instance(self, instance, model_name):
+        if self.model_name is None:
+            return getattr(instance, self.name)
+        if self.model_name == model_name:
+            return _get_nested_attribute_value(instance, self.model_path)
+        return _get_nested_attribute_value(instance, self.path)
+
+    def _from_context(self, context):
+        if self.model_name is None:
+            return getattr(context, self.name)
+        return _get_nested_attribute_value(context, self.path)
+
+    def resolve(self, instance, model_name, extras, get_context):
+        try:
+            return str(extras[self.name])
+        except KeyError:
+            pass
+        try:
+            return str(self._from_instance(instance, model_name))
+        except AttributeError:
+            pass
+        try:
+            return str(self._from_context(get_context()))
+        except AttributeError:
+            return self.text
+
+
+class TagPlan:
+    """tag lines of a page as literal strings and `Placeholder`s"""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def render(self, instance, request, extras):
+        """the rendered tag lines"""
+        model_name = instance.__class__.__name__.lower()
+        context = []
+
+        def get_context():
+            if not context:
+                context.append(RequestContext(request))
+            return context[0]
+
+        rendered = []
+        for segments in self.lines:
+            if isinstance(segments, str):
+                rendered.append(segments)
+                continue
+            rendered.append(
+                "".join(
+                    (
+                        segment
+                        if isinstance(segment, str)
+                        else segment.resolve(instance, model_name, extras, get_context)
+                    )
+                    for segment in segments
+                )
+            )
+        return rendered
+
+
+def _compile_line(line):
+    segments = []
+    position = 0
+    for match in VAR_PATTERN.finditer(line):
+        if match.start() > position:
+            segments.append(line[position : match.start()])
+        segments.append(Placeholder(match.group(1)))
+        position = match.end()
+    if not segments:
+        return line
+    if position < len(line):
+        segments.append(line[position:])
+    return segments
+
+
+def compile_tags(tags):
+    lines = [line.strip() for line in tags.split("\n")] if tags else []
+    return TagPlan([_compile_line(line) for line in lines])
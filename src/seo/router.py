@@ -0,0 +1,125 @@
+"""In-process router of SEO pages.
+
+All pages (with their compiled tags, see `seo.render`) and meta values are
+loaded once and kept in memory, exact urls are looked up in a dict and all
+the pattern pages are compiled into a single regex with one alternative per
+page. The router is rebuilt when the version
+stamp in the cache changes, `invalidate` changes it whenever a `Page` or
+`MetaValue` is saved or deleted so every process picks up the change.
+"""
+
+from logging import getLogger
+import re
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .models import Page, MetaValue
+from .render import compile_tags
+
+logger = getLogger(__name__)
+
+VERSION_KEY = "seo:router:version"
+
+_GROUP_NAME = re.compile(r"\(\?P(<|=)(\w+)")
+# numbered groups shift once patterns are combined
+_NUMBERED_REFERENCE = re.compile(r"\\[1-9]|\(\?\(\d")
+
+_lock = threading.Lock()
+_router = None
+
+
+class Router:
+    def __init__(self, version):
+        self.version = version
+        pages = list(Page.objects.select_related("models_to_select").order_by("id"))
+        for page in pages:
+            page.tag_plan = compile_tags(page.tags)
+        self.exact_pages = {page.url: page for page in pages}
+        self.pattern_pages = [page for page in pages if page.is_pattern]
+        self.meta_values = {
+            "meta." + meta_value.name: meta_value.value
+            for meta_value in MetaValue.objects.all()
+        }
+        self.patterns = []
+        for page in self.pattern_pages:
+            try:
+                self.patterns.append(re.compile(page.url))
+            except re.error:
+                logger.error(f"invalid url pattern of page {page.id}: {page.url}")
+                self.patterns.append(None)
+        self.combined = self._compile_combined()
+
+    def _compile_combined(self):
+        """one alternative per page, group names are made unique per page so
+        the patterns can live in the same regex. Returns None when that isn't
+        possible (e.g. numbered back references or inline flags), `match`
+        then tries the patterns one by one"""
+        alternatives = []
+        for index, pattern in enumerate(self.patterns):
+            if pattern is None:
+                continue
+            if _NUMBERED_REFERENCE.search(pattern.pattern):
+                return None
+            url = _GROUP_NAME.sub(
+                lambda m: f"(?P{m.group(1)}p{index}_{m.group(2)}", pattern.pattern
+            )
+            alternatives.append(f"(?P<page{index}>{url})")
+        if not alternatives:
+            return None
+        try:
+            return re.compile("|".join(alternatives))
+        except re.error:
+            logger.warning("can't combine the url patterns, matching one by one")
+            return None
+
+    def match(self, path):
+        """(page, model_pk) of the page matching path or (None, None)"""
+        page = self.exact_pages.get(path)
+        if page is not None:
+            return page, None
+        if self.combined is not None:
+            combined_match = self.combined.match(path)
+            if not combined_match:
+                return None, None
+            index = int(combined_match.lastgroup[len("page") :])
+            candidates = [index]
+        else:
+            candidates = range(len(self.pattern_pages))
+        for index in candidates:
+            pattern = self.patterns[index]
+            match = pattern and pattern.match(path)
+            if match:
+                page = self.pattern_pages[index]
+                # capture the model_pk from the matched url
+                return page, match.group(page.model_pk)
+        return None, None
+
+
+def get_version():
+    """version stamp of the pages and meta values"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_KEY, version, timeout=None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def get_router():
+    """the router of the current pages, rebuilt after invalidation"""
+    global _router
+    version = get_version()
+    router = _router
+    if router is None or router.version != version:
+        with _lock:
+            router = _router
+            if router is None or router.version != version:
+                logger.info(f"building seo router {version}")
+                router = _router = Router(version)
+    return router
+
+
+def invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.models import Release
+from .models import Page, MetaValue
+from . import cache, router, sitemaps
+
+# the invalidations wait for the commit, otherwise a concurrent request could
+# cache what it renders from the rows as they were before it
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+@receiver(post_save, sender=MetaValue)
+@receiver(post_delete, sender=MetaValue)
+def invalidate_router(sender, **kwargs):
+    transaction.on_commit(router.invalidate)
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_sitemaps(sender, **kwargs):
+    transaction.on_commit(sitemaps.invalidate_all)
+
+
+@receiver(post_save, sender=Release)
+def invalidate_movie_sitemap(sender, instance, raw=False, **kwargs):
+    if not raw:
+        movie_id = instance.movie_id
+        transaction.on_commit(lambda: sitemaps.invalidate_movie(movie_id))
+
+
+def _get_relations():
+    """related model => [(rendered model, field)] of the one to one fields of
+    the rendered models (e.g. the user of a profile), other related rows are
+    refreshed when the responses expire"""
+    relations = defaultdict(list)
+    for model in RENDERED_MODELS:
+        for field in model._meta.get_fields():
+            if field.concrete and field.one_to_one:
+                relations[field.related_model].append((model, field.name))
+    return relations
+
+
+# models selected by the pages, responses of pages selecting other models are
+# refreshed when they expire
+RENDERED_MODELS = tuple(section.model for section in sitemaps.SECTIONS.values())
+RELATIONS = _get_relations()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_instance_responses(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    stale = []
+    if sender in RENDERED_MODELS:
+        stale.append((sender, [instance.pk]))
+    for model, field in RELATIONS.get(sender, []):
+        pks = list(
+            model.objects.filter(**{field: instance}).values_list("pk", flat=True)
+        )
+        if pks:
+            stale.append((model, pks))
+    for model, pks in stale:
+        transaction.on_commit(
+            lambda model=model, pks=pks: cache.invalidate_instances(model, pks)
+        )
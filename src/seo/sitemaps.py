@@ -0,0 +1,248 @@
+"""Sitemap index and chunked sitemaps of the SEO pages.
+
+Sections:
+
+- `pages`: the fixed url pages
+- `movies`: published movies (`publish_on` as lastmod) on the url patterns
+  of the pages selecting a movie
+- `profiles`: onboarded profiles on the url patterns of the pages selecting
+  a profile
+
+Rows are split in chunks of `CHUNK_SIZE` ids (`id // CHUNK_SIZE`) so a chunk
+keeps its rows when new ones are added. A chunk is streamed while its rows
+are read with `iterator()` and is written to `SITEMAP_DIR` at the same time,
+the file is served until it expires or is invalidated: a `Release` drops the
+chunk of its movie, a change of the pages drops every file.
+"""
+
+from logging import getLogger
+import glob
+import hashlib
+import os
+import re
+import time
+import uuid
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Max
+from django.db.models.functions import Floor
+from django.utils.text import slugify
+
+from api.constants import MOVIE_STATE
+from api.models import Movie, Profile
+from .models import Page
+
+logger = getLogger(__name__)
+
+CHUNK_SIZE = 10000
+# bounds the staleness of what isn't invalidated (new profiles, edits...)
+MAX_AGE = 24 * 60 * 60
+INDEX = "index"
+
+_GROUP = re.compile(r"\(\?P<(\w+)>[^()]*\)")
+_ESCAPED = re.compile(r"\\([./-])")
+_SPECIAL = re.compile(r"[\\()\[\]{}*+?|^$]")
+
+_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_URLSET = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_SITEMAPINDEX = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+class Section:
+    def __init__(self, model, get_queryset, get_slug, lastmod=None):
+        self.model = model
+        self.get_queryset = get_queryset
+        self.get_slug = get_slug
+        self.lastmod = lastmod
+
+    def get_chunks(self):
+        """[(chunk, lastmod)] of the chunks with at least one row"""
+        chunks = (
+            self.get_queryset()
+            .annotate(
+                # MySQL divides integers into decimals
+                chunk=Floor(F("id") / CHUNK_SIZE, output_field=IntegerField())
+            )
+            .values("chunk")
+            .order_by("chunk")
+        )
+        if self.lastmod is None:
+            chunk_ids = chunks.values_list("chunk", flat=True).distinct()
+            return [(chunk, None) for chunk in chunk_ids]
+        return list(
+            chunks.annotate(lastmod=Max(self.lastmod)).values_list("chunk", "lastmod")
+        )
+
+    def get_rows(self, chunk):
+        return (
+            self.get_queryset()
+            .filter(id__gte=chunk * CHUNK_SIZE, id__lt=(chunk + 1) * CHUNK_SIZE)
+            .order_by("id")
+            .iterator(chunk_size=2000)
+        )
+
+
+SECTIONS = {
+    "movies": Section(
+        Movie,
+        lambda: Movie.objects.filter(state=MOVIE_STATE.PUBLISHED),
+        lambda movie: slugify(movie.title),
+        lastmod="publish_on",
+    ),
+    "profiles": Section(
+        Profile,
+        lambda: Profile.objects.filter(onboarded=True).select_related("user"),
+        lambda profile: slugify(profile.user.get_full_name()),
+    ),
+}
+
+
+class UrlTemplate:
+    """url pattern of a page split into literal parts and group names"""
+
+    def __init__(self, page):
+        self.page = page
+        self.pattern = re.compile(page.url)
+        self.parts = []
+        position = 0
+        for match in _GROUP.finditer(page.url):
+            self.parts.append(self._literal(page.url[position : match.start()]))
+            self.parts.append(match.group(1))
+            position = match.end()
+        self.parts.append(self._literal(page.url[position:]))
+
+    @staticmethod
+    def _literal(part):
+        part = _ESCAPED.sub(r"\1", part.lstrip("^").rstrip("$"))
+        if _SPECIAL.search(part):
+            raise ValueError(f"can't build urls from {part}")
+        return part
+
+    def url(self, instance, slug):
+        """the path of the instance or None when it doesn't match the pattern"""
+        values = []
+        for index, part in enumerate(self.parts):
+            if index % 2 == 0:
+                values.append(part)
+            elif part == self.page.model_pk:
+                values.append(str(getattr(instance, part)))
+            elif part == "slug":
+                values.append(slug)
+            else:
+                values.append(str(getattr(instance, part, "")))
+        path = "".join(values)
+        return path if self.pattern.match(path) else None
+
+
+def _get_templates(model):
+    templates = []
+    pages = Page.objects.filter(is_pattern=True).select_related("models_to_select")
+    for page in pages.order_by("id"):
+        if page.models_to_select and page.models_to_select.model_class() is model:
+            try:
+                templates.append(UrlTemplate(page))
+            except (re.error, ValueError) as e:
+                logger.warning(f"page {page.id} not in the sitemap: {e}")
+    return templates
+
+
+def _format_lastmod(lastmod):
+    return f"<lastmod>{lastmod.isoformat()}</lastmod>" if lastmod else ""
+
+
+def _url(base_url, path, lastmod=None):
+    return (
+        f"<url><loc>{escape(base_url + path)}</loc>{_format_lastmod(lastmod)}</url>\n"
+    )
+
+
+def generate_index(base_url):
+    yield _HEADER
+    yield _SITEMAPINDEX
+    chunks = [("pages", 0, None)]
+    for name, section in SECTIONS.items():
+        chunks += [(name, chunk, lastmod) for chunk, lastmod in section.get_chunks()]
+    for name, chunk, lastmod in chunks:
+        loc = escape(f"{base_url}/sitemap-{name}-{chunk}.xml")
+        yield f"<sitemap><loc>{loc}</loc>{_format_lastmod(lastmod)}</sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def generate_pages(base_url):
+    yield _HEADER
+    yield _URLSET
+    for url in (
+        Page.objects.filter(is_pattern=False)
+        .order_by("id")
+        .values_list("url", flat=True)
+    ):
+        yield _url(base_url, url)
+    yield "</urlset>\n"
+
+
+def generate_chunk(base_url, name, chunk):
+    section = SECTIONS[name]
+    templates = _get_templates(section.model)
+    yield _HEADER
+    yield _URLSET
+    if templates:
+        for instance in section.get_rows(chunk):
+            slug = section.get_slug(instance)
+            lastmod = getattr(instance, section.lastmod) if section.lastmod else None
+            for template in templates:
+                path = template.url(instance, slug)
+                if path is not None:
+                    yield _url(base_url, path, lastmod)
+    yield "</urlset>\n"
+
+
+def _get_path(base_url, name):
+    """file of the sitemap, sitemaps of each host are kept apart"""
+    host = hashlib.md5(base_url.encode()).hexdigest()
+    return os.path.join(settings.SITEMAP_DIR, host, f"{name}.xml")
+
+
+def get_cached(base_url, name):
+    """path of the generated sitemap if still fresh"""
+    path = _get_path(base_url, name)
+    try:
+        if time.time() - os.path.getmtime(path) < MAX_AGE:
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def tee(base_url, name, content):
+    """yield content while writing it to the file of the sitemap, the file
+    is only replaced once the whole content is written"""
+    path = _get_path(base_url, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for part in content:
+                f.write(part)
+                yield part
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _remove(*names):
+    for name in names:
+        for path in glob.glob(os.path.join(settings.SITEMAP_DIR, "*", f"{name}.xml")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def invalidate_movie(movie_id):
+    _remove(INDEX, f"movies-{movie_id // CHUNK_SIZE}")
+
+
+def invalidate_all():
+    _remove("*")
@@ -1,7 +1,21 @@
-from django.test import TestCase
+from io import StringIO
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
 from seo.models import Page, MetaValue
+from seo.render import compile_tags
+from seo.router import get_router
+from seo.views import _get_value
+from seo import cache as seo_cache, sitemaps
+from api.constants import MOVIE_STATE
+from api.models import Profile, Release
 from api.models.movie import Movie
 from django.contrib.contenttypes.models import ContentType
+import mock
 
 
 # Create your tests here for the SEO app.
@@ -9,6 +23,8 @@ class TestSEO(TestCase):
     def setUp(self):
         # set HTTP_HOST on self.client
         self.client.defaults["HTTP_HOST"] = "testhost"
+        # pages of the previous tests are rolled back, rebuild the router
+        cache.clear()
 
     def test_generate_seo_tags_with_path_static_content(self):
         Page.objects.create(
@@ -126,3 +142,292 @@ class TestSEO(TestCase):
                                         <meta name="description" content="About Us">
                                        """,
             )
+
+    def test_resolve_from_memory(self):
+        MetaValue.objects.create(name="description", value="Old")
+        Page.objects.create(
+            url="/about-us",
+            is_pattern=False,
+            tags='<meta name="description" content="{{meta.description}}">',
+        )
+        self.assertContains(self.client.get("/about-us/"), 'content="Old"')
+        with self.assertNumQueries(0):
+            response = self.client.get("/about-us/")
+        self.assertContains(response, 'content="Old"')
+
+        # changes are picked up on the next request once committed
+        with self.captureOnCommitCallbacks() as callbacks:
+            MetaValue.objects.filter(name="description").get().delete()
+            MetaValue.objects.create(name="description", value="New")
+        self.assertContains(self.client.get("/about-us/"), 'content="Old"')
+        for callback in callbacks:
+            callback()
+        self.assertContains(self.client.get("/about-us/"), 'content="New"')
+
+    def test_router_pattern_pages(self):
+        edit_page = Page.objects.create(
+            url=r"/movie/(?P<id>\d+)/edit", is_pattern=True, model_pk="id"
+        )
+        movie_page = Page.objects.create(
+            url=r"/movie/(?P<id>\d+)", is_pattern=True, model_pk="id"
+        )
+        profile_page = Page.objects.create(
+            url=r"/profile/(?P<id>\w+)/(?P=id)", is_pattern=True, model_pk="id"
+        )
+        router = get_router()
+        self.assertIsNotNone(router.combined)
+        # the first page in creation order wins, like matching them one by one
+        self.assertEqual((edit_page, "12"), router.match("/movie/12/edit"))
+        self.assertEqual((movie_page, "34"), router.match("/movie/34"))
+        self.assertEqual((profile_page, "ab"), router.match("/profile/ab/ab"))
+        self.assertEqual((None, None), router.match("/profile/ab/cd"))
+
+    def test_router_falls_back_to_one_by_one(self):
+        same_page = Page.objects.create(
+            url=r"/movie/(?P<id>\d+)/\1", is_pattern=True, model_pk="id"
+        )
+        movie_page = Page.objects.create(
+            url=r"/movie/(?P<id>\d+)", is_pattern=True, model_pk="id"
+        )
+        router = get_router()
+        self.assertIsNone(router.combined)
+        self.assertEqual((same_page, "7"), router.match("/movie/7/7"))
+        self.assertEqual((movie_page, "7"), router.match("/movie/7/8"))
+
+    def test_compiled_tags_match_get_value(self):
+        movie = Movie.objects.create(
+            title="Test Movie", about="Test About", runtime=100, publish_on=None
+        )
+        tags = """
+            <title>{{movie.title}} | {{ title }}</title>
+            <meta content="{{movie.publish_on}}{{movie.lang.name}}">
+            <meta content="{{base_url}}/film/{{movie.id}}?{{meta.description}}">
+            <meta content="{{request.path}} {{movie.get_type_display}}">
+            <meta content="{{unknown}} {{movie.unknown}} {{movie.title}}">
+            <meta content="no placeholders">
+        """
+        request = RequestFactory().get("/film/1")
+        extras = {"base_url": "http://testhost", "meta.description": "Meta"}
+        legacy = [
+            _get_value(line.strip(), instance, request, extras)
+            for instance in [movie, None]
+            for line in tags.split("\n")
+        ]
+        compiled = [
+            line
+            for instance in [movie, None]
+            for line in compile_tags(tags).render(instance, request, extras)
+        ]
+        self.assertEqual(legacy, compiled)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        err = StringIO()
+        call_command("benchmarkseotags", tags=10, iterations=2, stdout=out, stderr=err)
+        self.assertIn("compiled:", out.getvalue())
+        self.assertEqual("", err.getvalue())
+
+    def test_conditional_get(self):
+        Page.objects.create(
+            url="/about-us", is_pattern=False, tags="<title>About Us</title>"
+        )
+        response = self.client.get("/about-us/")
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+        with self.assertNumQueries(0):
+            response = self.client.get("/about-us/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response["ETag"])
+
+        response = self.client.get("/about-us/", HTTP_IF_NONE_MATCH='"other"')
+        self.assertContains(response, "<title>About Us</title>")
+
+    def test_cached_response_invalidation(self):
+        movie = Movie.objects.create(title="Old", runtime=100)
+        Page.objects.create(
+            url=r"/movie/(?P<id>\d+)",
+            is_pattern=True,
+            tags="<title>{{movie.title}} {{meta.site}}</title>",
+            models_to_select=ContentType.objects.get(app_label="api", model="movie"),
+            model_pk="id",
+        )
+        MetaValue.objects.create(name="site", value="Moviepedia")
+        path = f"/movie/{movie.id}"
+        etag = self.client.get(path)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(path)
+        self.assertContains(response, "<title>Old Moviepedia</title>")
+        # hosts are cached apart
+        self.assertEqual(200, self.client.get(path, HTTP_HOST="otherhost").status_code)
+
+        movie.title = "New"
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.save()
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "<title>New Moviepedia</title>")
+        self.assertNotEqual(etag, response["ETag"])
+
+        MetaValue.objects.filter(name="site").update(value="MP")
+        with self.captureOnCommitCallbacks(execute=True):
+            MetaValue.objects.get(name="site").save()
+        self.assertContains(self.client.get(path), "<title>New MP</title>")
+
+    def test_related_rows_invalidate_responses(self):
+        user = User.objects.create(username="fan", first_name="Old")
+        profile = Profile.objects.create(user=user)
+        Page.objects.create(
+            url=r"/profile/(?P<id>\d+)",
+            is_pattern=True,
+            tags="<title>{{profile.user.first_name}}</title>",
+            models_to_select=ContentType.objects.get(app_label="api", model="profile"),
+            model_pk="id",
+        )
+        path = f"/profile/{profile.id}"
+        self.assertContains(self.client.get(path), "<title>Old</title>")
+        user.first_name = "New"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertContains(self.client.get(path), "<title>New</title>")
+
+        # models that aren't rendered don't touch the cache
+        with mock.patch("seo.cache.invalidate_instances") as invalidate_instances:
+            with self.captureOnCommitCallbacks(execute=True):
+                MetaValue.objects.create(name="site", value="Moviepedia")
+                Release.objects.create(
+                    movie=Movie.objects.create(title="Other", runtime=100)
+                )
+        self.assertEqual(
+            {Movie}, {call.args[0] for call in invalidate_instances.call_args_list}
+        )
+
+    def test_render_racing_an_invalidation(self):
+        movie = Movie.objects.create(title="Old", runtime=100)
+        version = get_router().version
+        stamp = seo_cache.get_instance_stamp(movie)
+        # the movie changes while the old title is rendered
+        seo_cache.invalidate_instances(Movie, [movie.pk])
+        seo_cache.set_response(
+            "http", "testhost", "/movie", version, movie, stamp, '"etag"', b"Old"
+        )
+        self.assertIsNone(seo_cache.get_response("http", "testhost", "/movie"))
+
+
+class TestSitemap(TestCase):
+    def setUp(self):
+        self.client.defaults["HTTP_HOST"] = "testhost"
+        self.sitemap_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.sitemap_dir.cleanup)
+        settings = override_settings(SITEMAP_DIR=self.sitemap_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        Page.objects.create(url="/about-us", is_pattern=False)
+        Page.objects.create(
+            url=r"/movie/(?P<id>\d+)/(?P<slug>[\w-]+)",
+            is_pattern=True,
+            models_to_select=ContentType.objects.get(app_label="api", model="movie"),
+            model_pk="id",
+        )
+        Page.objects.create(
+            url=r"/profile/(?P<id>\d+)",
+            is_pattern=True,
+            models_to_select=ContentType.objects.get(app_label="api", model="profile"),
+            model_pk="id",
+        )
+        self.movie = Movie.objects.create(
+            title="Test Movie",
+            runtime=100,
+            link="https://example.com/1",
+            state=MOVIE_STATE.PUBLISHED,
+            publish_on="2020-01-01T00:00:00Z",
+        )
+        Movie.objects.create(
+            title="Draft", runtime=100, link="https://example.com/2", state="C"
+        )
+        user = User.objects.create(username="fan", first_name="Fan")
+        self.profile = Profile.objects.create(user=user)
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        if response.streaming:
+            return b"".join(response.streaming_content).decode()
+        return b"".join(response).decode()
+
+    def test_sitemaps(self):
+        index = self._get("/sitemap.xml")
+        self.assertIn("<loc>http://testhost/sitemap-pages-0.xml</loc>", index)
+        self.assertIn("<loc>http://testhost/sitemap-movies-0.xml</loc>", index)
+        self.assertIn("<loc>http://testhost/sitemap-profiles-0.xml</loc>", index)
+
+        self.assertIn(
+            "<loc>http://testhost/about-us</loc>", self._get("/sitemap-pages-0.xml")
+        )
+        movies = self._get("/sitemap-movies-0.xml")
+        self.assertIn(
+            f"<loc>http://testhost/movie/{self.movie.id}/test-movie</loc>"
+            "<lastmod>2020-01-01T00:00:00+00:00</lastmod>",
+            movies,
+        )
+        self.assertNotIn("draft", movies)
+        self.assertIn(
+            f"<loc>http://testhost/profile/{self.profile.id}</loc>",
+            self._get("/sitemap-profiles-0.xml"),
+        )
+        self.assertEqual(404, self.client.get("/sitemap-lists-0.xml").status_code)
+
+    def test_served_from_disk_until_released(self):
+        movies = self._get("/sitemap-movies-0.xml")
+        with self.assertNumQueries(0):
+            self.assertEqual(movies, self._get("/sitemap-movies-0.xml"))
+
+        draft = Movie.objects.get(title="Draft")
+        with self.captureOnCommitCallbacks(execute=True):
+            Release.objects.create(movie=draft)
+        self.assertIn(
+            f"/movie/{draft.id}/draft</loc>", self._get("/sitemap-movies-0.xml")
+        )
+
+    def test_chunks(self):
+        movie = Movie.objects.create(
+            id=sitemaps.CHUNK_SIZE * 2 + 1,
+            title="Later",
+            runtime=100,
+            link="https://example.com/3",
+            state=MOVIE_STATE.PUBLISHED,
+        )
+        index = self._get("/sitemap.xml")
+        self.assertIn("sitemap-movies-2.xml", index)
+        self.assertNotIn("sitemap-movies-1.xml", index)
+        movies = self._get("/sitemap-movies-2.xml")
+        self.assertIn(f"/movie/{movie.id}/later</loc>", movies)
+        self.assertNotIn(f"/movie/{self.movie.id}/", movies)
+
+    def test_chunks_with_decimal_division(self):
+        for index in (1, 2):
+            Movie.objects.create(
+                id=sitemaps.CHUNK_SIZE * 2 + index,
+                title="Later",
+                runtime=100,
+                link=f"https://example.com/later{index}",
+                state=MOVIE_STATE.PUBLISHED,
+            )
+        Profile.objects.create(
+            user=User.objects.create(username="other"), onboarded=True
+        )
+        self.profile.onboarded = True
+        self.profile.save()
+        combine_expression = connection.ops.combine_expression
+
+        def decimal_division(connector, sub_expressions):
+            # like MySQL, 1 / 10000 is 0.0001
+            if connector == "/":
+                return "CAST(%s AS REAL) / %s" % tuple(sub_expressions)
+            return combine_expression(connector, sub_expressions)
+
+        with mock.patch.object(connection.ops, "combine_expression", decimal_division):
+            movies = sitemaps.SECTIONS["movies"].get_chunks()
+            profiles = sitemaps.SECTIONS["profiles"].get_chunks()
+        # a chunk per group of rows, not per row
+        self.assertEqual([0, 2], [chunk for chunk, lastmod in movies])
+        self.assertEqual([(0, None)], profiles)
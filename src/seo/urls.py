@@ -2,6 +2,8 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path("sitemap.xml", views.sitemap_index, name="sitemap_index"),
+    path("sitemap-<slug:section>-<int:chunk>.xml", views.sitemap, name="sitemap"),
     # capture any url path and pass it to the view
     path("<path:path>", views.generate_seo_tags, name="generate_seo_tags"),
     path("", views.generate_seo_tags, name="generate_seo_tags"),
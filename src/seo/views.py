@@ -1,6 +1,15 @@
 from django.shortcuts import render
-from django.http import Http404
-from .models import Page, MetaValue
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import parse_etags
+from .models import Page
+from .router import get_router
+from . import cache, sitemaps
 from django.template import RequestContext
 import re
 from logging import getLogger
@@ -14,8 +23,7 @@ def get_meta_values():
     append all name with meta. prefix
     return as a dictionary
     """
-    meta_values = MetaValue.objects.all()
-    return {"meta." + meta_value.name: meta_value.value for meta_value in meta_values}
+    return get_router().meta_values
 
 
 def _get_nested_attribute_value(obj, attribute_name):
@@ -36,6 +44,7 @@ def _get_nested_attribute_value(obj, attribute_name):
 def _get_value(value: str, selected_model_instance, request, extras):
     """
     parse the attribute value to find any variable used {{<var>}}
+    (reference implementation of `seo.render`, kept for benchmarks)
     for each variable
       - try to get the value from the model
       - if the value is not found, try to get the value from the context
@@ -123,48 +132,99 @@ def _get_page_and_model_pk(path):
     Match the incoming URL path with saved Page models,
     the content Page.url can be a fixed path or a url pattern, use is_pattern to differentiate between the two
     """
-    page = None
-    model_pk = None
-    try:
-        page = Page.objects.get(url=path)
-        model_pk = None
-    except Page.DoesNotExist:
-        logger.info(
-            f"Page with direct match of url={path} does not exist, looking for pattern match"
-        )
-        # Handle the case when the URL path is not a fixed path
-        pages = Page.objects.filter(is_pattern=True)
-        match = None
-        for page in pages:
-            # parse the url as a regex and match it with the incoming path
-            match = re.match(page.url, path)
-            if match:
-                break
-        if not match:
-            raise Http404()
-        else:
-            # capture the model_pk from the matched url
-            model_pk = match.group(page.model_pk)
+    page, model_pk = get_router().match(path)
+    if page is None:
+        raise Http404()
     return page, model_pk
 
 
+def _is_not_modified(request, etag):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def _cached_response(request, etag, content):
+    if _is_not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content)
+    response["ETag"] = etag
+    return response
+
+
 def generate_seo_tags(request, path=None):
+    """
+    rendered responses are cached by (scheme, host, path) until the page, the
+    meta values or the selected model instance change, see `seo.cache`
+    """
     path = path or request.path
     path = "/" + path.strip("/")
     logger.info(f"generate_seo_tags: {path}")
 
+    host = request.META.get("HTTP_HOST", "")
+    cached = cache.get_response(request.scheme, host, path)
+    if cached is not None:
+        return _cached_response(request, *cached)
+
+    # read before rendering, see `seo.cache`
+    version = get_router().version
     page, model_pk = _get_page_and_model_pk(path)
     logger.info(f"matched page={page}, model_pk={model_pk}")
 
     selected_model_instance = _get_model(model_pk, page)
+    stamp = None
+    if selected_model_instance is not None:
+        stamp = cache.get_instance_stamp(selected_model_instance)
     extras = _get_extras(request)
 
-    tags = [line.strip() for line in page.tags.split("\n")] if page.tags else []
-    tags = [_get_value(tag, selected_model_instance, request, extras) for tag in tags]
-    return render(
+    tags = page.tag_plan.render(selected_model_instance, request, extras)
+    response = render(
         request,
         "seo/seo_tags_template.html",
         {
             "tags": tags,
         },
     )
+    etag = cache.make_etag(response.content)
+    cache.set_response(
+        request.scheme,
+        host,
+        path,
+        version,
+        selected_model_instance,
+        stamp,
+        etag,
+        response.content,
+    )
+    return _cached_response(request, etag, response.content)
+
+
+def _sitemap_response(request, name, generate):
+    base_url = f"{request.scheme}://{request.META.get('HTTP_HOST', '')}"
+    path = sitemaps.get_cached(base_url, name)
+    if path is not None:
+        return FileResponse(open(path, "rb"), content_type="application/xml")
+    return StreamingHttpResponse(
+        sitemaps.tee(base_url, name, generate(base_url)),
+        content_type="application/xml",
+    )
+
+
+def sitemap_index(request):
+    return _sitemap_response(request, sitemaps.INDEX, sitemaps.generate_index)
+
+
+def sitemap(request, section, chunk):
+    name = f"{section}-{chunk}"
+    if section == "pages" and chunk == 0:
+        return _sitemap_response(request, name, sitemaps.generate_pages)
+    if section not in sitemaps.SECTIONS:
+        raise Http404()
+    return _sitemap_response(
+        request,
+        name,
+        lambda base_url: sitemaps.generate_chunk(base_url, section, chunk),
+    )